@@ -0,0 +1,88 @@
+"""
+Measure how long importing edx_when takes, with ``python -X importtime``.
+
+Run it from the repository root (or with ``make benchmark_import``):
+
+    python benchmarks/import_time.py [--repeat N] [--top N] [module ...]
+
+Each run sets up Django with test_settings in a fresh interpreter, which imports edx_when's models, and then
+imports the given edx_when modules (by default, the ones the LMS imports at startup). It reports the median
+time spent importing, with and without the edx_when modules, and the slowest imports.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+DEFAULT_MODULES = ('edx_when.api', 'edx_when.field_data', 'edx_when.apps')
+
+# "import time: self [us] | cumulative | imported package", with nested imports indented under their importer
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def measure(modules):
+    """
+    Set up Django and import the modules in a fresh interpreter, returning the microseconds each import took.
+
+    The times are each module's own, leaving out the modules it imported, so they add up.
+    """
+    code = '; '.join(
+        ['import django', 'import sys', 'sys.stderr.write("--- start ---\\n")', 'django.setup()']
+        + [f'import {module}' for module in modules]
+    )
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='test_settings')
+    # Compiling stale modules would swamp the import times, so let the warm-up run write the bytecode caches.
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code], env=env, capture_output=True, text=True, check=True,
+    )
+    self_times = {}
+    measuring = False
+    for line in result.stderr.splitlines():
+        if line == '--- start ---':
+            measuring = True
+            continue
+        match = IMPORTTIME_LINE.match(line)
+        if measuring and match:
+            self_times[match.group(4)] = int(match.group(1))
+    return self_times
+
+
+def main():
+    """
+    Run the benchmark and print its results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help='Modules to import.')
+    parser.add_argument('--repeat', type=int, default=10, help='Number of fresh interpreters to measure.')
+    parser.add_argument('--top', type=int, default=10, help='Number of the slowest imports to list.')
+    args = parser.parse_args()
+
+    # Warm up the bytecode caches, so the first run isn't slower than the rest.
+    measure(args.modules)
+    baseline_totals = []
+    totals = []
+    per_module = defaultdict(list)
+    for _ in range(args.repeat):
+        # Setting up Django imports edx_when.models (and what it imports) too, so measure that separately.
+        baseline_totals.append(sum(measure(()).values()))
+        self_times = measure(args.modules)
+        totals.append(sum(self_times.values()))
+        for module, microseconds in self_times.items():
+            per_module[module].append(microseconds)
+
+    print(f'Django setup (with the edx_when app), then importing {", ".join(args.modules)} ({args.repeat} runs):')
+    print(f'  median {statistics.median(totals) / 1000:.1f} ms in total, '
+          f'{statistics.median(baseline_totals) / 1000:.1f} ms of it for Django setup alone')
+    print('Slowest imports (median ms):')
+    slowest = sorted(per_module.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for module, times in slowest[:args.top]:
+        print(f'  {statistics.median(times) / 1000:8.2f}  {module}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,143 @@
 """
 Django admin support for edx-when.
+
+These tables can hold millions of rows, so the changelists avoid the queries that don't scale: they join the
+related rows they display up front, only search on exact keys and usernames (which are indexed) rather than
+substrings, don't count the whole table, and can be scoped to a course with ``?course_id=<course key>``.
 """
 
+from django.conf import settings
 from django.contrib import admin
-
-from .models import ContentDate, DatePolicy, UserDate
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from .models import ContentDate, DatePolicy, UserDate, UserDateArchive
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that doesn't run a full COUNT(*) over large tables.
+
+    Unfiltered changelists use the database's estimate of the table's size (on MySQL and PostgreSQL). Otherwise,
+    rows are only counted up to EDX_WHEN_ADMIN_COUNT_LIMIT (default 10000); narrow the search to see later pages.
+    """
+
+    @cached_property
+    def count(self):
+        """
+        Return the (possibly estimated or capped) number of objects.
+        """
+        limit = getattr(settings, 'EDX_WHEN_ADMIN_COUNT_LIMIT', 10000)
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = _estimated_row_count(queryset)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
+
+
+def _estimated_row_count(queryset):
+    """
+    Return the database's estimate of the number of rows in the queryset's table, or None if it has none.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+    elif connection.vendor == 'mysql':
+        sql = 'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    # PostgreSQL reports -1 for tables that were never analyzed.
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def _search_by_key(queryset, search_term, course_id_field, location_field, username_field=None):
+    """
+    Filter the queryset on the indexed field matching the search term exactly: a course key, a usage key or a username.
+    """
+    search_term = search_term.strip()
+    if not search_term:
+        return queryset
+    try:
+        return queryset.filter(**{course_id_field: CourseKey.from_string(search_term)})
+    except InvalidKeyError:
+        pass
+    try:
+        usage_key = UsageKey.from_string(search_term)
+    except InvalidKeyError:
+        pass
+    else:
+        # Filtering on the course too lets the course_id index serve tables without a location index.
+        return queryset.filter(**{course_id_field: usage_key.course_key, location_field: usage_key})
+    if username_field:
+        return queryset.filter(**{username_field: search_term})
+    return queryset.none()
+
+
+def _course_filter(course_id_field):
+    """
+    Return a list filter limiting a changelist to one course, given as ?course_id=<course key>.
+    """
+    class CourseFilter(admin.SimpleListFilter):
+        """
+        Limit the changelist to one course, without listing every course in the table as a choice.
+        """
+
+        title = _('course')
+        parameter_name = 'course_id'
+
+        def lookups(self, request, model_admin):
+            """
+            Offer only the course being filtered on, if any.
+            """
+            return [(self.value(), self.value())] if self.value() else []
+
+        def queryset(self, request, queryset):
+            """
+            Limit the queryset to the course's rows.
+            """
+            if not self.value():
+                return queryset
+            try:
+                course_key = CourseKey.from_string(self.value())
+            except InvalidKeyError as error:
+                raise IncorrectLookupParameters(error) from error
+            return queryset.filter(**{course_id_field: course_key})
+
+    return CourseFilter
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """
+    Base admin config for the large edx-when tables.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    # The fields searched by exact course key, usage key and (optionally) username.
+    key_search_fields = (None, None, None)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search by exact key or username, which the indexes serve, rather than by substring.
+        """
+        return _search_by_key(queryset, search_term, *self.key_search_fields), False
 
 
 @admin.register(ContentDate)
-class ContentDateAdmin(admin.ModelAdmin):
+class ContentDateAdmin(ScalableModelAdmin):
     """Admin config for ContentDate."""
 
     list_display = [
@@ -18,9 +147,12 @@ class ContentDateAdmin(admin.ModelAdmin):
         'policy',
         'active',
     ]
-    list_filter = ['active']
+    list_filter = [_course_filter('course_id'), 'active']
+    list_select_related = ['policy']
     search_fields = ['course_id', 'location']
-    ordering = ['course_id', 'policy']
+    search_help_text = _('Search by exact course key or block usage key.')
+    key_search_fields = ('course_id', 'location', None)
+    ordering = ['course_id', 'id']
 
     raw_id_fields = ['policy']  # dropdown of dates is not helpful
 
@@ -36,7 +168,7 @@ class DatePolicyAdmin(admin.ModelAdmin):
 
 
 @admin.register(UserDate)
-class UserDateAdmin(admin.ModelAdmin):
+class UserDateAdmin(ScalableModelAdmin):
     """Admin config for UserDate."""
 
     list_display = [
@@ -46,8 +178,13 @@ class UserDateAdmin(admin.ModelAdmin):
         '_field',
         '_date',
     ]
-    search_fields = ['user__username', 'content_date__course_id', 'content_date__location']
-    ordering = ['user', 'content_date__course_id', 'content_date__policy']
+    # Filter on the denormalized course_id column rather than joining ContentDate.
+    list_filter = [_course_filter('course_id')]
+    list_select_related = ['user', 'content_date']
+    search_fields = ['user__username', 'course_id', 'content_date__location']
+    search_help_text = _('Search by exact username, course key or block usage key.')
+    key_search_fields = ('course_id', 'content_date__location', 'user__username')
+    ordering = ['-id']
 
     raw_id_fields = ['content_date', 'user']
     exclude = ['actor']
@@ -68,3 +205,34 @@ class UserDateAdmin(admin.ModelAdmin):
         """Make sure that we record who last changed the model."""
         obj.actor = request.user
         super().save_model(request, obj, form, change)
+
+
+@admin.register(UserDateArchive)
+class UserDateArchiveAdmin(ScalableModelAdmin):
+    """Admin config for UserDateArchive."""
+
+    list_display = [
+        'user',
+        'course_id',
+        'location',
+        'field',
+        'abs_date',
+        'rel_date',
+        'modified',
+    ]
+    list_filter = [_course_filter('course_id')]
+    list_select_related = ['user']
+    search_fields = ['user__username', 'course_id', 'location']
+    search_help_text = _('Search by exact username, course key or block usage key.')
+    key_search_fields = ('course_id', 'location', 'user__username')
+    ordering = ['-id']
+
+    raw_id_fields = ['user', 'actor']
+
+    def has_add_permission(self, request):
+        """Disallow adding archived overrides; only the compact_dates command writes them."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Disallow editing archived overrides, which are a record of past overrides."""
+        return False
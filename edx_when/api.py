@@ -2,36 +2,110 @@
 API for retrieving and setting dates.
 """
 
+import asyncio
+import hashlib
 import logging
-from datetime import timedelta
-
-from django.core.exceptions import ValidationError
-from django.db import transaction
-from django.db.models import DateTimeField, ExpressionWrapper, F, ObjectDoesNotExist, Q
-from edx_django_utils.cache.utils import TieredCache
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from functools import lru_cache, partial, wraps
+from itertools import islice
+from typing import NamedTuple, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections, router, transaction
+from django.db.models import BooleanField, DateTimeField, Exists, ExpressionWrapper, F, Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from edx_django_utils.cache.utils import DEFAULT_REQUEST_CACHE, RequestCache
+from edx_django_utils.db.read_replica import READ_REPLICA_NAME, WRITER_NAME, read_replica_or_default
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.keys import CourseKey, UsageKey
 
 from . import models
-from .utils import get_schedule_for_user
-
-try:
-    from openedx.core.djangoapps.schedules.models import Schedule
-# TODO: Move schedules into edx-when
-except ImportError:
-    Schedule = None
+from .cache import (
+    aget_cached,
+    aget_course_generation,
+    aget_override_generation,
+    aset_cached,
+    bump_course_generation,
+    bump_override_generations,
+    delete_cached,
+    get_cached,
+    get_course_generation,
+    get_course_generations,
+    get_many_cached,
+    get_or_compute,
+    get_override_generation,
+    set_cached,
+    set_many_cached
+)
+from .keys import ensure_key, map_into_course
+from .utils import (
+    aget_schedule_for_user,
+    get_schedule_for_user,
+    get_schedule_model,
+    get_schedules_for_courses,
+    get_schedules_for_users
+)
 
 log = logging.getLogger(__name__)
 
 FIELDS_TO_EXTRACT = ('due', 'start', 'end')
 
+CONTENT_DATE_METADATA_FIELDS = ('assignment_title', 'course_name', 'subsection_name')
+
+CONTENT_DATE_NATURAL_KEY = ('course_id', 'location', 'field')
+
+# Number of blocks set_dates_for_course reads and writes at a time, by default.
+PUBLISH_CHUNK_SIZE = 500
+
+SUBSECTION_AND_HIGHER_BLOCK_TYPES = ('course', 'chapter', 'sequential')
+
+OVERRIDES_PAGE_SIZE = 1000
+
+_LAST_WRITE_CACHE_KEY = 'edx-when.last_write'
+
+
+class CourseDateRecord(NamedTuple):
+    """
+    The parts of an active ContentDate (and its DatePolicy) that get_dates_for_course reads.
+
+    These are read straight from the database with values_list, and are what the ContentDates cache holds.
+    """
+
+    id: int
+    location: UsageKey
+    field: str
+    block_type: Optional[str]
+    abs_date: Optional[datetime]
+    rel_date: Optional[timedelta]
+
+
+_COURSE_DATE_RECORD_COLUMNS = ('id', 'location', 'field', 'block_type', 'policy__abs_date', 'policy__rel_date')
 
-def _content_dates_cache_key(course_key, query_dict, subsection_and_higher_only, published_version):
+# The database queried by the outermost routed read API call in progress, which the calls it makes reuse.
+_routed_database = ContextVar('edx_when_routed_database', default=None)
+
+
+def _content_dates_cache_key(
+        course_key, query_dict, subsection_and_higher_only, published_version, course_generation=None,
+):
     """
     Memcached key for ContentDates given course_key, filter args, subsection and higher blocks, and published version.
 
     Adding the course's published version makes cache invalidation unnecessary,
     as setting new course block dates will always be a new course version.
+    Writes that don't publish a new version (resyncs, imports) change the course generation instead.
     """
     query_dict_str = ".".join(
         sorted(
@@ -42,62 +116,601 @@ def _content_dates_cache_key(course_key, query_dict, subsection_and_higher_only,
     subsection_and_higher_only_str = ''
     if subsection_and_higher_only:
         subsection_and_higher_only_str = 'subsection_and_higher_only'
+        if _use_strict_block_type_filter():
+            subsection_and_higher_only_str += '.strict'
     published_version_str = ''
     if published_version:
         published_version_str = published_version
 
-    return f'edx-when.content_dates:{course_key}:{query_dict_str}:'\
-           f'{subsection_and_higher_only_str}:{published_version_str}'
-
-
-def _ensure_key(key_class, key_obj):
-    if not isinstance(key_obj, key_class):
-        key_obj = key_class.from_string(key_obj)
-    return key_obj
+    # .v2: the entries hold CourseDateRecords rather than ContentDates.
+    cache_key = f'edx-when.content_dates.v2:{course_key}:{query_dict_str}:'\
+                f'{subsection_and_higher_only_str}:{published_version_str}'
+    if course_generation is not None:
+        cache_key += f':{course_generation}'
+    return cache_key
 
 
-def _are_relative_dates_enabled(course_key=None):
+@lru_cache(maxsize=None)
+def _relative_dates_flag():
     """
-    Return whether it's OK to consider relative dates. If not, pretend those database entries don't exist.
+    Return edx-platform's RELATIVE_DATES_FLAG, or None outside of edx-platform (only trying to import it once).
     """
     try:
         # It's bad form to depend on LMS code from inside a plugin like this. But we gracefully fail, and this is
         # temporary code anyway, while we develop this feature.
         from openedx.features.course_experience import RELATIVE_DATES_FLAG  # pylint: disable=import-outside-toplevel
     except ImportError:
+        return None
+    return RELATIVE_DATES_FLAG
+
+
+def relative_dates_disabled(course_key=None):  # pylint: disable=unused-argument
+    """
+    Return False: a relative dates resolver for EDX_WHEN_RELATIVE_DATES_RESOLVER that never allows them.
+    """
+    return False
+
+
+def _relative_dates_resolver():
+    """
+    Return the function deciding whether a course may use relative dates.
+
+    EDX_WHEN_RELATIVE_DATES_RESOLVER may name a function taking a course key (or None) and returning a bool,
+    e.g. 'edx_when.api.relative_dates_disabled' for deployments without edx-platform, so they don't even try to
+    import it. By default, it's edx-platform's RELATIVE_DATES_FLAG.
+    """
+    if getattr(settings, 'EDX_WHEN_RELATIVE_DATES_RESOLVER', None):
+        return import_string(settings.EDX_WHEN_RELATIVE_DATES_RESOLVER)
+    relative_dates_flag = _relative_dates_flag()
+    if relative_dates_flag is None:
+        return relative_dates_disabled
+    return relative_dates_flag.is_enabled
+
+
+def _are_relative_dates_enabled(course_key=None, memoize=True):
+    """
+    Return whether it's OK to consider relative dates. If not, pretend those database entries don't exist.
+
+    The answer is kept in the request cache, so the flag is only evaluated once per course per request. Pass
+    memoize=False where the request cache doesn't belong to a single request (e.g. from async code).
+    """
+    cache_key = f'edx-when.relative_dates_enabled.{course_key}'
+    if memoize:
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(cache_key)
+        if cached_response.is_found:
+            return cached_response.value
+    enabled = bool(_relative_dates_resolver()(course_key))
+    if memoize:
+        DEFAULT_REQUEST_CACHE.set(cache_key, enabled)
+    return enabled
+
+
+def _are_relative_dates_enabled_for_courses(course_keys, memoize=True):
+    """
+    Return a dictionary of course key to _are_relative_dates_enabled, evaluating the flag once per course.
+    """
+    return {course_key: _are_relative_dates_enabled(course_key, memoize=memoize) for course_key in course_keys}
+
+
+def get_course_dates_state(course_id):
+    """
+    Return a value that changes whenever get_dates_for_course's course-wide result for a published version could.
+
+    That is the course's generation (which writes that don't publish a new version move on), and the settings
+    deciding which dates are returned. Use it to key caches of the dates kept outside of edx_when's own.
+    """
+    course_id = ensure_key(CourseKey, course_id)
+    return get_course_generation(course_id), _are_relative_dates_enabled(course_id), _use_strict_block_type_filter()
+
+
+def _use_user_date_course_id():
+    """
+    Return whether override lookups can filter on the denormalized UserDate.course_id column.
+
+    Turn on EDX_WHEN_USE_USERDATE_COURSE_ID once the backfill_userdate_course_id command has completed;
+    until then, older overrides only carry their course through the ContentDate join.
+    """
+    return getattr(settings, 'EDX_WHEN_USE_USERDATE_COURSE_ID', False)
+
+
+def _use_strict_block_type_filter():
+    """
+    Return whether every ContentDate has its block_type set, so subsection_and_higher_only can filter on it alone.
+
+    Turn on EDX_WHEN_STRICT_BLOCK_TYPE_FILTER once the backfill_contentdate_block_type command has completed;
+    until then, rows written before block_type existed have to be included too, and the (course_id, block_type)
+    index can't serve the query by itself.
+    """
+    return getattr(settings, 'EDX_WHEN_STRICT_BLOCK_TYPE_FILTER', False)
+
+
+def _user_date_course_lookup(course_id):
+    """
+    Return the UserDate filter kwargs that select overrides in the given course.
+    """
+    if _use_user_date_course_id():
+        return {'course_id': course_id}
+    return {'content_date__course_id': course_id}
+
+
+def _note_write():
+    """
+    Record that this request has just written dates, so its reads stay on the writer database for a while.
+    """
+    DEFAULT_REQUEST_CACHE.set(_LAST_WRITE_CACHE_KEY, time.monotonic())
+
+
+def _wrote_recently():
+    """
+    Return whether this request wrote dates within the last EDX_WHEN_READ_YOUR_WRITES_WINDOW seconds (default 10).
+    """
+    cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(_LAST_WRITE_CACHE_KEY)
+    if not cached_response.is_found:
         return False
+    return time.monotonic() - cached_response.value < getattr(settings, 'EDX_WHEN_READ_YOUR_WRITES_WINDOW', 10)
+
+
+def _use_read_replica(api_name):
+    """
+    Return whether the read API should query the read replica (if there is one) rather than the writer database.
+
+    Read APIs use the read replica if the caller sends its reads there with edx_django_utils' read_queries_only.
+    Otherwise they do unless EDX_WHEN_READ_FROM_REPLICA maps their name to False (e.g.
+    {'get_overrides_for_course': False}), or this request wrote dates recently: the replica may not have caught
+    up with those writes yet.
+
+    Only uncached reads are routed: cached reads fill entries that outlive the replica's lag (e.g. a course's
+    enabled flag, set again right after a publish), so they always query the writer.
+    """
+    if router.db_for_read(models.UserDate) == READ_REPLICA_NAME:
+        return True
+    return not _wrote_recently() and getattr(settings, 'EDX_WHEN_READ_FROM_REPLICA', {}).get(api_name, True)
 
-    return RELATIVE_DATES_FLAG.is_enabled(course_key)
+
+def _read_database(api_name):
+    """
+    Return the name of the database the read API should query.
+
+    Read APIs called by another one use the same database as it.
+    """
+    database = _routed_database.get()
+    if database is None:
+        database = read_replica_or_default() if _use_read_replica(api_name) else WRITER_NAME
+    return database
+
+
+def _read_api(func):
+    """
+    Decorate a read API so the read APIs it calls query the same database as it.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _routed_database.set(_read_database(func.__name__))
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _routed_database.reset(token)
+    return wrapper
+
+
+def _enabled_cache_key(course_key):
+    """
+    Return the cache key of the flag recording whether edx-when is enabled for the course.
+    """
+    return f'edx-when.enabled:{course_key}'
+
+
+def _set_enabled_for_course(course_key, enabled):
+    """
+    Update the course's cached enabled flag after writing its ContentDates.
+
+    The flag is cleared right away and set once the current transaction commits, so a rolled back write can't
+    leave it wrong.
+    """
+    cache_key = _enabled_cache_key(course_key)
+    delete_cached(cache_key)
+    transaction.on_commit(partial(set_cached, cache_key, enabled))
 
 
 def is_enabled_for_course(course_key):
     """
     Return whether edx-when is enabled for this course.
     """
-    return models.ContentDate.objects.filter(course_id=course_key, active=True).exists()
+    return get_or_compute(
+        _enabled_cache_key(course_key),
+        models.ContentDate.objects.filter(course_id=course_key, active=True).exists,
+    )
+
+
+def enabled_courses(course_keys):
+    """
+    Return the set of the given courses that edx-when is enabled for, like is_enabled_for_course for each.
+
+    The cached flags are read together, and the rest are looked up in a single query.
+
+    Arguments:
+        course_keys: iterable of CourseKeys or string representations of same
+    """
+    cache_keys = {_enabled_cache_key(course_key): ensure_key(CourseKey, course_key) for course_key in course_keys}
+    cached = get_many_cached(cache_keys)
+    enabled = {cache_keys[cache_key] for cache_key, value in cached.items() if value}
+
+    missing = [course_key for cache_key, course_key in cache_keys.items() if cache_key not in cached]
+    if missing:
+        found = set(models.ContentDate.objects.filter(
+            course_id__in=missing, active=True,
+        ).values_list('course_id', flat=True).distinct())
+        set_many_cached({_enabled_cache_key(course_key): course_key in found for course_key in missing})
+        enabled |= found
+    return enabled
+
+
+def _publish_lock_name(course_key):
+    """
+    Return the name of the course's publish lock, short enough for MySQL's GET_LOCK.
+    """
+    return 'edx-when.publish.' + hashlib.sha1(str(course_key).encode('utf-8')).hexdigest()
+
+
+def _try_publish_lock(connection, name, token, timeout):
+    """
+    Try to take the publish lock, waiting up to timeout seconds on MySQL; return whether it was taken.
+    """
+    if connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT GET_LOCK(%s, %s)', [name, timeout])
+            return cursor.fetchone()[0] == 1
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [_advisory_lock_id(name)])
+            return cursor.fetchone()[0]
+    return django_cache.add(name, token, getattr(settings, 'EDX_WHEN_PUBLISH_TIMEOUT', 600))
+
+
+def _release_publish_lock(connection, name, token):
+    """
+    Release a publish lock taken by _try_publish_lock.
+    """
+    if connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT RELEASE_LOCK(%s)', [name])
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [_advisory_lock_id(name)])
+    elif django_cache.get(name) == token:
+        # If the lock expired and someone else took it, it's theirs to release.
+        django_cache.delete(name)
+
+
+def _advisory_lock_id(name):
+    """
+    Return the 64-bit PostgreSQL advisory lock id for a lock name.
+    """
+    return int.from_bytes(hashlib.sha1(name.encode('utf-8')).digest()[:8], 'big', signed=True)
+
 
+@contextmanager
+def course_publish_lock(course_key, timeout=None):
+    """
+    Hold an exclusive lock on publishing the course's dates, so concurrent publishes of a course run one at a time.
+
+    On MySQL and PostgreSQL, this is a session-level advisory lock (GET_LOCK or pg_advisory_lock), which locks
+    no rows and outlives the transactions taken while holding it. Elsewhere, it's a lock in the django cache,
+    which expires after EDX_WHEN_PUBLISH_TIMEOUT seconds (default 600).
+
+    Arguments:
+        course_key: either a CourseKey or string representation of same
+        timeout: seconds to wait for the lock; defaults to EDX_WHEN_PUBLISH_LOCK_TIMEOUT (60)
 
-def set_dates_for_course(course_key, items):
+    Raises:
+        PublishLockTimeout: if another publish of the course held the lock for the whole timeout
+    """
+    course_key = ensure_key(CourseKey, course_key)
+    if timeout is None:
+        timeout = getattr(settings, 'EDX_WHEN_PUBLISH_LOCK_TIMEOUT', 60)
+    connection = connections[router.db_for_write(models.ContentDate)]
+    name = _publish_lock_name(course_key)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + timeout
+    while not _try_publish_lock(connection, name, token, timeout):
+        if connection.vendor == 'mysql' or time.monotonic() >= deadline:
+            raise PublishLockTimeout(course_key)
+        time.sleep(getattr(settings, 'EDX_WHEN_CACHE_LOCK_POLL_INTERVAL', 0.05))
+    try:
+        yield
+    finally:
+        _release_publish_lock(connection, name, token)
+
+
+def _publishing_cache_key(course_key):
+    """
+    Return the shared cache key of the marker set while a chunked publish of the course is in progress.
+    """
+    return f'edx-when.publishing:{course_key}'
+
+
+def _publish_in_progress(course_key):
+    """
+    Return whether a chunked publish of the course is part way through.
+
+    The database then holds a mix of old and new dates, so readers that miss the cache compute the dates from it
+    without caching anything, and keep serving the entries that were cached before the publish.
+    """
+    return django_cache.get(_publishing_cache_key(course_key)) is not None
+
+
+def set_dates_for_course(course_key, items, chunk_size=None):
     """
     Set dates for blocks.
 
-    items: iterator of (location, field metadata dictionary)
+    The items are read and written a chunk at a time, so memory use doesn't grow with the size of the course,
+    while holding the course's publish lock (see course_publish_lock). By default, the whole publish is still one
+    transaction, which for a large course holds locks on many rows for a long time. With chunk_size (or
+    EDX_WHEN_PUBLISH_CHUNK_SIZE), each chunk of that many blocks is committed on its own instead. A marker is kept in
+    the django cache until it's done, and reads of the course that miss the cache don't cache what they compute
+    meanwhile, so no cache entry holds a half-published course; entries cached before the publish are still served.
+
+    items: iterator of (location, field metadata dictionary); like bulk_set_dates_for_course, the dictionaries may
+        also hold the blocks' assignment_title, course_name and subsection_name
+    chunk_size: (optional) number of blocks to save per transaction
     """
-    with transaction.atomic():
-        active_date_ids = []
+    _note_write()
+    course_key = ensure_key(CourseKey, course_key)
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'EDX_WHEN_PUBLISH_CHUNK_SIZE', None)
+    if not chunk_size:
+        _sync_dates_for_course(course_key, items, PUBLISH_CHUNK_SIZE)
+    else:
+        _sync_dates_for_course(course_key, items, chunk_size, in_chunks=True)
+
+
+def _normalize_date(date_or_timedelta):
+    """
+    Return the date as the database will return it, so DatePolicies can be looked up by date.
+    """
+    if not isinstance(date_or_timedelta, timedelta) and settings.USE_TZ and timezone.is_naive(date_or_timedelta):
+        return timezone.make_aware(date_or_timedelta)
+    return date_or_timedelta
+
+
+def _get_or_create_policies(dates):
+    """
+    Return a dictionary of (normalized) absolute or relative dates to DatePolicies, creating any that are missing.
+
+    This has to run in a transaction: the existing policies are locked until it ends, so compaction can't delete
+    them before the ContentDates using them are saved (see compaction.delete_orphaned_date_policies).
+    """
+    abs_dates = {date for date in dates if not isinstance(date, timedelta)}
+    rel_dates = dates - abs_dates
+    policies = {}
+    # Like set_date_for_block, use the oldest policy when there are duplicates.
+    for policy in models.DatePolicy.objects.filter(
+        Q(abs_date__in=abs_dates) | Q(rel_date__in=rel_dates)
+    ).select_for_update().order_by('-id'):
+        policies[policy.abs_date if policy.rel_date is None else policy.rel_date] = policy
+
+    for date in dates - policies.keys():
+        # There are only a few distinct dates per course, so create them one by one to get their ids back.
+        field = 'rel_date' if isinstance(date, timedelta) else 'abs_date'
+        policies[date] = models.DatePolicy.objects.create(**{field: date})
+    return policies
+
+
+def _upsert_content_dates(content_dates, update_fields, batch_size=None):
+    """
+    Insert the ContentDates, updating update_fields of the rows that already have their (course_id, location, field).
+
+    Each batch is a single INSERT ... ON CONFLICT (or ON DUPLICATE KEY) UPDATE, so concurrent writes of the same
+    dates can't create duplicates. The objects only get their ids on databases that return them from it.
+    """
+    features = connections[router.db_for_write(models.ContentDate)].features
+    models.ContentDate.objects.bulk_create(
+        content_dates,
+        batch_size=batch_size,
+        update_conflicts=True,
+        # MySQL can't name the constraint; any unique key conflict updates the row.
+        unique_fields=CONTENT_DATE_NATURAL_KEY if features.supports_update_conflicts_with_target else None,
+        update_fields=update_fields,
+    )
+
+
+def bulk_set_dates_for_course(course_key, items, batch_size=500):
+    """
+    Set dates for blocks in one transaction, like set_dates_for_course, and return how many ContentDates changed.
+
+    Besides dates, the field metadata dictionaries may also hold a block's assignment_title, course_name and
+    subsection_name, which are stored on its ContentDates. This is meant for backfills and resyncs of whole
+    courses (see the resync_course_dates management command).
+
+    The items are read batch_size blocks at a time, and their new or changed ContentDates are upserted on their
+    (course_id, location, field), in one query per batch_size rows.
+
+    Arguments:
+        course_key: either a CourseKey or string representation of same
+        items: iterator of (location, field metadata dictionary)
+        batch_size: maximum number of blocks to read, and ContentDates to write per query, at a time
+
+    Returns:
+        a (created, updated, deactivated) tuple of ContentDate counts
+    """
+    _note_write()
+    return _sync_dates_for_course(ensure_key(CourseKey, course_key), items, batch_size)
+
+
+def _sync_chunk(course_key, items, batch_size):
+    """
+    Upsert the new and changed ContentDates of a chunk of items.
+
+    Returns:
+        a (created, updated, wanted) tuple: counts of the ContentDates created and updated, and the
+        (location, field) keys of all the ContentDates the chunk wanted (whether it changed them or not)
+    """
+    wanted = {}
+    for location, fields in items:
+        location = ensure_key(UsageKey, location)
+        metadata = {name: fields[name] for name in CONTENT_DATE_METADATA_FIELDS if fields.get(name) is not None}
+        for field in FIELDS_TO_EXTRACT:
+            if fields.get(field):
+                wanted[(location, field)] = (_normalize_date(fields[field]), metadata)
+    if not wanted:
+        return 0, 0, []
+
+    existing = {
+        (content_date.location, content_date.field): content_date
+        for content_date in models.ContentDate.objects.filter(
+            course_id=course_key, location__in={location for location, _ in wanted}
+        )
+    }
+    policies = _get_or_create_policies({date for date, _ in wanted.values()})
+
+    to_upsert = []
+    created = 0
+    for (location, field), (date, metadata) in wanted.items():
+        content_date = existing.get((location, field))
+        changes = dict(metadata, active=True, policy_id=policies[date].id, block_type=location.block_type)
+        if content_date is None:
+            created += 1
+        else:
+            if all(getattr(content_date, name) == value for name, value in changes.items()):
+                # Unchanged rows aren't written at all.
+                continue
+            # The upsert writes every metadata field, so carry over the ones this publish doesn't set.
+            changes = dict({name: getattr(content_date, name) for name in CONTENT_DATE_METADATA_FIELDS}, **changes)
+        to_upsert.append(models.ContentDate(course_id=course_key, location=location, field=field, **changes))
+
+    if to_upsert:
+        _upsert_content_dates(
+            to_upsert, ('active', 'policy', 'block_type') + CONTENT_DATE_METADATA_FIELDS, batch_size=batch_size,
+        )
+    return created, len(to_upsert) - created, list(wanted)
+
+
+@contextmanager
+def _synced_keys_table():
+    """
+    Create a temporary table for the (location, field) keys of the ContentDates a sync wants, and drop it after.
+
+    Temporary tables are private to the database session (and outlive its transactions), so concurrent syncs
+    each get their own.
+    """
+    connection = connections[router.db_for_write(models.ContentDate)]
+    quote_name = connection.ops.quote_name
+    table = f'edx_when_synced_{uuid.uuid4().hex}'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {quote_name(table)} '
+            f'({quote_name("location")} VARCHAR(255) NOT NULL, {quote_name("field")} VARCHAR(255) NOT NULL)'
+        )
+        cursor.execute(
+            f'CREATE INDEX {quote_name(table + "_key")} ON {quote_name(table)} '
+            f'({quote_name("location")}, {quote_name("field")})'
+        )
+    try:
+        yield table
+    finally:
+        # In a transaction that has to be rolled back, no query can run; the table goes with the rollback, or
+        # on MySQL, with the session.
+        if not connection.needs_rollback:
+            with connection.cursor() as cursor:
+                cursor.execute(f'DROP {"TEMPORARY " if connection.vendor == "mysql" else ""}TABLE {quote_name(table)}')
+
+
+def _add_synced_keys(table, keys):
+    """
+    Insert the (location, field) keys of ContentDates a sync wants into its _synced_keys_table.
+    """
+    connection = connections[router.db_for_write(models.ContentDate)]
+    quote_name = connection.ops.quote_name
+    location_field = models.ContentDate._meta.get_field('location')
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {quote_name(table)} ({quote_name("location")}, {quote_name("field")}) VALUES (%s, %s)',
+            [(location_field.get_db_prep_value(location, connection), field) for location, field in keys],
+        )
+
+
+def _deactivate_unsynced(course_key, table):
+    """
+    Deactivate the course's active ContentDates whose keys aren't in the sync's _synced_keys_table.
+
+    This is a single UPDATE with an anti-join on the table, so the rows are found without reading them.
+
+    Returns:
+        the number of ContentDates deactivated
+    """
+    quote_name = connections[router.db_for_write(models.ContentDate)].ops.quote_name
+    content_dates = quote_name(models.ContentDate._meta.db_table)
+    location, field = quote_name('location'), quote_name('field')
+    unsynced = RawSQL(
+        f'NOT EXISTS (SELECT 1 FROM {quote_name(table)} synced '
+        f'WHERE synced.{location} = {content_dates}.{location} AND synced.{field} = {content_dates}.{field})',
+        (),
+        output_field=BooleanField(),
+    )
+    return models.ContentDate.objects.filter(unsynced, course_id=course_key, active=True).update(active=False)
+
+
+def _sync_dates_for_course(course_key, items, chunk_size, in_chunks=False):
+    """
+    Save the items' dates, chunk_size blocks at a time, and deactivate the course's other ContentDates.
+
+    This holds the course's publish lock throughout, so syncs of a course run one at a time and none of them
+    deactivates the rows another is writing. Unless in_chunks, it's one transaction (or runs in the caller's).
+    With in_chunks, each chunk is a transaction of its own, and readers don't cache the course's dates until
+    it's done (see _publish_in_progress).
+
+    The keys of the ContentDates each chunk wants are inserted into a temporary table, and the stale ones are
+    found with an anti-join on it, so neither the items nor the course's existing dates are held in memory, and
+    unchanged rows don't have to be written.
 
-        for location, fields in items:
-            for field in FIELDS_TO_EXTRACT:
-                if field in fields:
-                    val = fields[field]
-                    if val:
-                        log.info('Setting date for %r, %s, %r', location, field, val)
-                        active_date_ids.append(
-                            set_date_for_block(course_key, location, field, val)
-                        )
+    Returns:
+        a (created, updated, deactivated) tuple of ContentDate counts
+    """
+    with course_publish_lock(course_key), _synced_keys_table() as synced_keys:
+        if not in_chunks:
+            with transaction.atomic():
+                return _sync_dates_in_chunks(course_key, items, chunk_size, synced_keys)
+
+        publishing_cache_key = _publishing_cache_key(course_key)
+        django_cache.set(publishing_cache_key, True, getattr(settings, 'EDX_WHEN_PUBLISH_TIMEOUT', 600))
+        if not _publish_in_progress(course_key):
+            # Readers would cache the half-published course.
+            raise PublishMarkerError(course_key)
+        try:
+            return _sync_dates_in_chunks(course_key, items, chunk_size, synced_keys)
+        except BaseException:
+            # The chunks already committed are live, so don't let the entries cached before the publish hide them.
+            bump_course_generation(course_key)
+            raise
+        finally:
+            django_cache.delete(publishing_cache_key)
 
-        # Now clear out old dates that we didn't touch
-        _clear_dates_for_course(course_key, active_date_ids)
+
+def _sync_dates_in_chunks(course_key, items, chunk_size, synced_keys):
+    """
+    Do the work of _sync_dates_for_course, once it holds the publish lock and has created its synced keys table.
+    """
+    created = updated = synced = 0
+    items = iter(items)
+    while chunk := list(islice(items, chunk_size)):
+        with transaction.atomic(savepoint=False):
+            chunk_created, chunk_updated, wanted = _sync_chunk(course_key, chunk, chunk_size)
+            _add_synced_keys(synced_keys, wanted)
+        created += chunk_created
+        updated += chunk_updated
+        synced += len(wanted)
+
+    with transaction.atomic(savepoint=False):
+        deactivated = _deactivate_unsynced(course_key, synced_keys)
+        _set_enabled_for_course(course_key, bool(synced))
+        if created or updated or deactivated:
+            # The published version may not have changed (e.g. for a resync), so move the cache keys on.
+            bump_course_generation(course_key)
+
+    log.info(
+        'Set dates for %s: created %d, updated %d, deactivated %d', course_key, created, updated, deactivated,
+    )
+    return created, updated, deactivated
 
 
 def _clear_dates_for_course(course_key, keep=None):
@@ -111,51 +724,296 @@ def _clear_dates_for_course(course_key, keep=None):
     Arguments:
         course_key: either a CourseKey or string representation of same
         keep: an iterable of ContentDate ids to keep active
+
+    Returns:
+        the number of ContentDates deactivated
     """
-    course_key = _ensure_key(CourseKey, course_key)
+    course_key = ensure_key(CourseKey, course_key)
     dates = models.ContentDate.objects.filter(course_id=course_key, active=True)
     if keep:
         dates = dates.exclude(id__in=keep)
-    dates.update(active=False)
+    _set_enabled_for_course(course_key, bool(keep))
+    return dates.update(active=False)
+
+
+def _filter_content_dates(content_dates, allow_relative_dates, subsection_and_higher_only):
+    """
+    Return the CourseDateRecords that _content_date_records would have returned for these arguments.
+    """
+    strict = _use_strict_block_type_filter()
+    return [
+        cdate for cdate in content_dates
+        if (allow_relative_dates or cdate.rel_date is None) and (
+            not subsection_and_higher_only or cdate.block_type in SUBSECTION_AND_HIGHER_BLOCK_TYPES or
+            (cdate.block_type is None and not strict)
+        )
+    ]
+
+
+def warm_dates_cache_for_course(course_key, published_version, force=False):
+    """
+    Precompute and cache the course-wide dates for a newly published course version.
+
+    Every cache key includes the published version, so right after a publish they are all cold. Call this
+    from the publish handler (after set_dates_for_course) or the warm_course_dates_cache management command
+    so learners' first requests find the ContentDates, and the course-wide (not user-specific) dates, already
+    cached for every variant: with and without relative dates, and with and without subsection_and_higher_only.
+
+    Arguments:
+        course_key: either a CourseKey or string representation of same
+        published_version: string representing the ID of the course's published version
+        force: if True, recompute the entries even if they are already cached
+
+    Returns:
+        the number of cache entries written
+    """
+    course_key = ensure_key(CourseKey, course_key)
+    course_generation = get_course_generation(course_key)
+    written = 0
+    all_content_dates = None
+
+    for allow_relative_dates in (False, True):
+        rel_lookup = {} if allow_relative_dates else {'policy__rel_date': None}
+        for subsection_and_higher_only in (False, True):
+            raw_results_cache_key = _content_dates_cache_key(
+                course_key, rel_lookup, subsection_and_higher_only, published_version, course_generation
+            )
+            processed_results_cache_key = _processed_results_cache_key(
+                course_key, None, None, allow_relative_dates, subsection_and_higher_only, published_version,
+                course_generation=course_generation,
+            )
+            if not force and get_cached(processed_results_cache_key).is_found:
+                continue
+
+            if all_content_dates is None:
+                # A single query serves every variant; they are all subsets of the course's active dates.
+                all_content_dates = _content_date_records(course_key, {}, False)
+
+            qset = get_or_compute(
+                raw_results_cache_key,
+                partial(_filter_content_dates, all_content_dates, allow_relative_dates, subsection_and_higher_only),
+                use_cached=not force,
+            )
+            set_cached(processed_results_cache_key, _process_dates(course_key, qset, None))
+            written += 2
+
+    return written
+
+
+def _get_end_dates_from_content_dates(qset):
+    """
+    Get end and cutoff dates from a list of CourseDateRecords.
+    """
+    end_content_date = list(filter(lambda cd: cd.location.block_type == 'course' and cd.field == 'end', qset))
+    if not end_content_date:
+        return None, None
+
+    end_datetime = end_content_date[0].abs_date
+
+    # Note the date where a learner has just enough time to hit every due date before the course ends on them.
+    # (this is to prevent a learner starting a course a week from end date and having 8 weeks of homework due in 1)
+    last_date = max((cd.rel_date for cd in qset if cd.field == 'due' and cd.rel_date), default=None)
+    cutoff_datetime = end_datetime - last_date if last_date else end_datetime
+
+    return end_datetime, cutoff_datetime
+
+
+def _processed_results_cache_key(
+        course_id, user_id, schedule, allow_relative_dates,
+        subsection_and_higher_only, published_version, override_generation=None, user_overlay_only=False,
+        course_generation=None,
+):  # pylint: disable=too-many-positional-arguments
+    """
+    Construct the cache key, incorporating all parameters which would cause a different query set to be returned.
+
+    For a user, pass the generation of their overrides (from get_override_generation), so new overrides show up.
+    Pass the course's generation (from get_course_generation), so dates written without a new published version
+    show up too.
+    """
+    cache_key = 'course_dates.%s' % course_id
+    if course_generation is not None:
+        cache_key += '.dates-%s' % course_generation
+    if user_id:
+        cache_key += '.%s' % user_id
+    if override_generation is not None:
+        cache_key += '.overrides-%s' % override_generation
+    if schedule:
+        cache_key += '.schedule-%s' % schedule.start_date
+    if allow_relative_dates:
+        cache_key += '.with-rel-dates'
+    if subsection_and_higher_only:
+        # cache key incremented with ".v2" so we don't mix buggy cached data with fixed data
+        cache_key += '.subsection_and_higher_only.v2'
+        if _use_strict_block_type_filter():
+            # The strict filter leaves out rows without a block_type.
+            cache_key += '.strict'
+    if user_overlay_only:
+        cache_key += '.overlay'
+    cache_key += '.%s' % published_version if published_version else ''
+    return cache_key
+
+
+def _content_dates_queryset(course_id, rel_lookup, subsection_and_higher_only):
+    """
+    Return the values_list queryset of the columns of a course's active ContentDates that get_dates_for_course reads.
+
+    Build CourseDateRecords from its rows, or use _content_date_records.
+    """
+    qset = models.ContentDate.objects.filter(course_id=course_id, active=True, **rel_lookup)
+    if subsection_and_higher_only:
+        if _use_strict_block_type_filter():
+            qset = qset.filter(block_type__in=SUBSECTION_AND_HIGHER_BLOCK_TYPES)
+        else:
+            # Include NULL block_type values as well because of lazy rollout.
+            qset = qset.filter(
+                Q(block_type__in=SUBSECTION_AND_HIGHER_BLOCK_TYPES) |
+                Q(block_type__isnull=True)
+            )
+
+    return qset.values_list(*_COURSE_DATE_RECORD_COLUMNS)
+
+
+def _content_date_records(course_id, rel_lookup, subsection_and_higher_only):
+    """
+    Return the list of CourseDateRecords for _content_dates_queryset's rows.
+    """
+    return [
+        CourseDateRecord._make(row)
+        for row in _content_dates_queryset(course_id, rel_lookup, subsection_and_higher_only)
+    ]
+
+
+def _user_dates_queryset(course_id, user_id):
+    """
+    Return the queryset of a user's overrides in a course, oldest first, so later overrides win.
+
+    This can include overrides of ContentDates that _process_dates wasn't given (they are skipped there).
+    """
+    if _use_user_date_course_id():
+        # Single-table lookup on (user_id, course_id); the ContentDates passed to _process_dates
+        # stand in for the join on active dates.
+        userdates = models.UserDate.objects.filter(user_id=user_id, course_id=course_id)
+    else:
+        userdates = models.UserDate.objects.filter(
+            user_id=user_id,
+            content_date__course_id=course_id,
+            content_date__active=True,
+        )
+    return userdates.order_by('modified')
+
+
+def _user_date_actual_date(userdate, policy, get_user_schedule):
+    """
+    Return the normalized date of a user override.
+
+    This matches UserDate.actual_date, but takes the ContentDate's policy (a DatePolicy or a CourseDateRecord)
+    and a callable returning the user's schedule from the caller, instead of querying for them.
+    """
+    if userdate.abs_date:
+        return userdate.abs_date
+
+    schedule = get_user_schedule()
+    policy_date = models.actual_policy_date(policy.abs_date, policy.rel_date, schedule)
+    if schedule and userdate.rel_date:
+        return policy_date + userdate.rel_date
+    return policy_date
+
+
+def _process_dates(
+        course_id, content_dates, schedule, userdates=(), get_user_schedule=None, user_overlay_only=False,
+):  # pylint: disable=too-many-positional-arguments
+    """
+    Build the get_dates_for_course dictionary from a course's ContentDates and a user's overrides.
+
+    This is shared by the sync and async APIs, which only differ in how they fetch these inputs.
+
+    Arguments:
+        course_id: a CourseKey
+        content_dates: list of CourseDateRecords
+        schedule: Schedule obj or None, used for relative date calculations
+        userdates: iterable of the user's UserDates, oldest first
+        get_user_schedule: callable returning the user's own Schedule (for relative overrides)
+        user_overlay_only: if True, leave out the absolute dates, which are the same for every user
+    """
+    dates = {}
+    policies = {}
+    end_datetime, cutoff_datetime = _get_end_dates_from_content_dates(content_dates)
+
+    for cdate in content_dates:
+        key = (map_into_course(cdate.location, course_id), cdate.field)
+        policies[cdate.id] = (key, cdate)
+        if user_overlay_only and cdate.rel_date is None:
+            continue
+        try:
+            dates[key] = models.actual_policy_date(
+                cdate.abs_date, cdate.rel_date, schedule, end_datetime, cutoff_datetime
+            )
+        except models.MissingScheduleError:
+            # We had a relative date but no schedule. This is permissible in some cases (staff users viewing a course
+            # they are not enrolled in, for example). Just let it go by.
+            pass
+
+    for userdate in userdates:
+        if userdate.content_date_id not in policies:
+            # An override of an inactive date, or one filtered out of this result.
+            continue
+        key, cdate = policies[userdate.content_date_id]
+        try:
+            dates[key] = _user_date_actual_date(userdate, cdate, get_user_schedule)
+        except ValueError:
+            log.warning("Unable to read date for %s, %s", cdate.location, cdate.field, exc_info=True)
 
+    return dates
 
-def _get_end_dates_from_content_dates(qset):
+
+def _get_user_id(user):
     """
-    Get end and cutoff dates from a queryset of ContentDates.
+    Return the user id for an int or User object; '' for anonymous users and None for no user.
     """
-    end_content_date = list(filter(lambda cd: cd.location.block_type == 'course' and cd.field == 'end', qset))
-    if not end_content_date:
-        return None, None
-
-    end_datetime = end_content_date[0].policy.abs_date
-
-    # Note the date where a learner has just enough time to hit every due date before the course ends on them.
-    # (this is to prevent a learner starting a course a week from end date and having 8 weeks of homework due in 1)
-    last_date = max((cd.policy.rel_date for cd in qset if cd.field == 'due' and cd.policy.rel_date), default=None)
-    cutoff_datetime = end_datetime - last_date if last_date else end_datetime
-
-    return end_datetime, cutoff_datetime
+    if not user:
+        return None
+    if isinstance(user, int):
+        return user
+    return user.id if not user.is_anonymous else ''
 
 
-def _processed_results_cache_key(
-        course_id, user_id, schedule, allow_relative_dates,
-        subsection_and_higher_only, published_version
+def _compute_dates_for_course(
+        course_id, user_id, schedule, allow_relative_dates, subsection_and_higher_only, published_version,
+        use_cached=True, get_user_schedule=None, user_overlay_only=False, cache_content_dates=True,
 ):  # pylint: disable=too-many-positional-arguments
     """
-    Construct the cache key, incorporating all parameters which would cause a different query set to be returned.
+    Compute get_dates_for_course's result from resolved arguments, bypassing the processed results cache.
+
+    Unlike get_dates_for_course, this doesn't depend on the current request (for the relative dates flag),
+    so it is safe to run outside of the request's thread. Unless cache_content_dates, the course's ContentDates
+    are read from the database rather than the cache, and not cached (see _publish_in_progress).
     """
-    cache_key = 'course_dates.%s' % course_id
+    rel_lookup = {} if allow_relative_dates else {'policy__rel_date': None}
+
+    # If more possible permutations are added to rel_lookup, be sure to also add
+    # to cache invalidation in clear_dates_for_course. This is only safe to do
+    # because a) we serialize to cache with pickle; b) we don't write to
+    # ContentDate in this function; This is not a great long-term solution.
+    raw_results_cache_key = _content_dates_cache_key(
+        course_id, rel_lookup, subsection_and_higher_only, published_version, get_course_generation(course_id)
+    )
+    load_content_dates = partial(_content_date_records, course_id, rel_lookup, subsection_and_higher_only)
+    if not cache_content_dates:
+        qset = load_content_dates()
+    else:
+        qset = get_or_compute(
+            raw_results_cache_key,
+            load_content_dates,
+            use_cached=use_cached,
+            # A course's dates only change when it is published, so a version's dates are safe to serve stale.
+            allow_stale=published_version is not None,
+        )
+
+    userdates = ()
     if user_id:
-        cache_key += '.%s' % user_id
-    if schedule:
-        cache_key += '.schedule-%s' % schedule.start_date
-    if allow_relative_dates:
-        cache_key += '.with-rel-dates'
-    if subsection_and_higher_only:
-        # cache key incremented with ".v2" so we don't mix buggy cached data with fixed data
-        cache_key += '.subsection_and_higher_only.v2'
-    cache_key += '.%s' % published_version if published_version else ''
-    return cache_key
+        userdates = _user_dates_queryset(course_id, user_id)
+
+    return _process_dates(course_id, qset, schedule, userdates, get_user_schedule, user_overlay_only)
 
 
 # TODO: Record dates for every block in the course, not just the ones where the block
@@ -181,16 +1039,42 @@ def get_dates_for_course(
             level and higher (i.e. course, section (chapter), subsection (sequential)).
         published_version: (optional) string representing the ID of the course's published version
     """
-    course_id = _ensure_key(CourseKey, course_id)
+    return _get_dates_for_course(
+        course_id, user, use_cached, schedule, subsection_and_higher_only, published_version,
+    )
+
+
+def get_user_dates_overlay(course_id, user, use_cached=True, published_version=None):
+    """
+    Return the part of get_dates_for_course's dictionary for the user that differs between users.
+
+    That is the user's relative dates and overrides: get_dates_for_course(course_id, user) is the same as
+    get_dates_for_course(course_id) (which is the same for every user) updated with this dictionary. Callers
+    holding the course-wide dates for many users can share them, and keep only this small part per user.
+
+    Arguments:
+        course_id: either a CourseKey or string representation of same
+        user: an int (user_id), or a User object
+        use_cached: bool (optional) - skips cache lookups (but not saves) if False
+        published_version: (optional) string representing the ID of the course's published version
+    """
+    return _get_dates_for_course(
+        course_id, user, use_cached, None, False, published_version, user_overlay_only=True,
+    )
+
+
+def _get_dates_for_course(
+        course_id, user, use_cached, schedule, subsection_and_higher_only, published_version,
+        user_overlay_only=False,
+):  # pylint: disable=too-many-positional-arguments
+    """
+    Return get_dates_for_course's dictionary, or with user_overlay_only, get_user_dates_overlay's.
+    """
+    course_id = ensure_key(CourseKey, course_id)
     log.debug("Getting dates for %s as %s", course_id, user)
     allow_relative_dates = _are_relative_dates_enabled(course_id)
 
-    user_id = None
-    if user:
-        if isinstance(user, int):
-            user_id = user
-        else:
-            user_id = user.id if not user.is_anonymous else ''
+    user_id = _get_user_id(user)
 
     if schedule is None and user is not None and user_id != '':
         schedule = get_schedule_for_user(user_id, course_id, use_cached=use_cached)
@@ -198,79 +1082,292 @@ def get_dates_for_course(
     # Construct the cache key, incorporating all parameters which would cause a different
     # query set to be returned.
     processed_results_cache_key = _processed_results_cache_key(
-        course_id, user_id, schedule, allow_relative_dates, subsection_and_higher_only, published_version
+        course_id, user_id, schedule, allow_relative_dates, subsection_and_higher_only, published_version,
+        get_override_generation(course_id, user_id) if user_id else None, user_overlay_only,
+        course_generation=get_course_generation(course_id),
+    )
+
+    compute = partial(
+        _compute_dates_for_course,
+        course_id, user_id, schedule, allow_relative_dates, subsection_and_higher_only, published_version,
+        use_cached=use_cached, get_user_schedule=partial(get_schedule_for_user, user_id, course_id),
+        user_overlay_only=user_overlay_only,
+    )
+    if use_cached:
+        cached_response = get_cached(processed_results_cache_key)
+        if cached_response.is_found:
+            return cached_response.value
+    if _publish_in_progress(course_id):
+        # A chunked publish is part way through, so don't cache the dates it has only partly written.
+        return compute(cache_content_dates=False)
+
+    return get_or_compute(
+        processed_results_cache_key,
+        compute,
+        use_cached=use_cached,
+        # The key changes with the published version, the schedule and the overrides, so it's safe to serve stale.
+        allow_stale=published_version is not None,
     )
 
-    dates = None
-    cached_response = TieredCache.get_cached_response(processed_results_cache_key)
-    if cached_response.is_found:
-        dates = cached_response.value
 
-    if use_cached and dates is not None:
+def _can_prefetch_in_parallel():
+    """
+    Return whether worker threads, each with its own database connection, will see the same data as this thread.
+    """
+    connection = transaction.get_connection()
+    # Workers can't see this thread's uncommitted writes, and SQLite connections don't share well across threads.
+    return not connection.in_atomic_block and connection.vendor != 'sqlite'
+
+
+def _compute_dates_in_worker(cache_key, args, schedule, abandoned):
+    """
+    Run _compute_dates_for_course in a worker thread, cleaning up the thread's caches and connections afterwards.
+
+    The worker caches the dates itself, since the caller may have stopped waiting for them. Once it has
+    (abandoned is set), workers that haven't started return None without querying.
+    """
+    try:
+        if abandoned.is_set():
+            return None
+        dates = _compute_dates_for_course(*args, get_user_schedule=lambda: schedule)
+        set_cached(cache_key, dates)
         return dates
+    finally:
+        RequestCache.clear_all_namespaces()
+        connections.close_all()
 
-    rel_lookup = {} if allow_relative_dates else {'policy__rel_date': None}
 
-    # If more possible permutations are added to rel_lookup, be sure to also add
-    # to cache invalidation in clear_dates_for_course. This is only safe to do
-    # because a) we serialize to cache with pickle; b) we don't write to
-    # ContentDate in this function; This is not a great long-term solution.
-    raw_results_cache_key = _content_dates_cache_key(
-        course_id, rel_lookup, subsection_and_higher_only, published_version
+def prefetch_dates_for_courses(
+        course_ids, user=None, subsection_and_higher_only=False, max_workers=None, timeout=None
+):
+    """
+    Return a dictionary of course_id to get_dates_for_course results, computing uncached courses in parallel.
+
+    This is meant for pages showing many courses at once, like the learner dashboard. Cached courses are read
+    from the cache in one round trip; the rest are computed in a bounded thread pool, where each worker uses (and
+    then closes) its own database connection. The results are stored in all cache tiers, like
+    get_dates_for_course.
+
+    Inside a transaction or on SQLite, uncached courses are computed one at a time in this thread instead.
+
+    Arguments:
+        course_ids: iterable of CourseKeys or string representations of same
+        user: None, an int (user_id), or a User object
+        subsection_and_higher_only: bool (optional) - only returns dates for blocks at the subsection
+            level and higher (i.e. course, section (chapter), subsection (sequential)).
+        max_workers: (optional) maximum number of threads; defaults to EDX_WHEN_PREFETCH_MAX_WORKERS (4)
+        timeout: (optional) seconds to wait for the threads; defaults to EDX_WHEN_PREFETCH_TIMEOUT (10).
+            Courses still being computed by then are left out of the results (their workers cache them once
+            done); courses whose workers hadn't started are computed in this thread.
+    """
+    if max_workers is None:
+        max_workers = getattr(settings, 'EDX_WHEN_PREFETCH_MAX_WORKERS', 4)
+    if timeout is None:
+        timeout = getattr(settings, 'EDX_WHEN_PREFETCH_TIMEOUT', 10)
+
+    user_id = _get_user_id(user)
+    course_ids = [ensure_key(CourseKey, course_id) for course_id in course_ids]
+    # The flag and the schedules depend on the current request, so resolve them here rather than in the workers.
+    relative_dates_enabled = _are_relative_dates_enabled_for_courses(course_ids)
+    schedules = get_schedules_for_courses(user_id, course_ids) if user_id else {}
+    generations = get_course_generations(course_ids, user_id)
+    cache_keys = {}
+    for course_id in course_ids:
+        course_generation, override_generation = generations[course_id]
+        cache_keys[course_id] = _processed_results_cache_key(
+            course_id, user_id, schedules.get(course_id), relative_dates_enabled[course_id],
+            subsection_and_higher_only, None, override_generation, course_generation=course_generation,
+        )
+    cached = get_many_cached(cache_keys.values())
+
+    results = {}
+    misses = []
+    for course_id, cache_key in cache_keys.items():
+        if cache_key in cached:
+            results[course_id] = cached[cache_key]
+            continue
+        schedule = schedules.get(course_id)
+        args = (course_id, user_id, schedule, relative_dates_enabled[course_id], subsection_and_higher_only, None)
+        if _publish_in_progress(course_id):
+            # Like get_dates_for_course, don't cache a course part way through a chunked publish.
+            results[course_id] = _compute_dates_for_course(
+                *args, get_user_schedule=lambda schedule=schedule: schedule, cache_content_dates=False
+            )
+        else:
+            misses.append((cache_key, args, schedule))
+
+    futures = {}
+    if len(misses) > 1 and max_workers > 1 and _can_prefetch_in_parallel():
+        abandoned = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(misses)), thread_name_prefix='edx-when')
+        try:
+            futures = {
+                cache_key: executor.submit(_compute_dates_in_worker, cache_key, args, schedule, abandoned)
+                for cache_key, args, schedule in misses
+            }
+            _, not_done = wait(futures.values(), timeout=timeout)
+            if not_done:
+                log.warning('Timed out prefetching dates for %d courses', len(not_done))
+        finally:
+            # Queued courses are cancelled, and workers that are just starting skip theirs, so no thread opens a
+            # connection for a course after this. Workers still running finish their course and close theirs.
+            abandoned.set()
+            for future in futures.values():
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    for cache_key, args, schedule in misses:
+        future = futures.get(cache_key)
+        dates = None
+        if future is not None and not future.cancelled():
+            if not future.done():
+                # Its worker caches the dates once it's done, so don't compute them a second time here.
+                continue
+            dates = future.result()
+        if dates is None:
+            dates = _compute_dates_for_course(*args, get_user_schedule=lambda schedule=schedule: schedule)
+            set_cached(cache_key, dates)
+        else:
+            # The worker cached them in the shared cache, but its request cache was its own.
+            DEFAULT_REQUEST_CACHE.set(cache_key, dates)
+        results[args[0]] = dates
+
+    return {course_id: results[course_id] for course_id in course_ids if course_id in results}
+
+
+async def aget_dates_for_course(
+        course_id,
+        user=None, use_cached=True, schedule=None,
+        subsection_and_higher_only=False, published_version=None
+):  # pylint: disable=too-many-positional-arguments
+    """
+    Async version of get_dates_for_course, for ASGI views. Takes the same arguments and returns the same dictionary.
+
+    It shares the django cache entries with get_dates_for_course, but not the request cache: that is
+    thread-local, so it doesn't isolate requests sharing an event loop. The ContentDates, the user's
+    overrides and (when a schedule is passed in) the user's own schedule are fetched concurrently.
+    """
+    course_id = ensure_key(CourseKey, course_id)
+    allow_relative_dates = await sync_to_async(_are_relative_dates_enabled)(course_id, memoize=False)
+    return await _aget_dates_for_course(
+        course_id, user, use_cached, schedule, subsection_and_higher_only, published_version, allow_relative_dates
+    )
+
+
+async def _aget_dates_for_course(
+        course_id, user, use_cached, schedule, subsection_and_higher_only, published_version, allow_relative_dates
+):  # pylint: disable=too-many-positional-arguments
+    """
+    Return aget_dates_for_course's results, once it has resolved whether the course may use relative dates.
+    """
+    log.debug("Getting dates for %s as %s", course_id, user)
+    user_id = _get_user_id(user)
+
+    schedule_passed = schedule is not None
+    if not schedule_passed and user_id:
+        schedule = await aget_schedule_for_user(user_id, course_id)
+
+    course_generation = await aget_course_generation(course_id)
+    processed_results_cache_key = _processed_results_cache_key(
+        course_id, user_id, schedule, allow_relative_dates, subsection_and_higher_only, published_version,
+        await aget_override_generation(course_id, user_id) if user_id else None,
+        course_generation=course_generation,
     )
-    qset = None
     if use_cached:
-        cached_response = TieredCache.get_cached_response(raw_results_cache_key)
+        cached_response = await aget_cached(processed_results_cache_key, allow_stale=published_version is not None)
         if cached_response.is_found:
-            qset = cached_response.value
-    if qset is None:
-        qset = models.ContentDate.objects.filter(course_id=course_id, active=True, **rel_lookup)
-        if subsection_and_higher_only:
-            # Include NULL block_type values as well because of lazy rollout.
-            qset = qset.filter(
-                Q(block_type__in=('course', 'chapter', 'sequential')) |
-                Q(block_type__isnull=True)
-            )
+            return cached_response.value
 
-        qset = list(
-            qset.select_related('policy')
-                .only(
-                    "course_id", "policy__rel_date",
-                    "policy__abs_date", "location", "field"
-                )
+    rel_lookup = {} if allow_relative_dates else {'policy__rel_date': None}
+    raw_results_cache_key = _content_dates_cache_key(
+        course_id, rel_lookup, subsection_and_higher_only, published_version, course_generation
+    )
+    # Like get_dates_for_course, don't cache a course part way through a chunked publish.
+    publishing = await django_cache.aget(_publishing_cache_key(course_id)) is not None
+
+    async def _content_dates():
+        if use_cached and not publishing:
+            cached_response = await aget_cached(raw_results_cache_key, allow_stale=published_version is not None)
+            if cached_response.is_found:
+                return cached_response.value
+        qset = [
+            CourseDateRecord._make(row)
+            async for row in _content_dates_queryset(course_id, rel_lookup, subsection_and_higher_only)
+        ]
+        if not publishing:
+            await aset_cached(raw_results_cache_key, qset)
+        return qset
+
+    async def _userdates():
+        if not user_id:
+            return []
+        return [userdate async for userdate in _user_dates_queryset(course_id, user_id)]
+
+    async def _user_schedule():
+        # Overrides are relative to the user's own schedule, even when another one was passed in.
+        if user_id and schedule_passed:
+            return await aget_schedule_for_user(user_id, course_id)
+        return schedule
+
+    qset, userdates, user_schedule = await asyncio.gather(_content_dates(), _userdates(), _user_schedule())
+
+    dates = _process_dates(course_id, qset, schedule, userdates, lambda: user_schedule)
+    if not publishing:
+        await aset_cached(processed_results_cache_key, dates)
+    return dates
+
+
+async def aget_dates_for_courses(course_ids, user=None, use_cached=True, subsection_and_higher_only=False):
+    """
+    Return a dictionary of course_id to aget_dates_for_course results, fetching all the courses concurrently.
+
+    Arguments:
+        course_ids: iterable of CourseKeys or string representations of same
+        user: None, an int (user_id), or a User object
+        use_cached: bool (optional) - skips cache lookups (but not saves) if False
+        subsection_and_higher_only: bool (optional) - only returns dates for blocks at the subsection
+            level and higher (i.e. course, section (chapter), subsection (sequential)).
+    """
+    course_ids = [ensure_key(CourseKey, course_id) for course_id in course_ids]
+    # One trip to a sync thread resolves the flag for every course.
+    relative_dates_enabled = await sync_to_async(_are_relative_dates_enabled_for_courses)(course_ids, memoize=False)
+    results = await asyncio.gather(*(
+        _aget_dates_for_course(
+            course_id, user, use_cached, None, subsection_and_higher_only, None, relative_dates_enabled[course_id]
         )
-        TieredCache.set_all_tiers(raw_results_cache_key, qset)
+        for course_id in course_ids
+    ))
+    return dict(zip(course_ids, results))
 
-    dates = {}
-    policies = {}
-    end_datetime, cutoff_datetime = _get_end_dates_from_content_dates(qset)
 
-    for cdate in qset:
-        key = (cdate.location.map_into_course(course_id), cdate.field)
-        try:
-            dates[key] = cdate.policy.actual_date(schedule, end_datetime, cutoff_datetime)
-        except models.MissingScheduleError:
-            # We had a relative date but no schedule. This is permissible in some cases (staff users viewing a course
-            # they are not enrolled in, for example). Just let it go by.
-            pass
-        policies[cdate.id] = key
+def get_dates_version(course_id, user=None, subsection_and_higher_only=False, published_version=None):
+    """
+    Return an opaque version string that changes whenever get_dates_for_course's result for the same arguments would.
 
-    if user_id:
-        for userdate in models.UserDate.objects.filter(
-            user_id=user_id,
-            content_date__course_id=course_id,
-            content_date__active=True,
-        ).select_related(
-            'content_date', 'content_date__policy'
-        ).order_by('modified'):
-            try:
-                dates[policies[userdate.content_date_id]] = userdate.actual_date
-            except (ValueError, ObjectDoesNotExist, KeyError):
-                log.warning("Unable to read date for %s", userdate.content_date, exc_info=True)
+    This is much cheaper than computing the dates, so callers can use it for conditional requests (e.g. an ETag):
+    it is built from the cached course state and override generation rather than from the dates themselves.
+
+    Arguments:
+        course_id: either a CourseKey or string representation of same
+        user: None, an int (user_id), or a User object
+        subsection_and_higher_only: bool (optional) - whether the dates are limited to subsections and higher
+        published_version: (optional) string representing the ID of the course's published version
+    """
+    course_id = ensure_key(CourseKey, course_id)
+    parts = [str(course_id), str(bool(subsection_and_higher_only))]
+    # Every write of the course's dates moves its generation on, whether or not it publishes a new version.
+    parts.extend(str(value) for value in get_course_dates_state(course_id))
+    if published_version:
+        parts.append(published_version)
 
-    TieredCache.set_all_tiers(processed_results_cache_key, dates)
+    user_id = _get_user_id(user)
+    if user_id:
+        schedule = get_schedule_for_user(user_id, course_id)
+        if schedule:
+            parts.extend((str(schedule.created), str(schedule.start_date)))
+        parts.append(str(get_override_generation(course_id, user_id)))
 
-    return dates
+    return hashlib.md5(':'.join(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
 
 
 def get_date_for_block(course_id, block_id, name='due', user=None, published_version=None):
@@ -288,13 +1385,25 @@ def get_date_for_block(course_id, block_id, name='due', user=None, published_ver
         return get_dates_for_course(
             course_id, user=user, published_version=published_version
         ).get(
-            (_ensure_key(UsageKey, block_id), name),
+            (ensure_key(UsageKey, block_id), name),
             None
         )
     except InvalidKeyError:
         return None
 
 
+async def aget_date_for_block(course_id, block_id, name='due', user=None, published_version=None):
+    """
+    Async version of get_date_for_block.
+    """
+    try:
+        dates = await aget_dates_for_course(course_id, user=user, published_version=published_version)
+        return dates.get((ensure_key(UsageKey, block_id), name), None)
+    except InvalidKeyError:
+        return None
+
+
+@_read_api
 def get_overrides_for_block(course_id, block_id):
     """
     Return list of date overrides for a block.
@@ -306,14 +1415,14 @@ def get_overrides_for_block(course_id, block_id):
     Returns:
         list of (username, full_name, date, email, location)
     """
-    course_id = _ensure_key(CourseKey, course_id)
-    block_id = _ensure_key(UsageKey, block_id)
+    course_id = ensure_key(CourseKey, course_id)
+    block_id = ensure_key(UsageKey, block_id)
 
-    query = models.UserDate.objects.filter(
+    query = models.UserDate.objects.using(_read_database('get_overrides_for_block')).filter(
         content_date__course_id=course_id,
         content_date__location=block_id,
         content_date__active=True,
-    ).order_by('-modified')
+    ).select_related('content_date', 'content_date__policy', *_user_select_related()).order_by('-modified')
     dates = []
     users = set()
     for udate in query:
@@ -344,13 +1453,14 @@ def get_overrides_for_user(course_id, user):
     Returns:
         iterator of {'location': location, 'actual_date': date}
     """
-    course_id = _ensure_key(CourseKey, course_id)
+    course_id = ensure_key(CourseKey, course_id)
 
-    query = models.UserDate.objects.filter(
-        content_date__course_id=course_id,
+    # This is a generator, which runs as the caller iterates, so pick the database for the query itself.
+    query = models.UserDate.objects.using(_read_database('get_overrides_for_user')).filter(
         user=user,
         content_date__active=True,
-    ).order_by('-modified')
+        **_user_date_course_lookup(course_id)
+    ).select_related('content_date').order_by('-modified')
     blocks = set()
     for udate in query:
         if udate.content_date.location in blocks:
@@ -360,6 +1470,39 @@ def get_overrides_for_user(course_id, user):
         yield {'location': udate.content_date.location, 'actual_date': udate.actual_date}
 
 
+async def aget_overrides_for_user(course_id, user):
+    """
+    Async version of get_overrides_for_user.
+
+    Returns:
+        async iterator of {'location': location, 'actual_date': date}
+    """
+    course_id = ensure_key(CourseKey, course_id)
+    user_id = _get_user_id(user)
+
+    query = models.UserDate.objects.using(_read_database('get_overrides_for_user')).filter(
+        user_id=user_id,
+        content_date__active=True,
+        **_user_date_course_lookup(course_id)
+    ).select_related('content_date', 'content_date__policy').order_by('-modified')
+
+    schedule = None
+    schedule_loaded = False
+    blocks = set()
+    async for udate in query:
+        location = udate.content_date.location
+        if location in blocks:
+            continue
+        blocks.add(location)
+
+        if not udate.abs_date and not schedule_loaded:
+            schedule = await aget_schedule_for_user(user_id, course_id)
+            schedule_loaded = True
+        actual_date = _user_date_actual_date(udate, udate.content_date.policy, lambda: schedule)
+        yield {'location': location, 'actual_date': actual_date}
+
+
+@_read_api
 def get_overrides_for_course(course_id):
     """
     Return all date overrides for a particular course.
@@ -370,12 +1513,12 @@ def get_overrides_for_course(course_id):
     Returns:
         list of (username, full_name, email, location, date)
     """
-    course_id = _ensure_key(CourseKey, course_id)
+    course_id = ensure_key(CourseKey, course_id)
 
-    query = models.UserDate.objects.filter(
+    query = models.UserDate.objects.using(_read_database('get_overrides_for_course')).filter(
         content_date__course_id=course_id,
         content_date__active=True,
-    ).order_by('-modified')
+    ).select_related('content_date', 'content_date__policy', *_user_select_related()).order_by('-modified')
 
     dates = []
     seen = set()
@@ -400,6 +1543,101 @@ def get_overrides_for_course(course_id):
     return dates
 
 
+def _user_select_related():
+    """
+    Return the select_related() paths needed to read a UserDate's user details without extra queries.
+
+    The user profile (for the full name) only exists when running inside edx-platform.
+    """
+    try:
+        get_user_model()._meta.get_field('profile')
+    except FieldDoesNotExist:
+        return ('user',)
+    return ('user', 'user__profile')
+
+
+@_read_api
+def get_overrides_page(course_id, after_id=0, page_size=OVERRIDES_PAGE_SIZE, block_id=None, user=None):
+    """
+    Return one page of the latest date overrides in a course, ordered by UserDate id.
+
+    Pages are fetched by key (UserDate id) rather than offset, so every page costs the same however
+    deep into the course's overrides it is. Only the latest override for each user and block is included.
+
+    Arguments:
+        course_id: either a CourseKey or string representation of same
+        after_id: only include overrides with a UserDate id greater than this (the previous page's next_after_id)
+        page_size: maximum number of overrides to return
+        block_id: (optional) only include overrides for this block; a UsageKey or string representation of same
+        user: (optional) only include overrides for this user; an int (user_id) or a User object
+
+    Returns:
+        (list of (username, full_name, email, location, date), next_after_id);
+        next_after_id is None on the last page
+    """
+    course_id = ensure_key(CourseKey, course_id)
+
+    query = models.UserDate.objects.using(_read_database('get_overrides_page')).filter(
+        content_date__course_id=course_id,
+        content_date__active=True,
+        id__gt=after_id,
+    ).exclude(Exists(models.UserDate.superseding()))
+    if block_id is not None:
+        query = query.filter(content_date__location=ensure_key(UsageKey, block_id))
+    if user is not None:
+        query = query.filter(user_id=_get_user_id(user))
+
+    page = list(
+        query.select_related('content_date', 'content_date__policy', *_user_select_related())
+        .order_by('id')[:page_size]
+    )
+
+    dates = []
+    for udate in page:
+        try:
+            full_name = udate.user.profile.name
+        except AttributeError:
+            full_name = 'unknown'
+        dates.append((udate.user.username, full_name, udate.user.email, udate.content_date.location, udate.actual_date))
+
+    next_after_id = page[-1].id if len(page) == page_size else None
+    return dates, next_after_id
+
+
+def iter_overrides_for_course(course_id, block_id=None, user=None, page_size=OVERRIDES_PAGE_SIZE):
+    """
+    Yield the latest date overrides in a course, reading them from the database one page at a time.
+
+    Unlike get_overrides_for_course, this never holds more than one page of overrides in memory.
+
+    Arguments:
+        course_id: either a CourseKey or string representation of same
+        block_id: (optional) only include overrides for this block; a UsageKey or string representation of same
+        user: (optional) only include overrides for this user; an int (user_id) or a User object
+        page_size: number of overrides to fetch per query
+
+    Yields:
+        (username, full_name, email, location, date)
+    """
+    after_id = 0
+    while after_id is not None:
+        dates, after_id = get_overrides_page(
+            course_id, after_id=after_id, page_size=page_size, block_id=block_id, user=user
+        )
+        yield from dates
+
+
+def _date_kwargs(date_or_timedelta):
+    """
+    Return the DatePolicy or UserDate fields for an absolute date, a relative date, or None.
+    """
+    if date_or_timedelta is None:
+        return {'rel_date': None, 'abs_date': None}
+    if isinstance(date_or_timedelta, timedelta):
+        return {'rel_date': date_or_timedelta}
+    return {'abs_date': date_or_timedelta}
+
+
 def set_date_for_block(
         course_id, block_id, field, date_or_timedelta,
         user=None, reason='', actor=None
@@ -415,19 +1653,15 @@ def set_date_for_block(
     Returns:
         a unique id for this block date
     """
-    course_id = _ensure_key(CourseKey, course_id)
-    block_id = _ensure_key(UsageKey, block_id)
-
-    if date_or_timedelta is None:
-        date_kwargs = {'rel_date': None, 'abs_date': None}
-    elif isinstance(date_or_timedelta, timedelta):
-        date_kwargs = {'rel_date': date_or_timedelta}
-    else:
-        date_kwargs = {'abs_date': date_or_timedelta}
+    _note_write()
+    course_id = ensure_key(CourseKey, course_id)
+    block_id = ensure_key(UsageKey, block_id)
+    date_kwargs = _date_kwargs(date_or_timedelta)
 
     def _set_content_date_policy(date_kwargs, existing_content_date):
         # Race conditions were creating multiple DatePolicies w/ the same values. Handle that case.
-        existing_policies = list(models.DatePolicy.objects.filter(**date_kwargs).order_by('id'))
+        # Like _get_or_create_policies, lock the policy so compaction can't delete it before it's used.
+        existing_policies = list(models.DatePolicy.objects.filter(**date_kwargs).select_for_update().order_by('id'))
         if existing_policies:
             existing_content_date.policy = existing_policies[0]
         else:
@@ -447,6 +1681,7 @@ def set_date_for_block(
             existing_date = models.ContentDate(course_id=course_id, location=block_id, field=field)
             _set_content_date_policy(date_kwargs, existing_date)
             needs_save = True
+        activated = needs_save
 
         # Determine if ourse block date is for a particular user -or- for the course in general.
         if user and not user.is_anonymous:
@@ -479,11 +1714,99 @@ def set_date_for_block(
             existing_date.block_type = block_id.block_type
             needs_save = True
 
-        if needs_save:
+        if existing_date.pk is None:
+            # Upsert rather than insert, in case a concurrent publish has just created the same date.
+            _upsert_content_dates([existing_date], ('active', 'policy', 'block_type'))
+            if existing_date.pk is None:
+                existing_date.pk = models.ContentDate.objects.values_list('id', flat=True).get(
+                    course_id=course_id, location=block_id, field=field
+                )
+        elif needs_save:
             existing_date.save()
+        if needs_save:
+            bump_course_generation(course_id)
+        if activated:
+            _set_enabled_for_course(course_id, True)
         return existing_date.id
 
 
+def set_dates_for_users(
+        course_id, block_id, field, dates_by_user, reason='', actor=None
+):  # pylint: disable=too-many-positional-arguments
+    """
+    Save date overrides for a block for many users at once, like set_date_for_block(..., user=user) for each.
+
+    The ContentDate and the users' schedules are loaded once, each override is validated in memory (with the
+    same rules as UserDate.clean), and the valid ones are saved in bulk. Only those users' cached dates change.
+
+    Arguments:
+        course_id: either a CourseKey or string representation of same
+        block_id: either a UsageKey or string representation of same
+        field: the name of the date field (e.g. 'due')
+        dates_by_user: dictionary of user id to the absolute or relative date to set for that user
+        reason: explanation for the overrides
+        actor: user object of person making the overrides
+
+    Returns:
+        a dictionary of user id to the error (InvalidDateError, MissingScheduleError, or the user model's
+        DoesNotExist for unknown user ids) for any override not saved
+    """
+    _note_write()
+    course_id = ensure_key(CourseKey, course_id)
+    block_id = ensure_key(UsageKey, block_id)
+
+    with transaction.atomic():
+        try:
+            content_date = models.ContentDate.objects.select_related('policy').get(
+                course_id=course_id, location=block_id, field=field
+            )
+        except models.ContentDate.DoesNotExist as error:
+            raise MissingDateError(block_id) from error
+        if not content_date.active:
+            content_date.active = True
+            content_date.save()
+            _set_enabled_for_course(course_id, True)
+            bump_course_generation(course_id)
+
+        user_model = get_user_model()
+        # An unknown user would fail the whole bulk insert, so they are reported like invalid dates instead.
+        user_ids = set(user_model.objects.filter(id__in=list(dates_by_user)).values_list('id', flat=True))
+        schedules = get_schedules_for_users(list(user_ids), course_id)
+        user_dates = []
+        errors = {}
+        for user_id, date_or_timedelta in dates_by_user.items():
+            if user_id not in user_ids:
+                errors[user_id] = user_model.DoesNotExist(f'No user with id {user_id}')
+                continue
+            schedule = schedules.get(user_id)
+            user_date = models.UserDate(
+                user_id=user_id,
+                actor=actor,
+                reason=reason or '',
+                content_date=content_date,
+                course_id=course_id,
+                **_date_kwargs(date_or_timedelta)
+            )
+            try:
+                user_date.clean_for_schedule(schedule)
+            except ValidationError:
+                errors[user_id] = InvalidDateError(
+                    _user_date_actual_date(user_date, content_date.policy, lambda schedule=schedule: schedule)
+                )
+            except models.MissingScheduleError as error:
+                errors[user_id] = error
+            else:
+                user_dates.append(user_date)
+
+        models.UserDate.objects.bulk_create(user_dates)
+
+    log.info('Saved %d overrides for loc=%s (%d invalid)', len(user_dates), block_id, len(errors))
+    # bulk_create doesn't call UserDate.save, which does this for single overrides.
+    bump_override_generations(course_id, [user_date.user_id for user_date in user_dates])
+    return errors
+
+
+@_read_api
 def get_schedules_with_due_date(course_id, assignment_date):
     """
     Get all Schedules with assignments due on a specific date for a Course.
@@ -495,6 +1818,8 @@ def get_schedules_with_due_date(course_id, assignment_date):
     Returns:
         a QuerySet of Schedule objects for Users who have content due on the specified assignment_date
     """
+    schedule_model = get_schedule_model()
+    database = _read_database('get_schedules_with_due_date')
     user_ids = models.UserDate.objects.select_related('content_date', 'content_date__policy').annotate(
         computed_date=ExpressionWrapper(
             F('content_date__policy__abs_date') + F('rel_date'),
@@ -505,13 +1830,13 @@ def get_schedules_with_due_date(course_id, assignment_date):
         Q(content_date__policy__abs_date__date=assignment_date, rel_date__isnull=True)
     ).values_list('user_id', flat=True).distinct()
 
-    schedules = Schedule.objects.filter(
+    schedules = schedule_model.objects.filter(
         enrollment__course_id=course_id,
         enrollment__user_id__in=user_ids,
     )
 
     # Get all relative dates for a course, we want them distinct, it doesn't matter how many of each due date there is
-    rel_dates = models.ContentDate.objects.filter(
+    rel_dates = models.ContentDate.objects.using(database).filter(
         course_id=course_id,
         active=True,
         policy__rel_date__isnull=False,
@@ -522,7 +1847,7 @@ def get_schedules_with_due_date(course_id, assignment_date):
 
     if rel_start_dates:
         # Exclude any user that has an overridden date for a course on the specified day so there aren't duplicates
-        schedules = Schedule.objects.filter(
+        schedules = schedule_model.objects.filter(
             enrollment__course_id=course_id,
             enrollment__is_active=True,
             start_date__date__in=rel_start_dates,
@@ -531,7 +1856,7 @@ def get_schedules_with_due_date(course_id, assignment_date):
     # Add in all users with relative dates to exclude from the absolute dates query to prevent duplicates
     user_ids = schedules.all().values_list('enrollment__user_id', flat=True).distinct()
 
-    has_abs_date_on_day = models.ContentDate.objects.filter(
+    has_abs_date_on_day = models.ContentDate.objects.using(database).filter(
         course_id=course_id,
         active=True,
         policy__abs_date__date=assignment_date,
@@ -540,12 +1865,12 @@ def get_schedules_with_due_date(course_id, assignment_date):
     # If there is an absolute day for this specified date for this
     # course, we want all active schedules to receive an email
     if has_abs_date_on_day:
-        schedules = Schedule.objects.filter(
+        schedules = schedule_model.objects.filter(
             enrollment__course_id=course_id,
             enrollment__is_active=True,
         ).exclude(enrollment__user_id__in=user_ids).select_related('enrollment') | schedules
 
-    return schedules
+    return schedules.using(database)
 
 
 class BaseWhenException(Exception):
@@ -558,3 +1883,11 @@ class MissingDateError(BaseWhenException):
 
 class InvalidDateError(BaseWhenException):
     pass
+
+
+class PublishLockTimeout(BaseWhenException):
+    pass
+
+
+class PublishMarkerError(BaseWhenException):
+    pass
@@ -0,0 +1,101 @@
+"""
+Batched, resumable backfills for denormalized edx_when columns.
+
+Each backfill walks its table in primary key order and yields its progress after every batch,
+so a caller can log the last id it reached and pick up from there if it is interrupted.
+"""
+
+import logging
+import time
+from collections import defaultdict
+
+from opaque_keys.edx.django.models import CourseKeyField
+
+from . import models
+
+log = logging.getLogger(__name__)
+
+
+def batched_backfill(model, missing, source_field, target_field, value_for, *, batch_size=1000, start_id=0, sleep=0):
+    """
+    Fill in target_field on the model's rows matching the missing filter, from another column, in id order.
+
+    Arguments:
+        model: the model whose rows to update
+        missing: filter kwargs selecting the rows that still need the column filled in
+        source_field: the field (or lookup across a relation) to read for each row
+        target_field: the field to set
+        value_for: callable returning the target_field value for a source_field value (None to skip the row)
+        batch_size: number of rows to read and update per batch
+        start_id: resume after this id
+        sleep: seconds to pause between batches, to go easy on the database
+
+    Yields:
+        (last_id, updated_count) after every batch
+    """
+    last_id = start_id
+    while True:
+        rows = list(
+            model.objects.filter(id__gt=last_id, **missing)
+            .order_by('id')
+            .values_list('id', source_field)[:batch_size]
+        )
+        if not rows:
+            return
+
+        # Rows sharing a value are updated together, in one query per distinct value.
+        ids_by_value = defaultdict(list)
+        for row_id, source in rows:
+            value = value_for(source)
+            if value is not None:
+                ids_by_value[value].append(row_id)
+
+        updated = 0
+        for value, row_ids in ids_by_value.items():
+            updated += model.objects.filter(id__in=row_ids).update(**{target_field: value})
+
+        last_id = rows[-1][0]
+        log.info('Backfilled %s on %d %s rows, up to id %d', target_field, updated, model.__name__, last_id)
+        yield last_id, updated
+
+        if sleep:
+            time.sleep(sleep)
+
+
+def backfill_userdate_course_id(batch_size=1000, start_id=0, sleep=0, user_date_model=None):
+    """
+    Copy ContentDate.course_id onto the UserDate rows that don't have it yet.
+
+    Arguments:
+        batch_size: number of UserDate rows to read and update per batch
+        start_id: resume after this UserDate id
+        sleep: seconds to pause between batches, to go easy on the database
+        user_date_model: the UserDate model to use (for data migrations, pass the historical model)
+
+    Yields:
+        (last_id, updated_count) after every batch
+    """
+    return batched_backfill(
+        user_date_model or models.UserDate, {'course_id': CourseKeyField.Empty}, 'content_date__course_id',
+        'course_id', lambda course_id: course_id, batch_size=batch_size, start_id=start_id, sleep=sleep,
+    )
+
+
+def backfill_contentdate_block_type(batch_size=1000, start_id=0, sleep=0, content_date_model=None):
+    """
+    Set ContentDate.block_type from the location's block type on the rows that don't have it yet.
+
+    Arguments:
+        batch_size: number of ContentDate rows to read and update per batch
+        start_id: resume after this ContentDate id
+        sleep: seconds to pause between batches, to go easy on the database
+        content_date_model: the ContentDate model to use (for data migrations, pass the historical model)
+
+    Yields:
+        (last_id, updated_count) after every batch
+    """
+    return batched_backfill(
+        content_date_model or models.ContentDate, {'block_type__isnull': True}, 'location', 'block_type',
+        lambda location: location.block_type if location is not None else None,
+        batch_size=batch_size, start_id=start_id, sleep=sleep,
+    )
@@ -0,0 +1,470 @@
+"""
+Caching helpers for edx_when.
+
+These keep values in two tiers, like the TieredCache: the request cache, and the shared django cache. On top
+of that, they protect the shared cache from stampedes, where many processes miss the same key at once (e.g.
+right after a course publish changes its published version, or when a popular course's entry expires):
+
+* Single-flight locking: only one process computes a missing value while the others wait for it to show up.
+* Probabilistic early refresh: as an entry nears its expiry, each read has a growing chance of recomputing it
+  (scaled by how long it took to compute), so one process usually refreshes it before it expires at all.
+* Stale-while-revalidate: where the caller says an outdated value is safe to serve, expired entries are kept
+  for a while longer and served while one process recomputes them.
+
+Values in the shared cache are wrapped with their freshness information, and stored under a versioned prefix
+(see _shared_key), so use get_cached / set_cached (or their async versions) rather than reading or writing the
+keys directly.
+"""
+
+import logging
+import math
+import random
+import time
+import uuid
+from functools import partial
+from typing import Any, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db import transaction
+from edx_django_utils.cache.utils import DEFAULT_REQUEST_CACHE, CachedResponse
+
+log = logging.getLogger(__name__)
+
+# Bump this whenever the format of shared cache entries changes, so that during a rolling deploy, processes
+# running different releases store their entries under different keys rather than misreading each other's.
+SHARED_CACHE_KEY_PREFIX = 'edx-when.v1:'
+
+
+class _Entry(NamedTuple):
+    """
+    A value in the shared cache, with the time it goes stale and how many seconds it took to compute.
+    """
+
+    value: Any
+    expires: Optional[float]
+    delta: float
+
+
+def _shared_key(key):
+    """
+    Return the key an entry is stored under in the shared cache.
+    """
+    return f'{SHARED_CACHE_KEY_PREFIX}{key}'
+
+
+def _fresh_timeout():
+    """
+    Return how many seconds cached values stay fresh (None for forever).
+    """
+    return getattr(settings, 'EDX_WHEN_CACHE_TIMEOUT', django_cache.default_timeout)
+
+
+def _lock_key(key):
+    """
+    Return the shared cache key used to lock computing the given key.
+    """
+    return f'{key}.lock'
+
+
+def _make_entry(value, delta):
+    """
+    Wrap a value for the shared cache, returning the entry and how long the shared cache should keep it.
+    """
+    fresh_timeout = _fresh_timeout()
+    if fresh_timeout is None:
+        return _Entry(value, None, delta), None
+    entry = _Entry(value, time.time() + fresh_timeout, delta)
+    return entry, fresh_timeout + getattr(settings, 'EDX_WHEN_CACHE_STALE_TIMEOUT', 60)
+
+
+def _unwrap(key, entry, allow_stale):
+    """
+    Return a CachedResponse for the key's entry read from the shared cache.
+    """
+    if isinstance(entry, _Entry) and (allow_stale or not _is_expired(entry, time.time())):
+        return CachedResponse(is_found=True, key=key, value=entry.value)
+    return CachedResponse(is_found=False, key=key, value=None)
+
+
+def _get_entry(key):
+    """
+    Return the key's entry in the shared cache, or None.
+    """
+    entry = django_cache.get(_shared_key(key))
+    return entry if isinstance(entry, _Entry) else None
+
+
+def _is_expired(entry, now):
+    """
+    Return whether the entry has gone stale.
+    """
+    return entry.expires is not None and now >= entry.expires
+
+
+def _should_refresh(entry, now):
+    """
+    Return whether to recompute the entry now: always once it has expired, and sometimes shortly before.
+
+    This is the "XFetch" algorithm: the chance of an early refresh grows as the expiry approaches, and entries
+    that are slow to compute are refreshed earlier. EDX_WHEN_CACHE_EARLY_REFRESH_BETA (default 1) scales how
+    early; 0 turns early refreshes off.
+    """
+    if entry.expires is None:
+        return False
+    beta = getattr(settings, 'EDX_WHEN_CACHE_EARLY_REFRESH_BETA', 1.0)
+    return now - entry.delta * beta * math.log(1.0 - random.random()) >= entry.expires
+
+
+def get_cached(key, allow_stale=False):
+    """
+    Return a CachedResponse for the key, from the request cache or the shared cache.
+
+    Arguments:
+        key: the cache key
+        allow_stale: if True, values that have gone stale (but are still in the shared cache) are found too
+    """
+    cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(key)
+    if cached_response.is_found:
+        return cached_response
+    cached_response = _unwrap(key, django_cache.get(_shared_key(key)), allow_stale)
+    if cached_response.is_found:
+        DEFAULT_REQUEST_CACHE.set(key, cached_response.value)
+    return cached_response
+
+
+def set_cached(key, value, delta=0.0):
+    """
+    Store the value in the request cache and the shared cache.
+
+    Arguments:
+        key: the cache key
+        value: the value to cache
+        delta: how many seconds the value took to compute; slower values are refreshed earlier
+    """
+    DEFAULT_REQUEST_CACHE.set(key, value)
+    entry, timeout = _make_entry(value, delta)
+    django_cache.set(_shared_key(key), entry, timeout)
+
+
+def delete_cached(key):
+    """
+    Remove the key from the request cache and the shared cache.
+    """
+    DEFAULT_REQUEST_CACHE.delete(key)
+    django_cache.delete(_shared_key(key))
+
+
+def get_many_cached(keys):
+    """
+    Return a dictionary of the keys' fresh values found in the request cache or the shared cache.
+    """
+    found = {}
+    missing = {}
+    for key in keys:
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(key)
+        if cached_response.is_found:
+            found[key] = cached_response.value
+        else:
+            missing[_shared_key(key)] = key
+
+    for shared_key, entry in django_cache.get_many(list(missing)).items():
+        key = missing[shared_key]
+        cached_response = _unwrap(key, entry, allow_stale=False)
+        if cached_response.is_found:
+            DEFAULT_REQUEST_CACHE.set(key, cached_response.value)
+            found[key] = cached_response.value
+    return found
+
+
+def set_many_cached(values):
+    """
+    Store a dictionary of keys and values in the request cache and the shared cache.
+    """
+    entries = {}
+    timeout = None
+    for key, value in values.items():
+        DEFAULT_REQUEST_CACHE.set(key, value)
+        entries[_shared_key(key)], timeout = _make_entry(value, 0.0)
+    if entries:
+        django_cache.set_many(entries, timeout)
+
+
+async def aget_cached(key, allow_stale=False):
+    """
+    Async version of get_cached, which only reads the shared cache (the request cache is thread-local).
+    """
+    return _unwrap(key, await django_cache.aget(_shared_key(key)), allow_stale)
+
+
+async def aset_cached(key, value, delta=0.0):
+    """
+    Async version of set_cached, which only writes the shared cache (the request cache is thread-local).
+    """
+    entry, timeout = _make_entry(value, delta)
+    await django_cache.aset(_shared_key(key), entry, timeout)
+
+
+def _override_generation_key(course_id, user_id):
+    """
+    Return the shared cache key of the user's override generation in the course.
+    """
+    return f'course_dates_overrides.{course_id}.{user_id}'
+
+
+def _new_generation():
+    """
+    Return a starting value for a generation counter that is bumped while it isn't in the shared cache.
+
+    This isn't 0 (the value of a missing counter), so that if the counter was evicted from the cache, it can't
+    start counting through values that cache entries were already stored under.
+    """
+    return time.time_ns()
+
+
+def _generation_timeout():
+    """
+    Return how many seconds the shared cache keeps generation counters (None for forever).
+
+    This is longer than it keeps the entries stored under them, so once a counter has expired and reads as 0,
+    every entry stored under 0 before it was first bumped has expired too.
+    """
+    _, entry_timeout = _make_entry(None, 0.0)
+    return None if entry_timeout is None else 2 * entry_timeout
+
+
+def _course_generation_key(course_id):
+    """
+    Return the shared cache key of the generation of the course's dates.
+    """
+    return f'course_dates_generation.{course_id}'
+
+
+def _get_generation(key):
+    """
+    Return the generation counter at key, or 0 if it isn't in the shared cache (which reads don't write).
+    """
+    cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    generation = django_cache.get(key, 0)
+    DEFAULT_REQUEST_CACHE.set(key, generation)
+    return generation
+
+
+async def _aget_generation(key):
+    """
+    Async version of _get_generation, which only uses the shared cache (the request cache is thread-local).
+    """
+    return await django_cache.aget(key, 0)
+
+
+def _bump_generation(key):
+    """
+    Move the generation counter at key on to a new value, starting it if it isn't in the shared cache.
+    """
+    try:
+        generation = django_cache.incr(key)
+    except ValueError:
+        generation = _new_generation()
+        django_cache.set(key, generation, _generation_timeout())
+    DEFAULT_REQUEST_CACHE.set(key, generation)
+
+
+def _bump_generations(keys):
+    """
+    Move the generation counters at keys on to new values, in one shared cache round trip.
+
+    Generations only have to differ from the values entries were stored under, so rather than incrementing
+    each counter (one round trip each), this starts them all over at a new value.
+    """
+    generations = dict.fromkeys(keys, _new_generation())
+    if generations:
+        django_cache.set_many(generations, _generation_timeout())
+    for key, generation in generations.items():
+        DEFAULT_REQUEST_CACHE.set(key, generation)
+
+
+def _bump_generation_now_and_on_commit(key):
+    """
+    Bump the generation at key right away, and again once the current transaction commits.
+
+    The first bump lets the rest of this request see the new data; the second covers another process caching
+    the old data under the new generation in between.
+    """
+    _bump_generation(key)
+    transaction.on_commit(partial(_bump_generation, key))
+
+
+def _bump_generations_now_and_on_commit(keys):
+    """
+    Like _bump_generation_now_and_on_commit, for many generation counters at once.
+    """
+    keys = list(keys)
+    _bump_generations(keys)
+    transaction.on_commit(partial(_bump_generations, keys))
+
+
+def get_override_generation(course_id, user_id):
+    """
+    Return the generation of the user's date overrides in the course, which changes whenever they do.
+
+    Include it in the keys of cached values that depend on the user's overrides, so writing an override makes
+    them miss right away.
+    """
+    return _get_generation(_override_generation_key(course_id, user_id))
+
+
+async def aget_override_generation(course_id, user_id):
+    """
+    Async version of get_override_generation, which only uses the shared cache (the request cache is thread-local).
+    """
+    return await _aget_generation(_override_generation_key(course_id, user_id))
+
+
+def bump_override_generation(course_id, user_id):
+    """
+    Change the generation of the user's date overrides in the course, after writing one.
+    """
+    _bump_generation_now_and_on_commit(_override_generation_key(course_id, user_id))
+
+
+def bump_override_generations(course_id, user_ids):
+    """
+    Change the generations of many users' date overrides in the course, after writing theirs in bulk.
+    """
+    _bump_generations_now_and_on_commit(_override_generation_key(course_id, user_id) for user_id in user_ids)
+
+
+def get_course_generation(course_id):
+    """
+    Return the generation of the course's dates, which changes whenever they change without a new published version.
+
+    Include it in the keys of cached values that depend on the course's dates, so that resyncs, imports and
+    course-wide set_date_for_block calls make them miss right away, for every learner.
+    """
+    return _get_generation(_course_generation_key(course_id))
+
+
+def get_course_generations(course_ids, user_id=None):
+    """
+    Return a dictionary of course id to its (course generation, user's override generation) pair.
+
+    These are get_course_generation and get_override_generation (None without a user_id) for each course, but
+    the ones not in the request cache are read in one shared cache round trip.
+    """
+    keys = {
+        course_id: (
+            _course_generation_key(course_id), _override_generation_key(course_id, user_id) if user_id else None,
+        )
+        for course_id in course_ids
+    }
+    cached = {}
+    missing = []
+    for key in (key for pair in keys.values() for key in pair if key):
+        cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(key)
+        if cached_response.is_found:
+            cached[key] = cached_response.value
+        else:
+            missing.append(key)
+    found = django_cache.get_many(missing) if missing else {}
+    for key in missing:
+        cached[key] = found.get(key, 0)
+        DEFAULT_REQUEST_CACHE.set(key, cached[key])
+    return {
+        course_id: (cached[course_key], cached[override_key] if override_key else None)
+        for course_id, (course_key, override_key) in keys.items()
+    }
+
+
+async def aget_course_generation(course_id):
+    """
+    Async version of get_course_generation, which only uses the shared cache (the request cache is thread-local).
+    """
+    return await _aget_generation(_course_generation_key(course_id))
+
+
+def bump_course_generation(course_id):
+    """
+    Change the generation of the course's dates, after writing them.
+    """
+    _bump_generation_now_and_on_commit(_course_generation_key(course_id))
+
+
+def _compute_and_set(key, compute):
+    """
+    Compute the key's value, cache it in all tiers and return it.
+    """
+    start = time.monotonic()
+    value = compute()
+    set_cached(key, value, delta=time.monotonic() - start)
+    return value
+
+
+def _wait_for_value(key, timeout, poll_interval):
+    """
+    Poll the shared cache for up to timeout seconds, returning a CachedResponse for the key's fresh value.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(poll_interval)
+        cached_response = _unwrap(key, django_cache.get(_shared_key(key)), allow_stale=False)
+        if cached_response.is_found:
+            return cached_response
+    return CachedResponse(is_found=False, key=key, value=None)
+
+
+def get_or_compute(key, compute, use_cached=True, allow_stale=False):
+    """
+    Return the cached value for key, or compute it (once across all processes) and cache it in all tiers.
+
+    Values stay fresh for EDX_WHEN_CACHE_TIMEOUT seconds (by default, the django cache's default timeout).
+    If another process holds the lock for key, wait up to EDX_WHEN_CACHE_LOCK_WAIT seconds (default 5) for its
+    value before computing it here anyway. Locks expire after EDX_WHEN_CACHE_LOCK_TIMEOUT seconds (default 30),
+    so a process that dies while computing can't block the key for long.
+
+    Arguments:
+        key: the cache key
+        compute: a callable returning the value to cache
+        use_cached: if False, skip cache lookups and compute the value right away (it is still cached)
+        allow_stale: if True, serve a stale value while another process recomputes it, rather than waiting.
+            Only pass this for keys whose value can't change without the key changing too (e.g. keys that
+            include the course's published version); stale values are kept for EDX_WHEN_CACHE_STALE_TIMEOUT
+            seconds (default 60).
+    """
+    if not use_cached:
+        return _compute_and_set(key, compute)
+
+    cached_response = DEFAULT_REQUEST_CACHE.get_cached_response(key)
+    if cached_response.is_found:
+        return cached_response.value
+
+    entry = _get_entry(key)
+    now = time.time()
+    if entry is not None and not _should_refresh(entry, now):
+        DEFAULT_REQUEST_CACHE.set(key, entry.value)
+        return entry.value
+
+    lock_key = _lock_key(key)
+    if django_cache.add(lock_key, uuid.uuid4().hex, getattr(settings, 'EDX_WHEN_CACHE_LOCK_TIMEOUT', 30)):
+        try:
+            return _compute_and_set(key, compute)
+        finally:
+            django_cache.delete(lock_key)
+
+    # Another process is computing the value. Until it's done, serve the one we have if we may.
+    if entry is not None and (allow_stale or not _is_expired(entry, now)):
+        DEFAULT_REQUEST_CACHE.set(key, entry.value)
+        return entry.value
+
+    cached_response = _wait_for_value(
+        key,
+        timeout=getattr(settings, 'EDX_WHEN_CACHE_LOCK_WAIT', 5),
+        poll_interval=getattr(settings, 'EDX_WHEN_CACHE_LOCK_POLL_INTERVAL', 0.05),
+    )
+    if not cached_response.is_found:
+        log.warning('Timed out waiting for another process to cache %s; computing it here', key)
+        return _compute_and_set(key, compute)
+    DEFAULT_REQUEST_CACHE.set(key, cached_response.value)
+    return cached_response.value
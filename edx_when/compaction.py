@@ -0,0 +1,133 @@
+"""
+Batched compaction of rows that edx_when no longer reads.
+
+Publishes only deactivate the ContentDates of removed blocks, and every new override for a block adds a
+UserDate without removing the one it replaces. Each compaction step here walks its table in primary key
+order and yields its progress after every batch, like the backfills in edx_when.backfill. With dry_run,
+they only count the rows they would have removed.
+"""
+
+import logging
+import time
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from . import models
+
+log = logging.getLogger(__name__)
+
+
+def _batches(queryset, batch_size, sleep):
+    """
+    Yield the ids in the queryset a batch at a time, in primary key order, sleeping between batches.
+    """
+    last_id = 0
+    while True:
+        ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+        last_id = ids[-1]
+        if sleep:
+            time.sleep(sleep)
+
+
+def _lock(model, ids):
+    """
+    Lock the model's rows with the given ids until the end of the transaction, and return the ids still there.
+    """
+    return list(model.objects.filter(id__in=ids).select_for_update().values_list('id', flat=True))
+
+
+def _archive(user_date):
+    """
+    Return an unsaved UserDateArchive copy of the UserDate.
+    """
+    return models.UserDateArchive(
+        user_date_id=user_date.id,
+        user_id=user_date.user_id,
+        course_id=user_date.content_date.course_id,
+        location=user_date.content_date.location,
+        field=user_date.content_date.field,
+        abs_date=user_date.abs_date,
+        rel_date=user_date.rel_date,
+        reason=user_date.reason,
+        actor_id=user_date.actor_id,
+        created=user_date.created,
+        modified=user_date.modified,
+    )
+
+
+def archive_superseded_user_dates(batch_size=1000, sleep=0, dry_run=False):
+    """
+    Move the UserDates superseded by a newer override for the same user and ContentDate to UserDateArchive.
+
+    Yields:
+        (last_id, archived_count) after every batch
+    """
+    superseded = models.UserDate.objects.filter(Exists(models.UserDate.superseding()))
+    for ids in _batches(superseded, batch_size, sleep):
+        archived = len(ids)
+        if not dry_run:
+            with transaction.atomic():
+                archives = models.UserDateArchive.objects.bulk_create(
+                    _archive(user_date) for user_date in superseded.filter(id__in=ids).select_related('content_date')
+                )
+                models.UserDate.objects.filter(id__in=[archive.user_date_id for archive in archives]).delete()
+            archived = len(archives)
+        log.info('Archived %d superseded UserDates, up to id %d', archived, ids[-1])
+        yield ids[-1], archived
+
+
+def delete_inactive_content_dates(batch_size=1000, sleep=0, dry_run=False):
+    """
+    Delete the inactive ContentDates that have no overrides.
+
+    Yields:
+        (last_id, deleted_count) after every batch
+    """
+    unused = models.ContentDate.objects.filter(active=False).exclude(
+        Exists(models.UserDate.objects.filter(content_date_id=OuterRef('id')))
+    )
+    for ids in _batches(unused, batch_size, sleep):
+        deleted = len(ids)
+        if not dry_run:
+            with transaction.atomic():
+                # Lock the rows, then re-check them in a separate query (which sees what was committed while
+                # waiting for the locks), in case a publish reactivated any or an override was added since they
+                # were read. Adding an override waits for the lock, so none is added (and deleted along with its
+                # ContentDate) before they are deleted; it fails instead.
+                locked = _lock(models.ContentDate, ids)
+                still_unused = list(unused.filter(id__in=locked).values_list('id', flat=True))
+                models.ContentDate.objects.filter(id__in=still_unused).delete()
+            deleted = len(still_unused)
+        log.info('Deleted %d inactive ContentDates, up to id %d', deleted, ids[-1])
+        yield ids[-1], deleted
+
+
+def delete_orphaned_date_policies(batch_size=1000, sleep=0, dry_run=False):
+    """
+    Delete the DatePolicies that no ContentDate uses.
+
+    Yields:
+        (last_id, deleted_count) after every batch
+    """
+    orphaned = models.DatePolicy.objects.exclude(
+        Exists(models.ContentDate.objects.filter(policy_id=OuterRef('id')))
+    )
+    for ids in _batches(orphaned, batch_size, sleep):
+        deleted = len(ids)
+        if not dry_run:
+            with transaction.atomic():
+                # Publishes lock the policies they reuse until their ContentDates are saved (see
+                # api._get_or_create_policies). So lock these, then re-check them in a separate query (which sees
+                # what was committed while waiting for the locks): the ones still orphaned can't start being used
+                # before they are deleted (which would cascade to the new ContentDates), and a publish waiting for
+                # one creates a new policy instead.
+                locked = _lock(models.DatePolicy, ids)
+                still_orphaned = list(orphaned.filter(id__in=locked).values_list('id', flat=True))
+                models.DatePolicy.objects.filter(id__in=still_orphaned).delete()
+            deleted = len(still_orphaned)
+        log.info('Deleted %d orphaned DatePolicies, up to id %d', deleted, ids[-1])
+        yield ids[-1], deleted
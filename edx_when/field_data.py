@@ -1,23 +1,45 @@
 """FieldData support for date lookups."""
 
 import logging
+from collections import ChainMap
+from functools import lru_cache
+from types import MappingProxyType
 
-from edx_django_utils.db.read_replica import read_queries_only
 from xblock.field_data import FieldData
 
 from . import api
-
-try:
-    from xmodule.modulestore.inheritance import InheritanceMixin
-    INHERITABLE_FIELDS = set(InheritanceMixin.fields.keys())
-except ImportError:
-    INHERITABLE_FIELDS = {'due', 'start', 'end'}
-
+from .keys import key_to_string
 
 log = logging.getLogger(__name__)
 
 NOT_FOUND = object()
 
+# How many (course, published version) date maps each process keeps.
+SHARED_COURSE_DATES_CACHE_SIZE = 64
+
+
+@lru_cache(maxsize=None)
+def get_inheritable_fields():
+    """
+    Return the names of the fields that blocks inherit from their ancestors.
+
+    These come from the modulestore, which is imported on first use rather than along with this module.
+    """
+    try:
+        from xmodule.modulestore.inheritance import InheritanceMixin  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return frozenset({'due', 'start', 'end'})
+    return frozenset(InheritanceMixin.fields.keys())
+
+
+def __getattr__(name):
+    """
+    Resolve INHERITABLE_FIELDS on first use, for code that still reads it.
+    """
+    if name == 'INHERITABLE_FIELDS':
+        return get_inheritable_fields()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 def _lineage(block):
     """
@@ -29,6 +51,27 @@ def _lineage(block):
         parent = parent.get_parent()
 
 
+def _by_location_string(dates):
+    """
+    Re-key a get_dates_for_course dictionary by (str(location), field), the way _get looks dates up.
+    """
+    return {(key_to_string(location), field): date for (location, field), date in dates.items()}
+
+
+@lru_cache(maxsize=SHARED_COURSE_DATES_CACHE_SIZE)
+def _shared_course_dates(course_id, published_version, dates_state):  # pylint: disable=unused-argument
+    """
+    Return the course-wide dates of a published version of the course, as a read-only mapping.
+
+    The mapping is shared by every DateLookupFieldData in the process. Besides the published version, it's keyed
+    on dates_state (from api.get_course_dates_state), which changes when the course's dates are written without a
+    new version, or the settings deciding which of them are returned change. Then the next lookup misses, and the
+    stale mapping ages out of the LRU cache.
+    """
+    dates = api.get_dates_for_course(course_id, published_version=published_version)
+    return MappingProxyType(_by_location_string(dates))
+
+
 class DateLookupFieldData(FieldData):
     """
     FieldData instance that looks up date fields in django models.
@@ -36,30 +79,42 @@ class DateLookupFieldData(FieldData):
     falling back on the provided FieldData object if the date isn't found
     """
 
-    def __init__(self, defaults, course_id=None, user=None, use_cached=True):
+    def __init__(self, defaults, course_id=None, user=None, use_cached=True, published_version=None):
         """
         Create a new FieldData that contains relational-backed dates.
 
         defaults: FieldData instance to consult if the field is not in our database
         course_id: CourseKey for course
         user: User object to look for date overrides
+        published_version: the course's published version, if known; the course-wide dates are only shared between
+            instances given one
         """
         super().__init__()
         if isinstance(defaults, DateLookupFieldData):
             defaults = defaults._defaults
         self._defaults = defaults
-        self._load_dates(course_id, user, use_cached=use_cached)
+        self._load_dates(course_id, user, use_cached=use_cached, published_version=published_version)
 
-    def _load_dates(self, course_id, user, use_cached=True):
+    def _load_dates(self, course_id, user, use_cached=True, published_version=None):
         """
         Load the dates from the database.
+
+        With a published version, the course-wide dates are shared with the other instances for the same version,
+        and only the user's relative dates and overrides are loaded for this one.
         """
-        with read_queries_only():
-            dates = {}
-            for (location, field), date in api.get_dates_for_course(course_id, user, use_cached=use_cached).items():
-                dates[str(location), field] = date
+        if not use_cached or not published_version:
+            self._course_dates = _by_location_string(
+                api.get_dates_for_course(course_id, user, use_cached=use_cached, published_version=published_version)
+            )
+            return
 
-        self._course_dates = dates
+        course_dates = _shared_course_dates(course_id, published_version, api.get_course_dates_state(course_id))
+        if user is None:
+            self._course_dates = course_dates
+        else:
+            self._course_dates = ChainMap(_by_location_string(api.get_user_dates_overlay(
+                course_id, user, published_version=published_version
+            )), course_dates)
 
     def has(self, block, name):
         """
@@ -67,7 +122,7 @@ class DateLookupFieldData(FieldData):
         """
         val = self._get(block, name)
         if val is NOT_FOUND:
-            if name in INHERITABLE_FIELDS:
+            if name in get_inheritable_fields():
                 for ancestor in _lineage(block):
                     if self._get(ancestor, name) is not NOT_FOUND:
                         return False
@@ -83,7 +138,7 @@ class DateLookupFieldData(FieldData):
         if not isinstance(name, str):
             name = str(name)
         if name in api.FIELDS_TO_EXTRACT:
-            val = self._course_dates.get((str(block.location), name), NOT_FOUND)
+            val = self._course_dates.get((key_to_string(block.location), name), NOT_FOUND)
         else:
             val = NOT_FOUND
         return val
@@ -101,7 +156,7 @@ class DateLookupFieldData(FieldData):
         """
         Return the default for the field.
         """
-        if name in INHERITABLE_FIELDS:
+        if name in get_inheritable_fields():
             for ancestor in _lineage(block):
                 value = self._get(ancestor, name)
                 if value is not NOT_FOUND:
@@ -0,0 +1,73 @@
+"""
+Memoized parsing and serialization of opaque keys.
+
+Course and usage keys are immutable and hashable, and parsing or printing them runs regular expressions, so
+the same few thousand keys that a process serves are interned in bounded LRU caches instead of being parsed
+or printed over and over. key_cache_stats reports how well the caches are doing.
+"""
+
+from functools import lru_cache
+
+# The maximum number of entries in each cache: enough for the blocks with dates in a good number of big courses.
+KEY_CACHE_SIZE = 20000
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def parse_key(key_class, key_string):
+    """
+    Return key_class.from_string(key_string), parsing each string only once.
+
+    Raises InvalidKeyError like from_string (errors aren't cached).
+    """
+    return key_class.from_string(key_string)
+
+
+def ensure_key(key_class, key_obj):
+    """
+    Return key_obj if it's already a key_class, and otherwise parse it (with parse_key) as one.
+    """
+    if not isinstance(key_obj, key_class):
+        key_obj = parse_key(key_class, key_obj)
+    return key_obj
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def key_to_string(key):
+    """
+    Return str(key), serializing each key only once.
+    """
+    return str(key)
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def map_into_course(usage_key, course_key):
+    """
+    Return the usage key moved into the course (like UsageKey.map_into_course), mapping each pair only once.
+    """
+    return usage_key.map_into_course(course_key)
+
+
+def key_cache_stats():
+    """
+    Return a dictionary of each cache's name to its hits, misses, current size and hit rate (None before any use).
+    """
+    stats = {}
+    for cached_function in (parse_key, key_to_string, map_into_course):
+        # pylint infers calls through the lru_cache wrapper's methods as calls of the wrapped function.
+        info = cached_function.cache_info()  # pylint: disable=no-value-for-parameter
+        lookups = info.hits + info.misses
+        stats[cached_function.__name__] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'hit_rate': info.hits / lookups if lookups else None,
+        }
+    return stats
+
+
+def clear_key_caches():
+    """
+    Empty the caches and reset their counters.
+    """
+    for cached_function in (parse_key, key_to_string, map_into_course):
+        cached_function.cache_clear()
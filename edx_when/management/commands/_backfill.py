@@ -0,0 +1,45 @@
+"""
+Shared base for the management commands running the batched backfills in edx_when.backfill.
+"""
+
+from django.core.management.base import BaseCommand
+
+
+class BackfillCommand(BaseCommand):
+    """
+    Run a backfill from edx_when.backfill in resumable batches, reporting the last id reached after each one.
+
+    Subclasses implement backfill (usually by calling the backfill function) and set model_name (for the messages
+    and help).
+    """
+
+    model_name = None
+
+    def backfill(self, batch_size, start_id, sleep):
+        """
+        Run the backfill, yielding (last id, number of rows updated) after each batch.
+        """
+        raise NotImplementedError
+
+    def add_arguments(self, parser):
+        """
+        Add arguments to the command parser.
+        """
+        parser.add_argument(
+            '--batch-size', type=int, default=1000, help=f'Number of {self.model_name}s to update per batch.'
+        )
+        parser.add_argument('--start-id', type=int, default=0, help=f'Resume after this {self.model_name} id.')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to sleep between batches.')
+
+    def handle(self, *args, **options):
+        """
+        Run the backfill.
+        """
+        total = 0
+        last_id = options['start_id']
+        for last_id, updated in self.backfill(
+            batch_size=options['batch_size'], start_id=options['start_id'], sleep=options['sleep'],
+        ):
+            total += updated
+            self.stdout.write(f'Updated {updated} {self.model_name}s (last id: {last_id})')
+        self.stdout.write(f'Done: updated {total} {self.model_name}s (last id: {last_id})')
@@ -0,0 +1,28 @@
+"""
+Management command to fill in the ContentDate.block_type column.
+"""
+
+from edx_when.backfill import backfill_contentdate_block_type
+from edx_when.management.commands._backfill import BackfillCommand
+
+
+class Command(BackfillCommand):
+    """
+    Set ContentDate.block_type from each row's location, in batches.
+
+    Safe to interrupt: re-run with --start-id set to the last id reported to resume.
+    Once this has completed, set EDX_WHEN_STRICT_BLOCK_TYPE_FILTER = True so subsection-level date lookups
+    stop including rows without a block_type.
+
+    Example:
+        ./manage.py lms backfill_contentdate_block_type --batch-size 5000 --sleep 0.5
+    """
+
+    help = 'Backfill ContentDate.block_type from the location, in resumable batches.'
+    model_name = 'ContentDate'
+
+    def backfill(self, batch_size, start_id, sleep):
+        """
+        Run backfill_contentdate_block_type.
+        """
+        return backfill_contentdate_block_type(batch_size=batch_size, start_id=start_id, sleep=sleep)
@@ -0,0 +1,27 @@
+"""
+Management command to fill in the denormalized UserDate.course_id column.
+"""
+
+from edx_when.backfill import backfill_userdate_course_id
+from edx_when.management.commands._backfill import BackfillCommand
+
+
+class Command(BackfillCommand):
+    """
+    Copy ContentDate.course_id onto existing UserDate rows, in batches.
+
+    Safe to interrupt: re-run with --start-id set to the last id reported to resume.
+    Once this has completed, set EDX_WHEN_USE_USERDATE_COURSE_ID = True so override lookups use the new column.
+
+    Example:
+        ./manage.py lms backfill_userdate_course_id --batch-size 5000 --sleep 0.5
+    """
+
+    help = 'Backfill UserDate.course_id from the related ContentDate, in resumable batches.'
+    model_name = 'UserDate'
+
+    def backfill(self, batch_size, start_id, sleep):
+        """
+        Run backfill_userdate_course_id.
+        """
+        return backfill_userdate_course_id(batch_size=batch_size, start_id=start_id, sleep=sleep)
@@ -0,0 +1,57 @@
+"""
+Management command to remove edx_when rows that are no longer read.
+"""
+
+from django.core.management.base import BaseCommand
+
+from edx_when.compaction import (
+    archive_superseded_user_dates,
+    delete_inactive_content_dates,
+    delete_orphaned_date_policies
+)
+
+
+class Command(BaseCommand):
+    """
+    Compact the edx_when tables, in batches.
+
+    In order, this:
+
+    * moves UserDates superseded by a newer override for the same user and block to UserDateArchive,
+    * deletes inactive ContentDates (of blocks removed from their course) that have no overrides, and
+    * deletes DatePolicies that no ContentDate uses.
+
+    Safe to interrupt and re-run. With --dry-run, nothing is changed; the orphaned DatePolicy count then
+    leaves out the policies that deleting the inactive ContentDates would orphan.
+
+    Example:
+        ./manage.py lms compact_dates --batch-size 5000 --sleep 0.5
+    """
+
+    help = 'Archive superseded UserDates and delete unused ContentDates and DatePolicies, in batches.'
+
+    def add_arguments(self, parser):
+        """
+        Add arguments to the command parser.
+        """
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows to remove per batch.')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to sleep between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be removed.')
+
+    def handle(self, *args, **options):
+        """
+        Run each compaction step, reporting the rows it removed.
+        """
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        for description, step in (
+            ('superseded UserDates', archive_superseded_user_dates),
+            ('inactive ContentDates', delete_inactive_content_dates),
+            ('orphaned DatePolicies', delete_orphaned_date_policies),
+        ):
+            total = 0
+            for last_id, removed in step(
+                batch_size=options['batch_size'], sleep=options['sleep'], dry_run=options['dry_run'],
+            ):
+                total += removed
+                self.stdout.write(f'{verb} {removed} {description} (last id: {last_id})')
+            self.stdout.write(f'{verb} {total} {description} in total')
@@ -0,0 +1,45 @@
+"""
+Management command to write a snapshot of a course's dates to a file.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from edx_when.snapshot import export_course_dates
+
+
+class Command(BaseCommand):
+    """
+    Export a course's active dates (and optionally its learners' overrides) to a snapshot file.
+
+    Load the file with import_course_dates, in this environment or another one.
+
+    Example:
+        ./manage.py lms export_course_dates course-v1:edX+DemoX+Demo_Course demo-dates.snapshot --user-dates
+    """
+
+    help = "Write a snapshot of a course's dates to a file."
+
+    def add_arguments(self, parser):
+        """
+        Add arguments to the command parser.
+        """
+        parser.add_argument('course_key', help='Course to export the dates of.')
+        parser.add_argument('path', help='File to write the snapshot to.')
+        parser.add_argument('--user-dates', action='store_true', help="Include the learners' date overrides.")
+
+    def handle(self, *args, **options):
+        """
+        Export the course's dates.
+        """
+        try:
+            course_key = CourseKey.from_string(options['course_key'])
+        except InvalidKeyError as error:
+            raise CommandError(f"Invalid course key: {options['course_key']}") from error
+
+        with open(options['path'], 'wb') as stream:
+            content_dates, user_dates = export_course_dates(
+                course_key, stream, include_user_dates=options['user_dates'],
+            )
+        self.stdout.write(f"Exported {content_dates} dates and {user_dates} overrides for {course_key}")
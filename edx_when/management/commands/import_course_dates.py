@@ -0,0 +1,55 @@
+"""
+Management command to load a snapshot of a course's dates from a file.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from edx_when.snapshot import SnapshotError, import_course_dates
+
+
+class Command(BaseCommand):
+    """
+    Replace a course's dates with the ones in a snapshot file written by export_course_dates.
+
+    By default, the dates are loaded into the course they were exported from; pass --course-key to load
+    them into another one (e.g. a rerun). Overrides are matched to learners by username.
+
+    Example:
+        ./manage.py lms import_course_dates demo-dates.snapshot --course-key course-v1:edX+DemoX+2026
+    """
+
+    help = "Load a snapshot of a course's dates from a file."
+
+    def add_arguments(self, parser):
+        """
+        Add arguments to the command parser.
+        """
+        parser.add_argument('path', help='Snapshot file to load.')
+        parser.add_argument('--course-key', help='Course to load the dates into, if not the one they came from.')
+        parser.add_argument('--skip-user-dates', action='store_true', help="Don't load the learners' overrides.")
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of rows to write per query.')
+
+    def handle(self, *args, **options):
+        """
+        Import the course's dates.
+        """
+        course_key = None
+        if options['course_key']:
+            try:
+                course_key = CourseKey.from_string(options['course_key'])
+            except InvalidKeyError as error:
+                raise CommandError(f"Invalid course key: {options['course_key']}") from error
+
+        try:
+            with open(options['path'], 'rb') as stream:
+                content_dates, user_dates = import_course_dates(
+                    stream,
+                    course_key=course_key,
+                    include_user_dates=not options['skip_user_dates'],
+                    batch_size=options['batch_size'],
+                )
+        except SnapshotError as error:
+            raise CommandError(f"Can't load {options['path']}: {error}") from error
+        self.stdout.write(f'Imported {content_dates} dates and {user_dates} overrides')
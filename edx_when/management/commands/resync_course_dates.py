@@ -0,0 +1,172 @@
+"""
+Management command to re-sync edx_when dates for courses from their content.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from edx_when import models
+from edx_when.api import bulk_set_dates_for_course, warm_dates_cache_for_course
+from edx_when.utils import get_course_date_items, get_published_version
+
+log = logging.getLogger(__name__)
+
+
+def resync_course(course_key_string):
+    """
+    Re-sync one course's dates, returning whether it succeeded and a line describing what happened.
+
+    This runs in worker processes, so it takes and returns plain values and doesn't raise.
+    """
+    try:
+        course_key = CourseKey.from_string(course_key_string)
+        items = get_course_date_items(course_key)
+        if items is None:
+            return True, f'Skipped {course_key}: no course content found'
+
+        created, updated, deactivated = bulk_set_dates_for_course(course_key, items)
+        if created or updated or deactivated:
+            # The changes moved the course's cache keys to a new generation, which starts out cold.
+            published_version = get_published_version(course_key)
+            if published_version:
+                warm_dates_cache_for_course(course_key, published_version)
+        return True, f'Synced {course_key}: created {created}, updated {updated}, deactivated {deactivated}'
+    except Exception:  # pylint: disable=broad-except
+        log.exception('Failed to resync dates for %s', course_key_string)
+        return False, f'Failed {course_key_string}: see the logs'
+
+
+def _read_checkpoint(path):
+    """
+    Return the last course key recorded in the checkpoint file, or None.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as checkpoint_file:
+        return checkpoint_file.read().strip() or None
+
+
+def _write_checkpoint(path, course_key_string):
+    """
+    Record the last course key done in the checkpoint file, atomically.
+    """
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as checkpoint_file:
+        checkpoint_file.write(course_key_string)
+    os.replace(temp_path, path)
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the ContentDates for courses from their content, with bulk writes per course.
+
+    Use it after changes that need existing rows filled in (like the block_type, assignment_title, course_name
+    and subsection_name columns) or to repair courses whose dates have drifted. Dates are read with
+    edx_when.utils.get_course_date_items (see EDX_WHEN_COURSE_DATES_SOURCE).
+
+    With --checkpoint-file, the last course done is recorded after every batch, and a re-run with the same file
+    resumes after it. Once a course fails, the checkpoint stays before it for the rest of the run (so a re-run
+    retries it), and the command exits with an error. With --all, courses are processed in course key order.
+
+    Examples:
+        ./manage.py lms resync_course_dates course-v1:edX+DemoX+Demo_Course
+        ./manage.py lms resync_course_dates --all --checkpoint-file /tmp/resync --processes 4 --sleep 1
+    """
+
+    help = 'Re-sync edx_when dates for courses from their content, in resumable batches.'
+
+    def add_arguments(self, parser):
+        """
+        Add arguments to the command parser.
+        """
+        parser.add_argument('course_keys', nargs='*', help='Courses to re-sync.')
+        parser.add_argument('--all', action='store_true', help='Re-sync every course with dates in edx_when.')
+        parser.add_argument('--checkpoint-file', help='File to record progress in, and to resume from.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of courses per batch.')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to sleep between batches.')
+        parser.add_argument('--processes', type=int, default=1, help='Number of worker processes.')
+
+    def _course_keys(self, options, checkpoint):
+        """
+        Yield the course key strings to re-sync, after the checkpoint.
+        """
+        if options['all']:
+            # Page through the course ids rather than holding a cursor open while writing.
+            last = checkpoint
+            while True:
+                course_ids = models.ContentDate.objects.order_by('course_id').values_list('course_id', flat=True)
+                if last:
+                    course_ids = course_ids.filter(course_id__gt=CourseKey.from_string(last))
+                page = [str(course_id) for course_id in course_ids.distinct()[:options['batch_size']]]
+                if not page:
+                    return
+                yield from page
+                last = page[-1]
+
+        course_key_strings = iter(options['course_keys'])
+        if checkpoint and checkpoint in options['course_keys']:
+            for course_key_string in course_key_strings:
+                if course_key_string == checkpoint:
+                    break
+        yield from course_key_strings
+
+    def handle(self, *args, **options):
+        """
+        Re-sync the courses, a batch at a time.
+        """
+        if bool(options['all']) == bool(options['course_keys']):
+            raise CommandError('Pass either course keys or --all')
+        if options['batch_size'] < 1 or options['processes'] < 1:
+            raise CommandError('--batch-size and --processes must be positive')
+        for course_key_string in options['course_keys']:
+            try:
+                CourseKey.from_string(course_key_string)
+            except InvalidKeyError as error:
+                raise CommandError(f'Invalid course key: {course_key_string}') from error
+
+        checkpoint_file = options['checkpoint_file']
+        checkpoint = _read_checkpoint(checkpoint_file)
+        if checkpoint:
+            self.stdout.write(f'Resuming after {checkpoint}')
+
+        pool = None
+        if options['processes'] > 1:
+            # Forked workers must not share this process's database connections.
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(options['processes'])
+
+        total = 0
+        failed = 0
+        try:
+            course_key_strings = self._course_keys(options, checkpoint)
+            while batch := list(islice(course_key_strings, options['batch_size'])):
+                # imap keeps the results in order, so the checkpoint never skips an unfinished course.
+                results = pool.imap(resync_course, batch) if pool else map(resync_course, batch)
+                last_done = None
+                for course_key_string, (succeeded, message) in zip(batch, results):
+                    self.stdout.write(message)
+                    if not succeeded:
+                        failed += 1
+                    elif not failed:
+                        last_done = course_key_string
+                total += len(batch)
+                if checkpoint_file and last_done:
+                    _write_checkpoint(checkpoint_file, last_done)
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        self.stdout.write(f'Done: processed {total} courses')
+        if failed:
+            raise CommandError(f'Failed to resync {failed} courses; re-run to retry them')
@@ -0,0 +1,54 @@
+"""
+Management command to precompute the course-wide date cache entries for courses.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey
+
+from edx_when.api import warm_dates_cache_for_course
+from edx_when.utils import get_published_version
+
+
+class Command(BaseCommand):
+    """
+    Warm the edx_when cache for the given courses' current published versions.
+
+    Example:
+        ./manage.py lms warm_course_dates_cache course-v1:edX+DemoX+Demo_Course
+    """
+
+    help = "Precompute and cache the course-wide dates for the courses' published versions."
+
+    def add_arguments(self, parser):
+        """
+        Add arguments to the command parser.
+        """
+        parser.add_argument('course_keys', nargs='+', help='Courses to warm the cache for.')
+        parser.add_argument(
+            '--published-version',
+            help='Published version to warm the cache for (only with a single course). '
+                 'Defaults to the version in the modulestore.',
+        )
+        parser.add_argument('--force', action='store_true', help='Recompute entries that are already cached.')
+
+    def handle(self, *args, **options):
+        """
+        Warm the cache for each course.
+        """
+        if options['published_version'] and len(options['course_keys']) > 1:
+            raise CommandError('--published-version can only be used with a single course')
+
+        for course_key_string in options['course_keys']:
+            try:
+                course_key = CourseKey.from_string(course_key_string)
+            except InvalidKeyError as error:
+                raise CommandError(f'Invalid course key: {course_key_string}') from error
+
+            published_version = options['published_version'] or get_published_version(course_key)
+            if not published_version:
+                self.stderr.write(f'Skipping {course_key}: no published version found')
+                continue
+
+            written = warm_dates_cache_for_course(course_key, published_version, force=options['force'])
+            self.stdout.write(f'Wrote {written} cache entries for {course_key} at version {published_version}')
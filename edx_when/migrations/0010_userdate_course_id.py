@@ -0,0 +1,25 @@
+# Generated by Django 4.2.22 on 2026-10-19 05:12
+
+import opaque_keys.edx.django.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_when', '0009_contentdate_assignment_title_contentdate_course_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userdate',
+            name='course_id',
+            field=opaque_keys.edx.django.models.CourseKeyField(blank=True, default=None, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='userdate',
+            index=models.Index(fields=['user', 'course_id'], name='edx_when_user_course_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.22 on 2026-10-19 09:30
+
+import django.db.models.deletion
+import opaque_keys.edx.django.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_when', '0010_userdate_course_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDateArchive',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_date_id', models.IntegerField(db_index=True)),
+                ('course_id', opaque_keys.edx.django.models.CourseKeyField(db_index=True, max_length=255)),
+                ('location', opaque_keys.edx.django.models.UsageKeyField(default=None, max_length=255, null=True)),
+                ('field', models.CharField(default='', max_length=255)),
+                ('abs_date', models.DateTimeField(blank=True, null=True)),
+                ('rel_date', models.DurationField(blank=True, null=True)),
+                ('reason', models.TextField(blank=True, default='')),
+                ('created', models.DateTimeField()),
+                ('modified', models.DateTimeField()),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.22 on 2026-10-19 11:40
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def dedupe_content_dates(apps, schema_editor):
+    """
+    Merge the ContentDates that share a (course_id, location, field), before that becomes unique.
+
+    Concurrent publishes could create such duplicates. For each set, the active (or else the oldest) row is kept,
+    as bulk_set_dates_for_course did, and the overrides of the others are moved onto it before they're deleted.
+    """
+    ContentDate = apps.get_model('edx_when', 'ContentDate')
+    UserDate = apps.get_model('edx_when', 'UserDate')
+    db_alias = schema_editor.connection.alias
+
+    duplicated = ContentDate.objects.using(db_alias).values('course_id', 'location', 'field').annotate(
+        count=Count('id')
+    ).filter(count__gt=1)
+    for natural_key in duplicated.iterator():
+        del natural_key['count']
+        keep, *extra = ContentDate.objects.using(db_alias).filter(**natural_key).order_by(
+            '-active', 'id'
+        ).values_list('id', flat=True)
+        UserDate.objects.using(db_alias).filter(content_date_id__in=extra).update(content_date_id=keep)
+        ContentDate.objects.using(db_alias).filter(id__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_when', '0011_userdatearchive'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_content_dates, migrations.RunPython.noop),
+    ]
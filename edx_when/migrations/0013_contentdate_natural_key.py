@@ -0,0 +1,23 @@
+# Generated by Django 4.2.22 on 2026-10-19 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('edx_when', '0012_dedupe_content_dates'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='contentdate',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='contentdate',
+            constraint=models.UniqueConstraint(
+                fields=('course_id', 'location', 'field'), name='edx_when_contentdate_natural_key'
+            ),
+        ),
+    ]
@@ -7,10 +7,12 @@ from datetime import datetime
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import OuterRef, Q
 from django.utils.translation import gettext_lazy as _
 from model_utils.models import TimeStampedModel
 from opaque_keys.edx.django.models import CourseKeyField, UsageKeyField
 
+from .cache import bump_override_generation
 from .utils import get_schedule_for_user
 
 
@@ -18,6 +20,39 @@ class MissingScheduleError(ValueError):
     pass
 
 
+def actual_policy_date(abs_date, rel_date, schedule=None, end_datetime=None, cutoff_datetime=None):
+    """
+    Return the normalized date of a policy's absolute or relative date, like DatePolicy.actual_date.
+
+    This lets the read path work with plain (abs_date, rel_date) values instead of DatePolicy instances.
+
+    Arguments:
+        abs_date (datetime): the policy's absolute date, if any
+        rel_date (timedelta): the policy's relative date, if any
+        schedule (Schedule): user schedule, only used for relative dates
+        end_datetime (datetime): no relative dates will be given after this date
+        cutoff_datetime (datetime): no relative dates will be given if user originally started past this date
+    """
+    if rel_date is None:
+        return abs_date
+
+    if schedule is None:
+        raise MissingScheduleError(f"Can't interpret relative date {rel_date} without a user schedule")
+
+    # If the user first enrolled after the cutoff date (or reset their schedule after the course end), we
+    # don't want to return any dates.
+    if ((cutoff_datetime and schedule.created > cutoff_datetime) or
+            (end_datetime and schedule.start_date > end_datetime)):
+        return None
+
+    # If the course has an end date defined, we will prefer the course end date
+    # if the relative date is later than the course end date.
+    # Note: This can result in several dates being listed the same as the course end date
+    if end_datetime:
+        return min(schedule.start_date + rel_date, end_datetime)
+    return schedule.start_date + rel_date
+
+
 class DatePolicy(TimeStampedModel):
     """
     Stores a date (either absolute or relative).
@@ -48,29 +83,14 @@ class DatePolicy(TimeStampedModel):
             end_datetime (datetime): no relative dates will be given after this date
             cutoff_datetime (datetime): no relative dates will be given if user originally started past this date
         """
-        if self.rel_date is not None:
-            if schedule is None:
-                raise MissingScheduleError(
-                    "Can't interpret relative date {} for {!r} without a user schedule".format(
-                        self.rel_date,
-                        self
-                    )
+        if self.rel_date is not None and schedule is None:
+            raise MissingScheduleError(
+                "Can't interpret relative date {} for {!r} without a user schedule".format(
+                    self.rel_date,
+                    self
                 )
-
-            # If the user first enrolled after the cutoff date (or reset their schedule after the course end), we
-            # don't want to return any dates.
-            if ((cutoff_datetime and schedule.created > cutoff_datetime) or
-                    (end_datetime and schedule.start_date > end_datetime)):
-                return None
-
-            # If the course has an end date defined, we will prefer the course end date
-            # if the relative date is later than the course end date.
-            # Note: This can result in several dates being listed the same as the course end date
-            if end_datetime:
-                return min(schedule.start_date + self.rel_date, end_datetime)
-            return schedule.start_date + self.rel_date
-        else:
-            return self.abs_date
+            )
+        return actual_policy_date(self.abs_date, self.rel_date, schedule, end_datetime, cutoff_datetime)
 
     def clean(self):
         """
@@ -100,7 +120,10 @@ class ContentDate(models.Model):
     class Meta:
         """Metadata for ContentDate model — enforces uniqueness and adds query performance indexes."""
 
-        unique_together = ('policy', 'location', 'field')
+        # A block's field has one ContentDate per course, so writes can upsert on this natural key.
+        constraints = [
+            models.UniqueConstraint(fields=('course_id', 'location', 'field'), name='edx_when_contentdate_natural_key'),
+        ]
         indexes = [
             models.Index(fields=('course_id', 'block_type'), name='edx_when_course_block_type_idx'),
         ]
@@ -138,6 +161,29 @@ class UserDate(TimeStampedModel):
     )
     first_component_block_id = UsageKeyField(null=True, blank=True, max_length=255)
     is_content_gated = models.BooleanField(default=False)
+    # Denormalized from content_date so per-user override lookups don't need to join ContentDate.
+    course_id = CourseKeyField(blank=True, default=None, max_length=255)
+
+    class Meta:
+        """Metadata for UserDate model — adds an index for per-user, per-course override lookups."""
+
+        indexes = [
+            models.Index(fields=('user', 'course_id'), name='edx_when_user_course_idx'),
+        ]
+
+    @classmethod
+    def superseding(cls):
+        """
+        Return the UserDates that supersede the outer query's UserDate, for use in an Exists() subquery.
+
+        Only the latest override for a user and ContentDate counts: the most recently modified one,
+        or if there's a tie, the one with the highest id.
+        """
+        return cls.objects.filter(
+            Q(modified__gt=OuterRef('modified')) | Q(modified=OuterRef('modified'), id__gt=OuterRef('id')),
+            user_id=OuterRef('user_id'),
+            content_date_id=OuterRef('content_date_id'),
+        )
 
     @property
     def actual_date(self):
@@ -172,16 +218,40 @@ class UserDate(TimeStampedModel):
         """
         Validate data before saving.
         """
+        schedule = get_schedule_for_user(self.user.id, self.content_date.course_id)  # pylint: disable=no-member
+        self.clean_for_schedule(schedule)
+
+    def clean_for_schedule(self, schedule):
+        """
+        Validate data before saving, given the user's schedule (so validating many overrides needs no queries).
+        """
         if self.abs_date and self.rel_date:
             raise ValidationError(_("Absolute and relative dates cannot both be used"))
 
-        schedule = get_schedule_for_user(self.user.id, self.content_date.course_id)  # pylint: disable=no-member
         policy_date = self.content_date.policy.actual_date(schedule=schedule)
         if self.rel_date is not None and self.rel_date.total_seconds() < 0:
             raise ValidationError(_("Override date must be later than policy date"))
         if self.abs_date is not None and isinstance(policy_date, datetime) and self.abs_date < policy_date:
             raise ValidationError(_("Override date must be later than policy date"))
 
+    def save(self, *args, **kwargs):
+        """
+        Keep the denormalized course_id in sync with the ContentDate, and make the user's cached dates miss.
+        """
+        if self.content_date_id:
+            self.course_id = self.content_date.course_id
+        super().save(*args, **kwargs)
+        bump_override_generation(self.course_id, self.user_id)
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete the override, making the user's cached dates miss.
+        """
+        course_id = self.course_id or self.content_date.course_id
+        result = super().delete(*args, **kwargs)
+        bump_override_generation(course_id, self.user_id)
+        return result
+
     def __str__(self):  # pragma: no cover
         """
         Get a string representation of this model instance.
@@ -197,3 +267,35 @@ class UserDate(TimeStampedModel):
         return (f'UserDate(id={self.id}, user="{self.user.username}", '  # pylint: disable=no-member
                 f'first_component_block_id={self.first_component_block_id}, '
                 f'content_date={self.content_date.id})')
+
+
+class UserDateArchive(models.Model):
+    """
+    Stores a superseded UserDate, once the compact_dates command has moved it out of the UserDate table.
+
+    The ContentDate's course, location and field are copied rather than referenced, since
+    inactive ContentDates can be deleted by compaction too.
+
+    .. no_pii:
+    """
+
+    user_date_id = models.IntegerField(db_index=True)
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
+    course_id = CourseKeyField(db_index=True, max_length=255)
+    location = UsageKeyField(null=True, default=None, max_length=255)
+    field = models.CharField(max_length=255, default='')
+    abs_date = models.DateTimeField(null=True, blank=True)
+    rel_date = models.DurationField(null=True, blank=True)
+    reason = models.TextField(default='', blank=True)
+    actor = models.ForeignKey(
+        get_user_model(), null=True, default=None, blank=True, related_name="+", on_delete=models.SET_NULL
+    )
+    created = models.DateTimeField()
+    modified = models.DateTimeField()
+    archived = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """
+        Get a string representation of this model instance.
+        """
+        return f'UserDateArchive({self.user_id}, {self.location}, {self.field}, {self.abs_date or self.rel_date})'
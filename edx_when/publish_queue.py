@@ -0,0 +1,267 @@
+"""
+Coalescing queue of course date syncs.
+
+Authors often publish a course several times within a minute, and syncing all of its dates on each publish is
+wasted work for all but the last. Instead, a publish handler can call request_date_sync, which records that the
+course needs its dates synced at the new published version and schedules the sync for after a quiet period
+(EDX_WHEN_PUBLISH_QUIET_PERIOD seconds, default 30). A later request for the same course replaces the pending
+version and pushes the sync back, so only the latest version is synced, once the publishes stop.
+
+The pending syncs live in the django cache, and the delayed runs go through an executor chosen with
+EDX_WHEN_PUBLISH_EXECUTOR:
+
+* 'celery': a Celery task (edx_when.tasks.sync_course_dates); the default where Celery is installed
+* 'thread': a timer thread in this process; the default elsewhere
+* 'inline': sync right away, without waiting for the quiet period
+* 'local': keep the runs in memory until run_due is called, for tests
+* or the dotted path of a class with a schedule(course_key, delay) method
+
+A sync that fails is retried, up to EDX_WHEN_PUBLISH_MAX_RETRIES times (default 5), with the delay doubling from
+the quiet period each time, by the Celery and thread executors.
+"""
+
+import importlib.util
+import logging
+import threading
+import time
+import uuid
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db import connections
+from django.utils.module_loading import import_string
+from opaque_keys.edx.keys import CourseKey
+
+from . import api
+from .keys import ensure_key
+from .utils import get_course_date_items
+
+log = logging.getLogger(__name__)
+
+
+class PendingSync(NamedTuple):
+    """
+    A course's requested date sync: the published version to sync, and the time it's due (after the quiet period).
+    """
+
+    published_version: Optional[str]
+    due: float
+    token: str
+
+
+def _pending_sync_cache_key(course_key):
+    """
+    Return the shared cache key of the course's pending sync.
+    """
+    return f'edx-when.pending_sync:{course_key}'
+
+
+def _quiet_period():
+    """
+    Return how many seconds to wait after the last sync request for a course before syncing it.
+    """
+    return getattr(settings, 'EDX_WHEN_PUBLISH_QUIET_PERIOD', 30)
+
+
+def _pending_sync_timeout():
+    """
+    Return how long to keep a pending sync, well past its due time, in case the run that should process it is late.
+    """
+    return _quiet_period() + 3600
+
+
+def max_sync_retries():
+    """
+    Return how many times to retry a failed sync.
+    """
+    return getattr(settings, 'EDX_WHEN_PUBLISH_MAX_RETRIES', 5)
+
+
+def sync_retry_delay(retries):
+    """
+    Return how many seconds to wait before retrying a sync that has already been retried this many times.
+    """
+    return min(max(_quiet_period(), 1) * 2 ** retries, 3600)
+
+
+def request_date_sync(course_key, published_version=None):
+    """
+    Ask for the course's dates to be synced from its content once it hasn't been published for a quiet period.
+
+    Arguments:
+        course_key: either a CourseKey or string representation of same
+        published_version: (optional) the course's new published version; its dates cache is warmed after the sync
+
+    Returns:
+        the PendingSync recorded for the course
+    """
+    course_key = ensure_key(CourseKey, course_key)
+    quiet_period = _quiet_period()
+    pending = PendingSync(published_version, time.time() + quiet_period, uuid.uuid4().hex)
+    django_cache.set(_pending_sync_cache_key(course_key), pending, _pending_sync_timeout())
+    get_executor().schedule(course_key, quiet_period)
+    log.info('Requested a date sync of %s at version %s', course_key, published_version)
+    return pending
+
+
+def process_pending_sync(course_key, now=None):
+    """
+    Sync the course's dates if its pending sync is due, returning whether it did.
+
+    Every request_date_sync schedules a run of this, but the runs for superseded requests find the sync not yet due
+    (or already done) and return without doing anything.
+
+    The pending sync itself is never deleted, since a newer request could replace it between reading and deleting
+    it. Instead, the run that processes a request claims its token (with an atomic cache add, which outlives the
+    pending sync), so later runs find it done. If the sync fails, the claim is dropped for a retry to process it.
+    """
+    course_key = ensure_key(CourseKey, course_key)
+    cache_key = _pending_sync_cache_key(course_key)
+    pending = django_cache.get(cache_key)
+    if pending is None or pending.due > (time.time() if now is None else now):
+        return False
+    # Only one run gets to process each request.
+    claim_cache_key = f'{cache_key}.{pending.token}'
+    if not django_cache.add(claim_cache_key, True, _pending_sync_timeout()):
+        return False
+
+    try:
+        items = get_course_date_items(course_key)
+        if items is not None:
+            api.set_dates_for_course(course_key, items)
+            if pending.published_version:
+                api.warm_dates_cache_for_course(course_key, pending.published_version)
+    except Exception:
+        # Leave the sync pending, and keep it (or a newer request) around for the retries.
+        django_cache.delete(claim_cache_key)
+        django_cache.touch(cache_key, _pending_sync_timeout())
+        raise
+
+    if items is None:
+        log.warning('Skipped the date sync of %s: no course content found', course_key)
+        return False
+    log.info('Synced the dates of %s at version %s', course_key, pending.published_version)
+    return True
+
+
+class InlineExecutor:
+    """
+    Sync right away, in the requesting thread.
+    """
+
+    def schedule(self, course_key, delay):
+        """
+        Process the course's pending sync now.
+        """
+        process_pending_sync(course_key, now=time.time() + delay)
+
+
+class ThreadExecutor:
+    """
+    Sync in a timer thread of this process, once the quiet period is over.
+
+    Pending syncs are lost if the process exits first, so prefer Celery where it's available.
+    """
+
+    def schedule(self, course_key, delay):
+        """
+        Start a timer thread to process the course's pending sync after delay seconds.
+        """
+        self._start_timer(course_key, delay, 0)
+
+    @classmethod
+    def _start_timer(cls, course_key, delay, retries):
+        """
+        Start a timer thread to run the sync after delay seconds, after it has been retried this many times.
+        """
+        timer = threading.Timer(delay, cls._run, args=(course_key, retries))
+        timer.daemon = True
+        timer.start()
+
+    @classmethod
+    def _run(cls, course_key, retries=0):
+        """
+        Process the course's pending sync, closing the thread's database connections afterwards.
+
+        If it fails, another timer retries it, until it has been retried max_sync_retries() times.
+        """
+        try:
+            process_pending_sync(course_key)
+        except Exception:  # pylint: disable=broad-except
+            if retries < max_sync_retries():
+                log.warning('Failed to sync the dates of %s; retrying', course_key, exc_info=True)
+                cls._start_timer(course_key, sync_retry_delay(retries), retries + 1)
+            else:
+                log.exception('Failed to sync the dates of %s after %d retries', course_key, retries)
+        finally:
+            connections.close_all()
+
+
+class CeleryExecutor:
+    """
+    Sync in a Celery task, once the quiet period is over.
+    """
+
+    def schedule(self, course_key, delay):
+        """
+        Queue the sync_course_dates task to run after delay seconds.
+        """
+        # The tasks module imports this one (and Celery), so only load it when a Celery run is scheduled.
+        sync_course_dates = import_string('edx_when.tasks.sync_course_dates')
+        sync_course_dates.apply_async(args=(str(course_key),), countdown=delay)
+
+
+class LocalExecutor:
+    """
+    Keep the scheduled runs in memory until run_due is called, standing in for the real executors in tests.
+    """
+
+    def __init__(self):
+        """
+        Start with no scheduled runs.
+        """
+        self.scheduled = []
+
+    def schedule(self, course_key, delay):
+        """
+        Remember a run of the course's pending sync, due after delay seconds.
+        """
+        self.scheduled.append((time.time() + delay, course_key))
+
+    def run_due(self, now=None):
+        """
+        Run the scheduled runs that are due by now (default: the current time), returning the courses synced.
+        """
+        now = time.time() if now is None else now
+        due = [course_key for run_at, course_key in self.scheduled if run_at <= now]
+        self.scheduled = [(run_at, course_key) for run_at, course_key in self.scheduled if run_at > now]
+        return [course_key for course_key in due if process_pending_sync(course_key, now=now)]
+
+
+_EXECUTORS = {
+    'inline': InlineExecutor,
+    'thread': ThreadExecutor,
+    'celery': CeleryExecutor,
+    'local': LocalExecutor,
+}
+
+
+@lru_cache(maxsize=None)
+def _make_executor(name):
+    """
+    Return the executor for an EDX_WHEN_PUBLISH_EXECUTOR value, creating it once.
+    """
+    executor_class = _EXECUTORS.get(name) or import_string(name)
+    return executor_class()
+
+
+def get_executor():
+    """
+    Return the executor that runs the pending syncs, according to EDX_WHEN_PUBLISH_EXECUTOR.
+    """
+    name = getattr(settings, 'EDX_WHEN_PUBLISH_EXECUTOR', None)
+    if not name:
+        name = 'celery' if importlib.util.find_spec('celery') else 'thread'
+    return _make_executor(name)
@@ -0,0 +1,344 @@
+"""
+Export and import of a course's dates as a compact snapshot file.
+
+Course reruns, imports and environment refreshes can copy date data with these instead of re-publishing
+the whole course. A snapshot is a gzip stream of length-prefixed records: each record is a 4-byte big-endian
+length followed by that many bytes of UTF-8 JSON. The first record is a header; the rest are, in order, the
+DatePolicies used by the course's active ContentDates, the ContentDates themselves, and optionally the latest
+UserDate of each learner for each of them. Both sides stream the records, so memory use doesn't grow with the
+number of overrides.
+"""
+
+import gzip
+import json
+import logging
+import struct
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists
+from django.utils import timezone
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+
+from . import api, models
+from .cache import bump_override_generation
+from .keys import ensure_key
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+
+_LENGTH = struct.Struct('>I')
+
+_USER_DATE_FIELDS = (
+    'content_date__location', 'content_date__field', 'user__username', 'abs_date', 'rel_date', 'reason',
+    'actor__username', 'first_component_block_id', 'is_content_gated',
+)
+
+
+class SnapshotError(ValueError):
+    """
+    Raised when a snapshot file can't be read.
+    """
+
+
+def _write_record(stream, record):
+    """
+    Write one length-prefixed JSON record.
+    """
+    data = json.dumps(record, separators=(',', ':')).encode('utf-8')
+    stream.write(_LENGTH.pack(len(data)))
+    stream.write(data)
+
+
+def _read_records(stream):
+    """
+    Yield the records in the stream, until it ends.
+    """
+    while True:
+        prefix = stream.read(_LENGTH.size)
+        if not prefix:
+            return
+        if len(prefix) < _LENGTH.size:
+            raise SnapshotError('Truncated snapshot')
+        (length,) = _LENGTH.unpack(prefix)
+        data = stream.read(length)
+        if len(data) < length:
+            raise SnapshotError('Truncated snapshot')
+        yield json.loads(data)
+
+
+def _dump_date(abs_date, rel_date):
+    """
+    Return the JSON form of an absolute or relative date: an ISO 8601 string, or a number of microseconds.
+    """
+    if rel_date is not None:
+        return {'rel': rel_date // timedelta(microseconds=1)}
+    if abs_date is not None:
+        return {'abs': abs_date.isoformat()}
+    return {}
+
+
+def _load_date(value):
+    """
+    Return the absolute or relative date stored by _dump_date, or None.
+    """
+    if 'rel' in value:
+        return timedelta(microseconds=value['rel'])
+    if 'abs' in value:
+        date = datetime.fromisoformat(value['abs'])
+        if not settings.USE_TZ and timezone.is_aware(date):
+            date = timezone.make_naive(date)
+        return api._normalize_date(date)  # pylint: disable=protected-access
+    return None
+
+
+def export_course_dates(course_key, stream, include_user_dates=False, chunk_size=2000):
+    """
+    Write a snapshot of the course's active dates to a binary stream.
+
+    Arguments:
+        course_key: either a CourseKey or string representation of same
+        stream: a binary file object to write the (gzipped) snapshot to
+        include_user_dates: whether to include the learners' latest date overrides
+        chunk_size: number of rows to read from the database at a time
+
+    Returns:
+        a (content_date_count, user_date_count) tuple
+    """
+    course_key = ensure_key(CourseKey, course_key)
+    content_dates = models.ContentDate.objects.filter(course_id=course_key, active=True)
+    content_date_count = user_date_count = 0
+
+    with gzip.GzipFile(fileobj=stream, mode='wb') as gzipped:
+        _write_record(gzipped, {
+            'type': 'header',
+            'version': SNAPSHOT_FORMAT_VERSION,
+            'course_id': str(course_key),
+            'user_dates': include_user_dates,
+        })
+
+        for policy_id, abs_date, rel_date in models.DatePolicy.objects.filter(
+            id__in=content_dates.values('policy_id')
+        ).values_list('id', 'abs_date', 'rel_date').iterator(chunk_size=chunk_size):
+            _write_record(gzipped, {'type': 'policy', 'id': policy_id, **_dump_date(abs_date, rel_date)})
+
+        for row in content_dates.order_by('id').values_list(
+            'policy_id', 'location', 'field', *api.CONTENT_DATE_METADATA_FIELDS
+        ).iterator(chunk_size=chunk_size):
+            policy_id, location, field, *metadata = row
+            _write_record(gzipped, {
+                'type': 'content_date',
+                'policy': policy_id,
+                'location': str(location),
+                'field': field,
+                **dict(zip(api.CONTENT_DATE_METADATA_FIELDS, metadata)),
+            })
+            content_date_count += 1
+
+        if include_user_dates:
+            user_dates = models.UserDate.objects.filter(
+                content_date__course_id=course_key, content_date__active=True,
+            ).exclude(Exists(models.UserDate.superseding()))
+            for row in user_dates.order_by('id').values_list(*_USER_DATE_FIELDS).iterator(chunk_size=chunk_size):
+                location, field, username, abs_date, rel_date, reason, actor, first_component, gated = row
+                _write_record(gzipped, {
+                    'type': 'user_date',
+                    'location': str(location),
+                    'field': field,
+                    'user': username,
+                    **_dump_date(abs_date, rel_date),
+                    'reason': reason,
+                    'actor': actor,
+                    'first_component_block_id': str(first_component) if first_component else None,
+                    'is_content_gated': gated,
+                })
+                user_date_count += 1
+
+    log.info('Exported %d ContentDates and %d UserDates for %s', content_date_count, user_date_count, course_key)
+    return content_date_count, user_date_count
+
+
+class _UserDateRecord(NamedTuple):
+    """
+    A user_date record of a snapshot, parsed and moved into the course it's imported into.
+    """
+
+    username: str
+    location: UsageKey
+    field: str
+    abs_date: Optional[datetime]
+    rel_date: Optional[timedelta]
+    reason: str
+    actor: Optional[str]
+    first_component_block_id: Optional[UsageKey]
+    is_content_gated: bool
+
+
+@contextmanager
+def _parsing(record_type):
+    """
+    Turn the errors raised while reading a malformed record into SnapshotErrors.
+    """
+    try:
+        yield
+    except (AttributeError, KeyError, TypeError, ValueError, InvalidKeyError) as error:
+        raise SnapshotError(f'Malformed {record_type} record: {error!r}') from error
+
+
+def _parse_user_date(record, course_key):
+    """
+    Return the _UserDateRecord for a user_date record.
+    """
+    date = _load_date(record)
+    first_component_block_id = record['first_component_block_id']
+    return _UserDateRecord(
+        username=record['user'],
+        location=UsageKey.from_string(record['location']).map_into_course(course_key),
+        field=record['field'],
+        abs_date=None if isinstance(date, timedelta) else date,
+        rel_date=date if isinstance(date, timedelta) else None,
+        reason=record['reason'] or '',
+        actor=record['actor'],
+        first_component_block_id=(
+            UsageKey.from_string(first_component_block_id).map_into_course(course_key)
+            if first_component_block_id else None
+        ),
+        is_content_gated=bool(record['is_content_gated']),
+    )
+
+
+def _import_user_dates(course_key, records, content_date_ids):
+    """
+    Create the UserDates for a batch of _UserDateRecords, returning how many were created.
+
+    Learners are matched by username; records for usernames that don't exist here are skipped. So are records
+    matching the learner's latest override of the date, so importing the same snapshot again adds nothing.
+    """
+    usernames = {record.username for record in records} | {record.actor for record in records if record.actor}
+    user_ids = dict(get_user_model().objects.filter(username__in=usernames).values_list('username', 'id'))
+
+    latest = {
+        (user_id, content_date_id): (abs_date, rel_date, reason)
+        for user_id, content_date_id, abs_date, rel_date, reason in models.UserDate.objects.filter(
+            user_id__in=user_ids.values(), content_date_id__in=content_date_ids.values(),
+        ).exclude(
+            Exists(models.UserDate.superseding())
+        ).values_list('user_id', 'content_date_id', 'abs_date', 'rel_date', 'reason')
+    }
+
+    user_dates = []
+    for record in records:
+        user_id = user_ids.get(record.username)
+        content_date_id = content_date_ids.get((record.location, record.field))
+        if user_id is None or content_date_id is None:
+            log.warning('Skipping the override of %s for %s: no such user or date', record.username, record.location)
+            continue
+        if latest.get((user_id, content_date_id)) == (record.abs_date, record.rel_date, record.reason):
+            continue
+        user_dates.append(models.UserDate(
+            user_id=user_id,
+            content_date_id=content_date_id,
+            course_id=course_key,
+            abs_date=record.abs_date,
+            rel_date=record.rel_date,
+            reason=record.reason,
+            actor_id=user_ids.get(record.actor),
+            first_component_block_id=record.first_component_block_id,
+            is_content_gated=record.is_content_gated,
+        ))
+    models.UserDate.objects.bulk_create(user_dates)
+    # bulk_create doesn't call UserDate.save, which does this for single overrides.
+    for user_id in {user_date.user_id for user_date in user_dates}:
+        bump_override_generation(course_key, user_id)
+    return len(user_dates)
+
+
+def import_course_dates(stream, course_key=None, include_user_dates=True, batch_size=500):
+    """
+    Load a snapshot written by export_course_dates, replacing the course's dates like bulk_set_dates_for_course.
+
+    The blocks' locations are moved into course_key, so a snapshot of one course can be loaded into another
+    (e.g. a rerun). Overrides are added on top of any the learners already have, except where they match the
+    learner's latest override, so loading the same snapshot again (e.g. retrying an import) changes nothing.
+
+    Arguments:
+        stream: a binary file object to read the (gzipped) snapshot from
+        course_key: (optional) the course to load the dates into; defaults to the course they were exported from
+        include_user_dates: whether to load the learners' date overrides, if the snapshot has them
+        batch_size: maximum number of rows to write per query
+
+    Returns:
+        a (content_date_count, user_date_count) tuple
+
+    Raises:
+        SnapshotError: if the snapshot is truncated, of another version, or has malformed records
+    """
+    with gzip.GzipFile(fileobj=stream, mode='rb') as gzipped:
+        records = _read_records(gzipped)
+        header = next(records, None)
+        if not isinstance(header, dict) or header.get('type') != 'header':
+            raise SnapshotError('Missing snapshot header')
+        if header.get('version') != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version: {header.get('version')}")
+        with _parsing('header'):
+            course_key = ensure_key(CourseKey, course_key or header['course_id'])
+
+        policies = {}
+        items = {}
+        content_date_count = user_date_count = 0
+        content_date_ids = None
+        batch = []
+        with transaction.atomic():
+            for record in records:
+                record_type = record.get('type') if isinstance(record, dict) else None
+                if record_type == 'policy':
+                    with _parsing(record_type):
+                        policies[record['id']] = _load_date(record)
+                elif record_type == 'content_date':
+                    with _parsing(record_type):
+                        location = UsageKey.from_string(record['location']).map_into_course(course_key)
+                        fields = items.setdefault(location, {})
+                        fields[record['field']] = policies[record['policy']]
+                        fields.update((name, record.get(name)) for name in api.CONTENT_DATE_METADATA_FIELDS)
+                    content_date_count += 1
+                elif record_type == 'user_date':
+                    if not include_user_dates:
+                        continue
+                    with _parsing(record_type):
+                        user_date = _parse_user_date(record, course_key)
+                    if content_date_ids is None:
+                        # All the ContentDates come first, so they can be saved now.
+                        content_date_ids = _set_content_dates(course_key, items, batch_size)
+                    batch.append(user_date)
+                    if len(batch) >= batch_size:
+                        user_date_count += _import_user_dates(course_key, batch, content_date_ids)
+                        batch = []
+                else:
+                    raise SnapshotError(f'Unknown snapshot record: {record!r:.100}')
+
+            if content_date_ids is None:
+                _set_content_dates(course_key, items, batch_size)
+            if batch:
+                user_date_count += _import_user_dates(course_key, batch, content_date_ids)
+
+    log.info('Imported %d ContentDates and %d UserDates into %s', content_date_count, user_date_count, course_key)
+    return content_date_count, user_date_count
+
+
+def _set_content_dates(course_key, items, batch_size):
+    """
+    Save the ContentDates, returning a dictionary of their (location, field) to ContentDate id.
+    """
+    api.bulk_set_dates_for_course(course_key, items.items(), batch_size=batch_size)
+    return {
+        (location, field): content_date_id
+        for location, field, content_date_id in models.ContentDate.objects.filter(
+            course_id=course_key, active=True
+        ).values_list('location', 'field', 'id')
+    }
@@ -0,0 +1,20 @@
+"""
+Celery tasks for edx_when, used where Celery is installed (see edx_when.publish_queue).
+"""
+
+from celery import shared_task
+
+from .publish_queue import max_sync_retries, process_pending_sync, sync_retry_delay
+
+
+@shared_task(bind=True)
+def sync_course_dates(self, course_key):
+    """
+    Sync the course's dates, if its pending sync is due, retrying with a growing delay if that fails.
+    """
+    try:
+        process_pending_sync(course_key)
+    except Exception as error:
+        raise self.retry(
+            exc=error, countdown=sync_retry_delay(self.request.retries), max_retries=max_sync_retries()
+        )
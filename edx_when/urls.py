@@ -10,6 +10,11 @@ from . import views
 app_name = 'edx_when'
 
 urlpatterns = [
+    re_path(
+        r'edx_when/course/{}/overrides$'.format(settings.COURSE_ID_PATTERN),
+        views.CourseOverrides.as_view(),
+        name='course_overrides'
+    ),
     re_path(
         r'edx_when/course/{}'.format(settings.COURSE_ID_PATTERN),
         views.CourseDates.as_view(),
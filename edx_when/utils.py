@@ -1,14 +1,28 @@
 """
 Utility functions to use across edx-when.
 """
+from functools import lru_cache
+
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.utils.module_loading import import_string
 from edx_django_utils.cache.utils import RequestCache
 
-try:
-    from openedx.core.djangoapps.schedules.models import Schedule
-# TODO: Move schedules into edx-when
-except ImportError:
-    Schedule = None
+
+@lru_cache(maxsize=None)
+def get_schedule_model():
+    """
+    Return edx-platform's Schedule model, or None outside of edx-platform.
+
+    It's imported on first use rather than along with edx_when, which keeps importing edx_when cheap, and
+    only tries (and fails) once outside of edx-platform.
+    """
+    try:
+        from openedx.core.djangoapps.schedules.models import Schedule  # pylint: disable=import-outside-toplevel
+    # TODO: Move schedules into edx-when
+    except ImportError:
+        return None
+    return Schedule
 
 
 def get_schedule_for_user(user_id, course_key, use_cached=True):
@@ -18,7 +32,8 @@ def get_schedule_for_user(user_id, course_key, use_cached=True):
     # If Schedule is not defined, there's nothing to query, so return None. This
     # hackiness is happening because the Schedule model is in edx-platform at
     # the moment.
-    if not Schedule:
+    schedule_model = get_schedule_model()
+    if not schedule_model:
         return None
 
     # This is intentionally a RequestCache and not a TieredCache–that way it's
@@ -32,7 +47,7 @@ def get_schedule_for_user(user_id, course_key, use_cached=True):
             return cache_response.value
 
     try:
-        schedule = Schedule.objects.get(
+        schedule = schedule_model.objects.get(
             enrollment__user__id=user_id,
             enrollment__course__id=course_key,
         )
@@ -42,3 +57,116 @@ def get_schedule_for_user(user_id, course_key, use_cached=True):
     cache.set(cache_key, schedule)
 
     return schedule
+
+
+def get_schedules_for_users(user_ids, course_key):
+    """
+    Return a dictionary of user id to schedule in the course, for the users who have one.
+
+    This loads them in one query, and caches them for get_schedule_for_user.
+    """
+    schedule_model = get_schedule_model()
+    if not schedule_model:
+        return {}
+
+    schedules = {
+        schedule.enrollment.user_id: schedule
+        for schedule in schedule_model.objects.filter(
+            enrollment__user__id__in=user_ids,
+            enrollment__course__id=course_key,
+        ).select_related('enrollment')
+    }
+    cache = RequestCache('edx-when')
+    for user_id in user_ids:
+        cache.set(f"get_schedule_for_user::{user_id}::{course_key}", schedules.get(user_id))
+    return schedules
+
+
+def get_schedules_for_courses(user_id, course_keys):
+    """
+    Return a dictionary of course key to the user's schedule in the course, for the courses where they have one.
+
+    Like get_schedules_for_users, this loads the ones get_schedule_for_user hasn't cached in one query, and
+    caches them for it.
+    """
+    schedule_model = get_schedule_model()
+    if not schedule_model:
+        return {}
+
+    cache = RequestCache('edx-when')
+    schedules = {}
+    missing = []
+    for course_key in course_keys:
+        cache_response = cache.get_cached_response(f"get_schedule_for_user::{user_id}::{course_key}")
+        if not cache_response.is_found:
+            missing.append(course_key)
+        elif cache_response.value is not None:
+            schedules[course_key] = cache_response.value
+
+    if missing:
+        loaded = {
+            schedule.enrollment.course_id: schedule
+            for schedule in schedule_model.objects.filter(
+                enrollment__user__id=user_id,
+                enrollment__course__id__in=missing,
+            ).select_related('enrollment')
+        }
+        for course_key in missing:
+            cache.set(f"get_schedule_for_user::{user_id}::{course_key}", loaded.get(course_key))
+        schedules.update(loaded)
+    return schedules
+
+
+def get_published_version(course_key):
+    """
+    Return the course's published version from the modulestore, or None if it isn't available.
+    """
+    try:
+        # Like Schedule, this lives in edx-platform, so gracefully fail outside of it.
+        from xmodule.modulestore.django import modulestore  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+
+    course = modulestore().get_course(course_key, depth=0)
+    return str(course.course_version) if course and course.course_version else None
+
+
+def get_course_date_items(course_key):
+    """
+    Return the (location, field metadata dictionary) items for set_dates_for_course from the course's content.
+
+    EDX_WHEN_COURSE_DATES_SOURCE may name another function taking a course key and returning the items. By default,
+    the items are extracted from the modulestore the same way as on publish; outside of edx-platform, this
+    returns None.
+    """
+    if getattr(settings, 'EDX_WHEN_COURSE_DATES_SOURCE', None):
+        return import_string(settings.EDX_WHEN_COURSE_DATES_SOURCE)(course_key)
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        from openedx.core.djangoapps.course_date_signals.handlers import extract_dates_from_course
+        from xmodule.modulestore.django import modulestore
+    except ImportError:
+        return None
+
+    course = modulestore().get_course(course_key)
+    return extract_dates_from_course(course) if course else None
+
+
+async def aget_schedule_for_user(user_id, course_key):
+    """
+    Async version of get_schedule_for_user.
+
+    This skips the request cache: it is thread-local, so it doesn't isolate requests sharing an event loop.
+    """
+    schedule_model = get_schedule_model()
+    if not schedule_model:
+        return None
+
+    try:
+        return await schedule_model.objects.aget(
+            enrollment__user__id=user_id,
+            enrollment__course__id=course_key,
+        )
+    except ObjectDoesNotExist:
+        return None
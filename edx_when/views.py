@@ -2,16 +2,176 @@
 Views for date-related REST APIs.
 """
 
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
 from edx_rest_framework_extensions.auth.jwt.authentication import JwtAuthentication
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+from rest_framework import status
 from rest_framework.authentication import SessionAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
+from . import api
+
+MAX_OVERRIDES_PAGE_SIZE = 1000
+
+
+def _get_course_key(course_id):
+    """
+    Parse the course id from the URL, raising a 404 if it is invalid.
+    """
+    try:
+        return CourseKey.from_string(course_id)
+    except InvalidKeyError as error:
+        raise NotFound(f'Invalid course id: {course_id}') from error
+
+
+def _etag_matches(etag, if_none_match):
+    """
+    Return whether the ETag is listed in an If-None-Match header (using weak comparison, per RFC 9110).
+    """
+    etags = parse_etags(if_none_match)
+    if '*' in etags:
+        return True
+    return etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in etags}
+
 
 class CourseDates(APIView):
     """
     Returns dates for a course.
+
+    **Example Requests**
+
+        GET /api/edx_when/course/{course_id}
+        GET /api/edx_when/course/{course_id}?subsection_and_higher_only=true
+
+    **Response Values**
+
+        * course_id: the course the dates are for
+        * dates: a list of {"location", "field", "date"} objects, including the requesting user's overrides
+
+    Responses carry an ETag, so clients polling for changes can send If-None-Match
+    and get an empty 304 response when the dates haven't changed.
     """
 
     authentication_classes = (SessionAuthentication, JwtAuthentication)
     permission_classes = (IsAuthenticated,)
+
+    def get(self, request, course_id):
+        """
+        Return the requesting user's dates for the course.
+        """
+        course_key = _get_course_key(course_id)
+        subsection_and_higher_only = request.query_params.get('subsection_and_higher_only', '').lower() in (
+            'true', '1'
+        )
+        # Looking up the published version would hit the modulestore on every poll. The dates are cached under the
+        # course's generation instead, which every write of them moves on, and the ETag is built from it too.
+        etag = quote_etag(api.get_dates_version(
+            course_key,
+            user=request.user,
+            subsection_and_higher_only=subsection_and_higher_only,
+        ))
+        if _etag_matches(etag, request.headers.get('If-None-Match', '')):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            dates = api.get_dates_for_course(
+                course_key,
+                user=request.user,
+                subsection_and_higher_only=subsection_and_higher_only,
+            )
+            response = Response({
+                'course_id': str(course_key),
+                'dates': [
+                    {'location': str(location), 'field': field, 'date': date}
+                    for (location, field), date in sorted(dates.items(), key=lambda item: (str(item[0][0]), item[0][1]))
+                ],
+            })
+
+        response['ETag'] = etag
+        # The dates are per-user, so only the client may cache them, and it should revalidate with the ETag.
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=getattr(settings, 'EDX_WHEN_COURSE_DATES_MAX_AGE', 0),
+            must_revalidate=True,
+        )
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+
+
+class CourseOverrides(APIView):
+    """
+    Returns the latest learner date overrides (extensions) for a course, one page at a time.
+
+    **Example Requests**
+
+        GET /api/edx_when/course/{course_id}/overrides
+        GET /api/edx_when/course/{course_id}/overrides?block_id={usage_key}&username={username}&page_size=500
+
+    **Query Parameters**
+
+        * after: the cursor returned as part of the previous page's "next" link
+        * page_size: number of overrides per page (default 100, at most 1000)
+        * block_id: only return overrides for this block
+        * username: only return overrides for this learner
+
+    **Response Values**
+
+        * results: a list of {"username", "full_name", "email", "location", "date"} objects
+        * next: the URL of the next page, or null on the last page
+
+    Pages are keyed on the last override returned rather than an offset, so every page is
+    equally cheap to fetch, even in courses with hundreds of thousands of learners.
+    """
+
+    authentication_classes = (SessionAuthentication, JwtAuthentication)
+    permission_classes = (IsAuthenticated, IsAdminUser)
+
+    def get(self, request, course_id):
+        """
+        Return a page of overrides for the course.
+        """
+        course_key = _get_course_key(course_id)
+        try:
+            after_id = int(request.query_params.get('after', 0))
+            page_size = min(int(request.query_params.get('page_size', 100)), MAX_OVERRIDES_PAGE_SIZE)
+        except ValueError as error:
+            raise ValidationError('after and page_size must be integers') from error
+        if page_size < 1:
+            raise ValidationError('page_size must be positive')
+
+        block_id = request.query_params.get('block_id')
+        if block_id:
+            try:
+                block_id = UsageKey.from_string(block_id)
+            except InvalidKeyError as error:
+                raise ValidationError(f'Invalid block id: {block_id}') from error
+
+        user = None
+        username = request.query_params.get('username')
+        if username:
+            user = get_user_model().objects.filter(username=username).first()
+            if user is None:
+                return Response({'results': [], 'next': None})
+
+        overrides, next_after_id = api.get_overrides_page(
+            course_key, after_id=after_id, page_size=page_size, block_id=block_id or None, user=user,
+        )
+        next_url = None
+        if next_after_id is not None:
+            next_url = replace_query_param(request.build_absolute_uri(), 'after', next_after_id)
+
+        return Response({
+            'results': [
+                {'username': name, 'full_name': full_name, 'email': email, 'location': str(location), 'date': date}
+                for name, full_name, email, location, date in overrides
+            ],
+            'next': next_url,
+        })
@@ -0,0 +1,106 @@
+"""
+Tests for the edx_when admin changelists.
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+
+from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from opaque_keys.edx.locator import CourseLocator
+
+from edx_when.admin import EstimatedCountPaginator
+from edx_when.models import ContentDate, DatePolicy, UserDate
+from test_utils import make_block_id
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    """
+    Tests of the search, course filter and paginator of the changelists.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.user = User.objects.create(username='learner')
+        self.other_user = User.objects.create(username='other')
+        self.course_id = CourseLocator('testX', 'tt101', '2019')
+        self.other_course_id = CourseLocator('testX', 'tt102', '2019')
+        policy = DatePolicy.objects.create(abs_date=datetime(2019, 4, 1))
+
+        self.block = make_block_id(self.course_id)
+        self.content_date = ContentDate.objects.create(
+            course_id=self.course_id, location=self.block, field='due', policy=policy
+        )
+        self.other_content_date = ContentDate.objects.create(
+            course_id=self.other_course_id, location=make_block_id(self.other_course_id), field='due', policy=policy
+        )
+        self.user_date = UserDate.objects.create(
+            user=self.user, content_date=self.content_date, abs_date=datetime(2019, 4, 2)
+        )
+        self.other_user_date = UserDate.objects.create(
+            user=self.other_user, content_date=self.other_content_date, abs_date=datetime(2019, 4, 3)
+        )
+
+    def _changelist_rows(self, model, **params):
+        """
+        Return the rows the model's changelist shows for the query string parameters.
+        """
+        request = RequestFactory().get('/', params)
+        request.user = self.admin_user
+        changelist = admin.site._registry[model].get_changelist_instance(request)  # pylint: disable=protected-access
+        return set(changelist.queryset)
+
+    def test_search_user_dates(self):
+        assert self._changelist_rows(UserDate, q=str(self.course_id)) == {self.user_date}
+        assert self._changelist_rows(UserDate, q=str(self.block)) == {self.user_date}
+        assert self._changelist_rows(UserDate, q='other') == {self.other_user_date}
+        assert self._changelist_rows(UserDate, q='nobody') == set()
+        assert self._changelist_rows(UserDate, q=' ') == {self.user_date, self.other_user_date}
+
+    def test_search_content_dates(self):
+        assert self._changelist_rows(ContentDate, q=str(self.other_course_id)) == {self.other_content_date}
+        assert self._changelist_rows(ContentDate, q=str(self.block)) == {self.content_date}
+        # Without a username field, other terms match nothing.
+        assert self._changelist_rows(ContentDate, q='learner') == set()
+
+    def test_course_filter(self):
+        assert self._changelist_rows(UserDate, course_id=str(self.course_id)) == {self.user_date}
+        assert self._changelist_rows(ContentDate, course_id=str(self.other_course_id)) == {self.other_content_date}
+        assert self._changelist_rows(UserDate, course_id=str(self.course_id), q='other') == set()
+
+    def test_course_filter_uses_user_date_course(self):
+        # The filter reads UserDate's own course column, without joining ContentDate.
+        request = RequestFactory().get('/', {'course_id': str(self.course_id)})
+        request.user = self.admin_user
+        changelist = admin.site._registry[UserDate].get_changelist_instance(request)  # pylint: disable=protected-access
+        [lookup] = changelist.queryset.query.where.children
+        assert lookup.lhs.target == UserDate._meta.get_field('course_id')
+
+    def test_course_filter_invalid_key(self):
+        with self.assertRaises(IncorrectLookupParameters):
+            self._changelist_rows(UserDate, course_id='not a course key')
+
+    @override_settings(EDX_WHEN_ADMIN_COUNT_LIMIT=1)
+    def test_count_capped(self):
+        assert EstimatedCountPaginator(UserDate.objects.all(), 10).count == 1
+        assert EstimatedCountPaginator(UserDate.objects.filter(user=self.user), 10).count == 1
+        with override_settings(EDX_WHEN_ADMIN_COUNT_LIMIT=10):
+            assert EstimatedCountPaginator(UserDate.objects.all(), 10).count == 2
+
+    @override_settings(EDX_WHEN_ADMIN_COUNT_LIMIT=1)
+    def test_count_estimated(self):
+        with patch('edx_when.admin._estimated_row_count', return_value=5000) as estimate:
+            assert EstimatedCountPaginator(UserDate.objects.all(), 10).count == 5000
+            # Filtered changelists are counted (up to the limit), not estimated.
+            assert EstimatedCountPaginator(UserDate.objects.filter(user=self.user), 10).count == 1
+        estimate.assert_called_once()
+
+    def test_count_estimate_below_limit(self):
+        # An estimate under the limit may be stale, so the rows are counted instead.
+        with patch('edx_when.admin._estimated_row_count', return_value=1):
+            assert EstimatedCountPaginator(UserDate.objects.all(), 10).count == 2
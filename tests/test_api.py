@@ -3,17 +3,24 @@ Tests for edx_when.api
 """
 
 import sys
+import threading
 from datetime import datetime, timedelta
-from unittest.mock import Mock, call, patch
+from functools import partial
+from unittest.mock import MagicMock, Mock, patch
 
 import ddt
+from asgiref.sync import async_to_sync
 from django.contrib import auth
-from django.test import TestCase
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.connection import ConnectionDoesNotExist
 from edx_django_utils.cache.utils import RequestCache, TieredCache
 from opaque_keys.edx.locator import CourseLocator
 
 from edx_when import api, models
+from edx_when.cache import get_cached, get_course_generation
 from test_utils import make_block_id, make_items
 from tests.test_models_app.models import DummyCourse, DummyEnrollment, DummySchedule
 
@@ -47,7 +54,7 @@ class ApiTests(TestCase):
         )
         self.schedule.save()
 
-        dummy_schedule_patcher = patch('edx_when.utils.Schedule', DummySchedule)
+        dummy_schedule_patcher = patch('edx_when.utils.get_schedule_model', return_value=DummySchedule)
         dummy_schedule_patcher.start()
         self.addCleanup(dummy_schedule_patcher.stop)
 
@@ -61,7 +68,7 @@ class ApiTests(TestCase):
         RequestCache.clear_all_namespaces()
         TieredCache.dangerous_clear_all_tiers()
 
-    @patch('edx_when.api.Schedule', DummySchedule)
+    @patch('edx_when.api.get_schedule_model', lambda: DummySchedule)
     def test_get_schedules_with_due_date_for_abs_date(self):
         self.schedule.start_date = datetime(2019, 3, 22)
         items = make_items(with_relative=False)
@@ -74,7 +81,7 @@ class ApiTests(TestCase):
             assert schedule.enrollment.course_id == items[0][0].course_key
             assert schedule.enrollment.user.id == self.user.id
 
-    @patch('edx_when.api.Schedule', DummySchedule)
+    @patch('edx_when.api.get_schedule_model', lambda: DummySchedule)
     def test_get_schedules_with_due_date_for_rel_date(self):
         items = make_items(with_relative=False)
         api.set_dates_for_course(items[0][0].course_key, items)
@@ -91,7 +98,7 @@ class ApiTests(TestCase):
             assert schedule.enrollment.course_id == items[0][0].course_key
             assert schedule.enrollment.user.id == self.user.id
 
-    @patch('edx_when.api.Schedule', DummySchedule)
+    @patch('edx_when.api.get_schedule_model', lambda: DummySchedule)
     def test_get_schedules_with_due_date_for_abs_user_dates(self):
         items = make_items(with_relative=True)
         api.set_dates_for_course(items[0][0].course_key, items)
@@ -108,7 +115,7 @@ class ApiTests(TestCase):
         assert schedules[0].enrollment.course_id == items[0][0].course_key
         assert schedules[0].enrollment.user.id == self.user.id
 
-    @patch('edx_when.api.Schedule', DummySchedule)
+    @patch('edx_when.api.get_schedule_model', lambda: DummySchedule)
     def test_get_schedules_with_due_date_for_rel_user_dates(self):
         items = make_items(with_relative=True)
         api.set_dates_for_course(items[0][0].course_key, items)
@@ -132,6 +139,161 @@ class ApiTests(TestCase):
         cdates = models.ContentDate.objects.all()
         assert len(cdates) == NUM_OVERRIDES
 
+    def test_bulk_set_dates_for_course(self):
+        items = make_items(with_relative=True)
+        course_key = items[0][0].course_key
+        api.set_dates_for_course(course_key, items)
+        expected = api.get_dates_for_course(course_key, use_cached=False)
+        models.ContentDate.objects.all().delete()
+
+        # Read the course's rows and policies, upsert the new rows, record their keys in a temporary table (created,
+        # indexed and dropped) and deactivate the rest, in a savepoint
+        with self.assertNumQueries(10):
+            assert api.bulk_set_dates_for_course(course_key, items) == (NUM_OVERRIDES + 3, 0, 0)
+        assert api.get_dates_for_course(course_key, use_cached=False) == expected
+        assert set(models.ContentDate.objects.values_list('block_type', flat=True)) == {'sequential'}
+
+        # Nothing changed
+        assert api.bulk_set_dates_for_course(course_key, items) == (0, 0, 0)
+
+    def test_bulk_set_dates_for_course_updates(self):
+        items = make_items()
+        course_key = items[0][0].course_key
+        api.set_dates_for_course(course_key, items)
+        models.ContentDate.objects.update(block_type=None)
+        models.ContentDate.objects.filter(location=items[1][0]).update(active=False)
+
+        new_items = [
+            (items[0][0], {'due': datetime(2019, 5, 1), 'assignment_title': 'Homework 1', 'course_name': 'Test'}),
+            (items[1][0], items[1][1]),
+            (make_block_id(course_key), {'due': timedelta(days=3), 'subsection_name': 'Week 1'}),
+        ]
+        assert api.bulk_set_dates_for_course(course_key, new_items) == (1, 2, 1)
+
+        retrieved = api.get_dates_for_course(course_key, user=self.user, use_cached=False)
+        assert retrieved == {
+            (items[0][0], 'due'): datetime(2019, 5, 1),
+            (items[1][0], 'due'): items[1][1]['due'],
+            (new_items[2][0], 'due'): self.schedule.start_date + timedelta(days=3),
+        }
+        first = models.ContentDate.objects.get(location=items[0][0])
+        assert (first.block_type, first.assignment_title, first.course_name) == ('sequential', 'Homework 1', 'Test')
+        assert models.ContentDate.objects.get(location=new_items[2][0]).subsection_name == 'Week 1'
+        assert not models.ContentDate.objects.get(location=items[2][0]).active
+        # Existing policies were reused
+        assert models.DatePolicy.objects.filter(abs_date=items[1][1]['due']).count() == 1
+
+    def test_set_dates_for_course_in_chunks(self):
+        items = make_items(with_relative=True)
+        course_key = items[0][0].course_key
+        api.set_dates_for_course(course_key, items)
+        expected = api.get_dates_for_course(course_key, use_cached=False)
+        api.set_dates_for_course(course_key, [(make_block_id(course_key), {'due': datetime(2019, 4, 1)})])
+        with self.captureOnCommitCallbacks(execute=True):
+            previous = api.get_dates_for_course(course_key)
+        version = 'CHUNKED_VERSION'
+        publish_chunk = api._sync_chunk  # pylint: disable=protected-access
+        read_mid_publish = []
+
+        def read_after_chunk(*args):
+            counts = publish_chunk(*args)
+            # Readers keep the entries cached before the publish...
+            read_mid_publish.append(api.get_dates_for_course(course_key))
+            read_mid_publish.append(api.prefetch_dates_for_courses([course_key])[course_key])
+            # ...and don't cache the half-published dates for the new version (or for a new user)
+            for read in (
+                partial(api.get_dates_for_course, course_key, published_version=version),
+                async_to_sync(partial(api.aget_dates_for_course, course_key, published_version=version)),
+                partial(api.prefetch_dates_for_courses, [course_key], user=self.user),
+            ):
+                read()
+                RequestCache.clear_all_namespaces()
+                with CaptureQueriesContext(connection) as queries:
+                    read()
+                assert [query for query in queries if 'edx_when_contentdate' in query['sql']]
+                RequestCache.clear_all_namespaces()
+            return counts
+
+        with patch('edx_when.api._sync_chunk', side_effect=read_after_chunk):
+            with self.captureOnCommitCallbacks(execute=True):
+                api.set_dates_for_course(course_key, items, chunk_size=3)
+        assert previous != expected
+        assert read_mid_publish == [previous] * 6
+        assert api.get_dates_for_course(course_key, published_version=version) == expected
+        assert api.get_dates_for_course(course_key) == expected
+        assert models.ContentDate.objects.filter(course_id=course_key, active=False).count() == 1
+
+        # The lock was released
+        with api.course_publish_lock(course_key, timeout=0):
+            pass
+
+    def test_set_dates_for_course_in_chunks_failures(self):
+        items = make_items()
+        course_key = items[0][0].course_key
+        generation = get_course_generation(course_key)
+
+        # Without the marker, readers would cache a half-published course
+        with patch('edx_when.api._publish_in_progress', return_value=False):
+            with self.assertRaises(api.PublishMarkerError):
+                api.set_dates_for_course(course_key, items, chunk_size=2)
+        assert not models.ContentDate.objects.filter(course_id=course_key).exists()
+
+        # A publish that fails part way moves the cache keys on past its committed chunks
+        with patch('edx_when.api._sync_chunk', side_effect=[(2, 0, [(items[0][0], 'due')] * 2), ValueError]):
+            with self.assertRaises(ValueError):
+                api.set_dates_for_course(course_key, items, chunk_size=2)
+        assert get_course_generation(course_key) != generation
+        assert not api._publish_in_progress(course_key)  # pylint: disable=protected-access
+
+    @override_settings(EDX_WHEN_PUBLISH_CHUNK_SIZE=2, EDX_WHEN_PUBLISH_LOCK_TIMEOUT=0)
+    def test_publish_lock_timeout(self):
+        items = make_items()
+        course_key = items[0][0].course_key
+        with api.course_publish_lock(str(course_key)):
+            with self.assertRaises(api.PublishLockTimeout):
+                api.set_dates_for_course(course_key, items)
+            # Other courses aren't blocked
+            api.set_dates_for_course(course_key.replace(run='2020'), make_items(course_key.replace(run='2020')))
+        api.set_dates_for_course(course_key, items)
+        assert api.get_dates_for_course(course_key, use_cached=False)
+
+    @ddt.data(
+        ('mysql', [(1,), (1,)], ['SELECT GET_LOCK(%s, %s)', 'SELECT RELEASE_LOCK(%s)']),
+        ('postgresql', [(True,), (True,)], ['SELECT pg_try_advisory_lock(%s)', 'SELECT pg_advisory_unlock(%s)']),
+    )
+    @ddt.unpack
+    def test_publish_lock_database(self, vendor, results, statements):
+        mock_connection = MagicMock(vendor=vendor)
+        cursor = mock_connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.side_effect = results
+        with patch('edx_when.api.connections', {'default': mock_connection}):
+            with api.course_publish_lock(self.course.id):
+                pass
+        assert [execute_call.args[0] for execute_call in cursor.execute.call_args_list] == statements
+
+    def test_content_dates_are_upserted(self):
+        items = make_items()
+        course_key = items[0][0].course_key
+        api.set_dates_for_course(course_key, items)
+        existing = models.ContentDate.objects.get(location=items[0][0], field='due')
+        new_due = datetime(2019, 6, 1)
+
+        # A concurrent publish that didn't see the row updates it instead of adding another...
+        with patch.object(models.ContentDate.objects, 'filter', return_value=models.ContentDate.objects.none()):
+            assert api.bulk_set_dates_for_course(course_key, [(items[0][0], {'due': new_due})])[0] == 1
+        assert models.ContentDate.objects.get(location=items[0][0], field='due').policy.abs_date == new_due
+
+        # ...as does set_date_for_block
+        with patch.object(models.ContentDate.objects, 'select_related') as mock_select_related:
+            mock_select_related.return_value.get.side_effect = models.ContentDate.DoesNotExist
+            assert api.set_date_for_block(course_key, items[0][0], 'due', datetime(2019, 7, 1)) == existing.id
+        assert models.ContentDate.objects.filter(location=items[0][0], field='due').count() == 1
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            models.ContentDate.objects.create(
+                course_id=course_key, location=items[0][0], field='due', policy=existing.policy
+            )
+
     def test_get_dates_for_course_outline(self):
         items = make_items()
         course_key = items[0][0].course_key
@@ -162,6 +324,45 @@ class ApiTests(TestCase):
         )
         assert len(retrieved) == NUM_OVERRIDES
 
+    @override_settings(EDX_WHEN_STRICT_BLOCK_TYPE_FILTER=True)
+    def test_get_dates_for_course_outline_strict(self):
+        items = make_items()
+        course_key = items[0][0].course_key
+        items.append((make_block_id(course_key, block_type='video'), {'start': datetime(2019, 3, 21)}))
+        api.set_dates_for_course(course_key, items)
+        models.ContentDate.objects.filter(location=items[0][0]).update(block_type=None)
+
+        with CaptureQueriesContext(connection) as queries:
+            retrieved = api.get_dates_for_course(
+                course_key, subsection_and_higher_only=True, published_version=self.course_version
+            )
+        # Rows without a block_type are no longer included, so the (course_id, block_type) index can serve the query
+        assert len(retrieved) == NUM_OVERRIDES - 1
+        assert 'IS NULL' not in queries[0]['sql']
+
+        assert api.warm_dates_cache_for_course(course_key, 'warmed') == 8
+        assert api.get_dates_for_course(course_key, subsection_and_higher_only=True, published_version='warmed') == (
+            retrieved
+        )
+
+    def test_strict_block_type_filter_in_cache_keys(self):
+        items = make_items()
+        course_key = items[0][0].course_key
+        api.set_dates_for_course(course_key, items)
+        models.ContentDate.objects.filter(location=items[0][0]).update(block_type=None)
+
+        lenient = api.get_dates_for_course(
+            course_key, subsection_and_higher_only=True, published_version=self.course_version
+        )
+        assert len(lenient) == NUM_OVERRIDES
+        RequestCache.clear_all_namespaces()
+        with override_settings(EDX_WHEN_STRICT_BLOCK_TYPE_FILTER=True):
+            # The entry cached under the lenient filter isn't served
+            strict = api.get_dates_for_course(
+                course_key, subsection_and_higher_only=True, published_version=self.course_version
+            )
+        assert len(strict) == NUM_OVERRIDES - 1
+
     def test_get_dates_for_course(self):
         items = make_items()
         api.set_dates_for_course(items[0][0].course_key, items)
@@ -194,6 +395,34 @@ class ApiTests(TestCase):
         assert first_id.course_key != last_id.course_key
         return items
 
+    def test_override_invalidates_cached_dates(self):
+        items = make_items()
+        course_key = items[0][0].course_key
+        block_id = items[0][0]
+        api.set_dates_for_course(course_key, items)
+        other_user = User.objects.create(username='other')
+        before = api.get_dates_for_course(course_key, user=self.user, published_version=self.course_version)
+        api.get_dates_for_course(course_key, user=other_user, published_version=self.course_version)
+
+        api.set_date_for_block(course_key, block_id, 'due', datetime(2019, 4, 10), user=self.user)
+        RequestCache.clear_all_namespaces()
+        after = api.get_dates_for_course(course_key, user=self.user, published_version=self.course_version)
+        assert before[(block_id, 'due')] == items[0][1]['due']
+        assert after[(block_id, 'due')] == datetime(2019, 4, 10)
+
+        # Other learners' cached dates are still used (only their schedule is read, for the cache key)
+        RequestCache.clear_all_namespaces()
+        with self.assertNumQueries(1):
+            api.get_dates_for_course(course_key, user=other_user, published_version=self.course_version)
+
+        # So are the course-wide ContentDates: only the override and schedule are read again
+        models.UserDate.objects.get().delete()
+        RequestCache.clear_all_namespaces()
+        with self.assertNumQueries(2):
+            assert api.get_dates_for_course(
+                course_key, user=self.user, published_version=self.course_version
+            ) == before
+
     def test_get_dates_no_schedule(self):
         items = make_items(with_relative=True)
         course_key = items[0][0].course_key
@@ -234,6 +463,83 @@ class ApiTests(TestCase):
             api._clear_dates_for_course(items[0][0].course_key)  # pylint: disable=protected-access
         self.assertEqual(api.get_dates_for_course(items[0][0].course_key, use_cached=False), {})
 
+    @ddt.data(
+        (datetime(2019, 4, 6), datetime(2019, 4, 10), datetime(2019, 4, 10)),
+        (datetime(2019, 4, 6), timedelta(days=3), datetime(2019, 4, 9)),
+        (timedelta(days=3), datetime(2019, 4, 10), datetime(2019, 4, 10)),
+        (timedelta(days=3), timedelta(days=2), datetime(2019, 4, 6)),
+    )
+    @ddt.unpack
+    def test_set_dates_for_users(self, initial_date, override_date, expected_date):
+        items = make_items()
+        block_id = items[0][0]
+        items[0][1]['due'] = initial_date
+        api.set_dates_for_course(block_id.course_key, items)
+        other_users = [User.objects.create(username=f'other{number}') for number in range(3)]
+        for user in other_users:
+            enrollment = DummyEnrollment.objects.create(user=user, course=self.course)
+            DummySchedule.objects.create(
+                enrollment=enrollment, created=datetime(2019, 4, 1), start_date=datetime(2019, 4, 1)
+            )
+        # The new overrides show up in the users' cached dates
+        api.get_dates_for_course(block_id.course_key, user=self.user, published_version='v1')
+
+        dates_by_user = {user.id: override_date for user in [self.user] + other_users}
+        # Read the ContentDate, users and schedules, then create the overrides, in a savepoint
+        with self.assertNumQueries(6):
+            errors = api.set_dates_for_users(
+                str(block_id.course_key), str(block_id), 'due', dates_by_user,
+                reason='Extension', actor=other_users[0],
+            )
+        assert not errors
+
+        assert api.get_dates_for_course(block_id.course_key, user=self.user, published_version='v1')[
+            (block_id, 'due')
+        ] == expected_date
+        for user in other_users:
+            assert list(api.get_overrides_for_user(block_id.course_key, user)) == [
+                {'location': block_id, 'actual_date': expected_date}
+            ]
+        user_date = models.UserDate.objects.filter(user=self.user).get()
+        assert (user_date.course_id, user_date.reason, user_date.actor) == (
+            block_id.course_key, 'Extension', other_users[0]
+        )
+
+    def test_set_dates_for_users_errors(self):
+        items = make_items(with_relative=True)
+        course_key = items[0][0].course_key
+        api.set_dates_for_course(course_key, items)
+        unscheduled_user = User.objects.create(username='unscheduled')
+
+        # The first block is due 2019-03-22, and the fifth one day after the learner's start
+        errors = api.set_dates_for_users(course_key, items[0][0], 'due', {
+            self.user.id: datetime(2019, 3, 21),
+            unscheduled_user.id: datetime(2019, 3, 23),
+        })
+        assert list(errors) == [self.user.id]
+        assert isinstance(errors[self.user.id], api.InvalidDateError)
+        assert models.UserDate.objects.filter(user=unscheduled_user).exists()
+
+        errors = api.set_dates_for_users(course_key, items[4][0], 'due', {
+            self.user.id: timedelta(days=1),
+            unscheduled_user.id: timedelta(days=1),
+        })
+        assert list(errors) == [unscheduled_user.id]
+        assert isinstance(errors[unscheduled_user.id], models.MissingScheduleError)
+        assert models.UserDate.objects.count() == 2
+
+        # Unknown users are reported without failing the others
+        errors = api.set_dates_for_users(course_key, items[0][0], 'due', {
+            self.user.id: datetime(2019, 3, 23),
+            999999: datetime(2019, 3, 23),
+        })
+        assert list(errors) == [999999]
+        assert isinstance(errors[999999], User.DoesNotExist)
+        assert models.UserDate.objects.count() == 3
+
+        with self.assertRaises(api.MissingDateError):
+            api.set_dates_for_users(course_key, make_block_id(), 'due', {self.user.id: datetime(2019, 4, 6)})
+
     def test_set_user_override_invalid_block(self):
         items = make_items()
         first = items[0]
@@ -288,6 +594,44 @@ class ApiTests(TestCase):
 
         overrides = list(api.get_overrides_for_user(block_id.course_key, self.user))
 
+    @ddt.data(
+        (datetime(2019, 4, 6), datetime(2019, 4, 10), datetime(2019, 4, 10)),
+        (datetime(2019, 4, 6), timedelta(days=3), datetime(2019, 4, 9)),
+        (timedelta(days=3), datetime(2019, 4, 10), datetime(2019, 4, 10)),
+        (timedelta(days=3), timedelta(days=2), datetime(2019, 4, 6)),
+    )
+    @ddt.unpack
+    @override_settings(EDX_WHEN_USE_USERDATE_COURSE_ID=True)
+    def test_set_user_override_denormalized_lookup(self, initial_date, override_date, expected_date):
+        items = make_items()
+        block_id = items[0][0]
+        items[0][1]['due'] = initial_date
+        api.set_dates_for_course(str(block_id.course_key), items)
+
+        api.set_date_for_block(block_id.course_key, block_id, 'due', override_date, user=self.user)
+        assert models.UserDate.objects.get().course_id == block_id.course_key
+
+        self._clear_caches()
+        retrieved = api.get_dates_for_course(block_id.course_key, user=self.user.id)
+        assert len(retrieved) == NUM_OVERRIDES
+        assert retrieved[block_id, 'due'] == expected_date
+
+        overrides = list(api.get_overrides_for_user(block_id.course_key, self.user))
+        assert overrides == [{'location': block_id, 'actual_date': expected_date}]
+
+    @override_settings(EDX_WHEN_USE_USERDATE_COURSE_ID=True)
+    def test_denormalized_lookup_skips_inactive_dates(self):
+        items = make_items()
+        block_id = items[0][0]
+        api.set_dates_for_course(block_id.course_key, items)
+        api.set_date_for_block(block_id.course_key, block_id, 'due', datetime(2019, 4, 10), user=self.user)
+
+        # Re-publish without the overridden block, which deactivates its ContentDate.
+        api.set_dates_for_course(block_id.course_key, items[1:])
+        retrieved = api.get_dates_for_course(block_id.course_key, user=self.user.id, use_cached=False)
+        assert (block_id, 'due') not in retrieved
+        assert len(retrieved) == NUM_OVERRIDES - 1
+
     @ddt.data(
         (datetime(2019, 4, 6), datetime(2019, 4, 10), datetime(2019, 4, 10)),
         # The expected date shifts from 4/6 to 4/4 because once it converts to a relative date,
@@ -357,9 +701,44 @@ class ApiTests(TestCase):
         items = make_items()
         course_id = items[0][0].course_key
         assert not api.is_enabled_for_course(course_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            api.set_dates_for_course(course_id, items)
+        RequestCache.clear_all_namespaces()
+        # The flag was updated by the write, so it's only read from the cache
+        with self.assertNumQueries(0):
+            assert api.is_enabled_for_course(course_id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            api._clear_dates_for_course(course_id)  # pylint: disable=protected-access
+        with self.assertNumQueries(0):
+            assert not api.is_enabled_for_course(course_id)
+
+    def test_is_enabled_before_commit(self):
+        items = make_items()
+        course_id = items[0][0].course_key
+        assert not api.is_enabled_for_course(course_id)
+        # Without a commit, the flag is only cleared
+        api.set_dates_for_course(course_id, items)
+        with self.assertNumQueries(1):
+            assert api.is_enabled_for_course(course_id)
+
+    def test_enabled_courses(self):
+        items = make_items()
+        course_id = items[0][0].course_key
+        other_course_id = CourseLocator('testX', 'tt202', '2019')
         api.set_dates_for_course(course_id, items)
         assert api.is_enabled_for_course(course_id)
 
+        # The cached flag is used, and the other courses are looked up together
+        course_ids = [course_id, str(other_course_id), CourseLocator('testX', 'tt303', '2019')]
+        with self.assertNumQueries(1):
+            assert api.enabled_courses(course_ids) == {course_id}
+        RequestCache.clear_all_namespaces()
+        with self.assertNumQueries(0):
+            assert api.enabled_courses(course_ids) == {course_id}
+            assert not api.is_enabled_for_course(other_course_id)
+        assert api.enabled_courses([]) == set()
+
     def test_allow_relative_dates(self):
         course_key = CourseLocator('testX', 'tt101', '2019')
         block1 = make_block_id(course_key)
@@ -529,6 +908,38 @@ class ApiTests(TestCase):
 
         assert overrides == expected_overrides
 
+    def test_get_overrides_page(self):
+        course_key = CourseLocator('testX', 'tt105', '2019')
+        blocks = [make_block_id(course_key) for _ in range(3)]
+        api.set_dates_for_course(course_key, [(block, {'due': datetime(2019, 3, 22)}) for block in blocks])
+
+        user2 = User.objects.create(username='tester2', email='tester2@test.com')
+        for block in blocks:
+            api.set_date_for_block(course_key, block, 'due', datetime(2019, 4, 1), user=self.user)
+            api.set_date_for_block(course_key, block, 'due', datetime(2019, 4, 1), user=user2)
+        # A later override for the same user and block replaces the earlier one.
+        api.set_date_for_block(course_key, blocks[0], 'due', datetime(2019, 4, 5), user=self.user)
+
+        with self.assertNumQueries(1):
+            first_page, after_id = api.get_overrides_page(course_key, page_size=4)
+        assert len(first_page) == 4
+        assert after_id is not None
+        second_page, after_id = api.get_overrides_page(course_key, after_id=after_id, page_size=4)
+        assert len(second_page) == 2
+        assert after_id is None
+
+        overrides = first_page + second_page
+        assert (self.user.username, 'unknown', self.user.email, blocks[0], datetime(2019, 4, 5)) in overrides
+        assert (self.user.username, 'unknown', self.user.email, blocks[0], datetime(2019, 4, 1)) not in overrides
+        assert sorted(overrides) == sorted(api.get_overrides_for_course(course_key))
+        assert list(api.iter_overrides_for_course(course_key, page_size=1)) == overrides
+
+        assert list(api.iter_overrides_for_course(course_key, block_id=str(blocks[1]))) == [
+            (self.user.username, 'unknown', self.user.email, blocks[1], datetime(2019, 4, 1)),
+            (user2.username, 'unknown', user2.email, blocks[1], datetime(2019, 4, 1)),
+        ]
+        assert len(list(api.iter_overrides_for_course(course_key, user=user2.id))) == 3
+
     def test_get_overrides_for_block_format(self):
         """Test get_overrides_for_block returns the correct format."""
         course_key = CourseLocator('testX', 'tt104', '2019')
@@ -687,18 +1098,62 @@ class ApiTests(TestCase):
             assert dates == uncached_dates
 
     def test_set_dates_for_course_query_counts(self):
-        items = make_items()
+        items = [(make_block_id(self.course.id), {'due': datetime(2019, 3, 22)}) for _ in range(50)]
+        api.set_dates_for_course(self.course.id, items)
+
+        # Each chunk reads its existing rows and policies, and records its keys in a temporary table (three queries
+        # to create, index and drop); unchanged rows aren't written at all, and the stale rows are found with one
+        # anti-join UPDATE (plus two queries for the savepoint wrappers), however many blocks there are.
+        with self.assertNumQueries(3 + 3 + 1 + 2):
+            api.set_dates_for_course(self.course.id, items)
+        # A chunk with changes upserts them (after creating any new policy).
+        items[0] = (items[0][0], {'due': datetime(2019, 3, 23)})
+        with patch('edx_when.api.PUBLISH_CHUNK_SIZE', 20):
+            with self.assertNumQueries(3 + 3 * 3 + 2 + 1 + 2):
+                api.set_dates_for_course(self.course.id, items[:-1])
+        assert models.ContentDate.objects.filter(course_id=self.course.id, active=True).count() == 49
+        assert api.get_dates_for_course(self.course.id, use_cached=False)[(items[0][0], 'due')] == datetime(2019, 3, 23)
+
+    def test_set_dates_for_course_skips_unchanged_rows(self):
+        items = make_items(with_relative=True)
+        course_key = items[0][0].course_key
+        api.set_dates_for_course(course_key, items)
+        rows = list(models.ContentDate.objects.filter(course_id=course_key).order_by('id').values())
 
-        with self.assertNumQueries(2):  # two for savepoint wrappers
-            with patch('edx_when.api.set_date_for_block', return_value=1) as mock_set:
-                with patch('edx_when.api._clear_dates_for_course') as mock_clear:
-                    api.set_dates_for_course(self.course.id, items)
+        assert api.bulk_set_dates_for_course(course_key, items) == (0, 0, 0)
+        with CaptureQueriesContext(connection) as queries:
+            api.set_dates_for_course(course_key, items, chunk_size=2)
+        assert not [query for query in queries if query['sql'].startswith('INSERT INTO "edx_when_contentdate"')]
+        assert list(models.ContentDate.objects.filter(course_id=course_key).order_by('id').values()) == rows
 
-        self.assertEqual(mock_set.call_count, NUM_OVERRIDES)
-        self.assertEqual(
-            mock_clear.call_args_list,
-            [call(self.course.id, [1] * NUM_OVERRIDES)]
-        )
+    @override_settings(EDX_WHEN_PUBLISH_LOCK_TIMEOUT=0)
+    def test_concurrent_syncs(self):
+        items = make_items()
+        course_key = items[0][0].course_key
+        api.set_dates_for_course(course_key, items)
+        other_items = make_items()
+        sync_chunk = api._sync_chunk  # pylint: disable=protected-access
+        blocked = []
+
+        def sync_again(*args):
+            # Another sync of the course, of any kind, has to wait for this one to finish
+            for sync in (api.bulk_set_dates_for_course, api.set_dates_for_course, partial(
+                api.set_dates_for_course, chunk_size=2
+            )):
+                with self.assertRaises(api.PublishLockTimeout):
+                    sync(course_key, other_items)
+                blocked.append(sync)
+            return sync_chunk(*args)
+
+        with patch('edx_when.api._sync_chunk', side_effect=sync_again):
+            assert api.bulk_set_dates_for_course(course_key, items[:2]) == (0, 0, 1)
+        assert len(blocked) == 3
+
+        # Once it's done, the next sync replaces its dates
+        assert api.bulk_set_dates_for_course(course_key, other_items) == (3, 0, 2)
+        assert set(api.get_dates_for_course(course_key, use_cached=False)) == {
+            (location, field) for location, fields in other_items for field in ('due', 'start') if fields.get(field)
+        }
 
     def test_set_date_for_block_query_counts(self):
         args = (self.course.id, make_block_id(self.course.id), 'due', datetime(2019, 3, 22))
@@ -717,9 +1172,245 @@ class ApiTests(TestCase):
         """
         This test just for meeting code-coverage.
         """
-        response = self.client.get(reverse('course_dates'))
+        response = self.client.get(reverse('course_dates', kwargs={'course_id': str(self.course.id)}))
         self.assertEqual(response.status_code, 403)
 
+    def test_warm_dates_cache_for_course(self):
+        items = make_items(self.course.id, with_relative=True)
+        items.append((make_block_id(self.course.id, block_type='video'), {'start': datetime(2019, 3, 21)}))
+        api.set_dates_for_course(self.course.id, items)
+
+        with self.assertNumQueries(1):
+            assert api.warm_dates_cache_for_course(self.course.id, self.course_version) == 8
+        # Already warm
+        with self.assertNumQueries(0):
+            assert api.warm_dates_cache_for_course(str(self.course.id), self.course_version) == 0
+
+        for allow_relative_dates in (False, True):
+            for subsection_and_higher_only in (False, True):
+                RequestCache.clear_all_namespaces()
+                with patch('edx_when.api._are_relative_dates_enabled', return_value=allow_relative_dates):
+                    with self.assertNumQueries(0):
+                        warm = api.get_dates_for_course(
+                            self.course.id,
+                            subsection_and_higher_only=subsection_and_higher_only,
+                            published_version=self.course_version,
+                        )
+                    # The raw entries are warm too, so a learner only needs their schedule and overrides
+                    with self.assertNumQueries(2):
+                        api.get_dates_for_course(
+                            self.course.id,
+                            user=self.user,
+                            subsection_and_higher_only=subsection_and_higher_only,
+                            published_version=self.course_version,
+                        )
+                    assert warm == api.get_dates_for_course(
+                        self.course.id,
+                        use_cached=False,
+                        subsection_and_higher_only=subsection_and_higher_only,
+                        published_version=self.course_version,
+                    )
+
+        assert api.warm_dates_cache_for_course(self.course.id, self.course_version, force=True) == 8
+
+    def test_content_dates_cached_as_records(self):
+        api.set_dates_for_course(self.course.id, make_items(self.course.id, with_relative=True))
+        api.get_dates_for_course(self.course.id, published_version=self.course_version)
+        cache_key = api._content_dates_cache_key(  # pylint: disable=protected-access
+            self.course.id, {}, False, self.course_version, course_generation=get_course_generation(self.course.id)
+        )
+        records = get_cached(cache_key).value
+        assert records
+        assert all(isinstance(record, api.CourseDateRecord) for record in records)
+        assert {record.field for record in records} == {'due', 'start'}
+
+    def _make_prefetch_courses(self):
+        """
+        Create two more courses with dates, and return the keys of all three.
+        """
+        course_keys = [self.course.id]
+        api.set_dates_for_course(self.course.id, make_items(self.course.id, with_relative=True))
+        for course_code in ('tt202', 'tt303'):
+            course_key = CourseLocator('testX', course_code, '2019')
+            api.set_dates_for_course(course_key, make_items(course_key, with_relative=True))
+            course_keys.append(course_key)
+        return course_keys
+
+    def test_prefetch_dates_for_courses(self):
+        course_keys = self._make_prefetch_courses()
+        api.get_dates_for_course(course_keys[0], user=self.user)
+
+        with patch('edx_when.api.ThreadPoolExecutor') as mock_executor:
+            results = api.prefetch_dates_for_courses([str(key) for key in course_keys], user=self.user)
+        # SQLite always falls back to serial work
+        assert not mock_executor.called
+        assert list(results) == course_keys
+
+        self._clear_caches()
+        for course_key in course_keys:
+            assert results[course_key] == api.get_dates_for_course(course_key, user=self.user)
+
+        # Everything is cached now
+        with self.assertNumQueries(0):
+            assert api.prefetch_dates_for_courses(course_keys, user=self.user) == results
+        # Outside the request cache, the schedules are looked up together
+        RequestCache.clear_all_namespaces()
+        with self.assertNumQueries(1):
+            assert api.prefetch_dates_for_courses(course_keys, user=self.user) == results
+
+    @patch('edx_when.api._can_prefetch_in_parallel', return_value=True)
+    def test_prefetch_dates_in_parallel(self, _mock_parallel):
+        course_keys = self._make_prefetch_courses()
+        expected = {course_key: api.get_dates_for_course(course_key, user=self.user) for course_key in course_keys}
+        self._clear_caches()
+
+        def fake_compute(course_id, *args, **kwargs):
+            return expected[course_id]
+
+        with patch('edx_when.api._compute_dates_for_course', side_effect=fake_compute) as mock_compute:
+            with patch('edx_when.api.connections') as mock_connections:
+                results = api.prefetch_dates_for_courses(course_keys, user=self.user, max_workers=2)
+        assert results == expected
+        assert mock_compute.call_count == 3
+        # Each worker closes its connections when it is done
+        assert mock_connections.close_all.call_count == 3
+
+        with patch('edx_when.api._compute_dates_for_course') as mock_compute:
+            assert api.get_dates_for_course(course_keys[1], user=self.user) == expected[course_keys[1]]
+        assert not mock_compute.called
+
+    @patch('edx_when.api._can_prefetch_in_parallel', return_value=True)
+    def test_prefetch_dates_timeout(self, _mock_parallel):
+        course_keys = self._make_prefetch_courses()
+        release = threading.Event()
+        started = []
+
+        def slow_worker(_cache_key, args, _schedule, _abandoned):
+            started.append(args[0])
+            release.wait(5)
+            return {}
+
+        with patch('edx_when.api._compute_dates_in_worker', side_effect=slow_worker):
+            results = api.prefetch_dates_for_courses(course_keys, user=self.user, max_workers=2, timeout=0.01)
+        release.set()
+
+        # The courses still being computed are left to their workers rather than computed twice, and the course
+        # still queued for a worker was cancelled and computed in this thread instead
+        assert started == course_keys[:2]
+        assert list(results) == course_keys[2:]
+        assert results[course_keys[2]] == api.get_dates_for_course(course_keys[2], user=self.user)
+
+    def test_prefetch_worker_abandoned(self):
+        course_keys = self._make_prefetch_courses()
+        abandoned = threading.Event()
+        abandoned.set()
+        args = (course_keys[0], None, None, False, False, None)
+
+        with patch('edx_when.api._compute_dates_for_course') as mock_compute:
+            with patch('edx_when.api.connections') as mock_connections:
+                dates = api._compute_dates_in_worker('key', args, None, abandoned)  # pylint: disable=protected-access
+        assert dates is None
+        # A worker starting after the caller gave up doesn't query, but still cleans up
+        assert not mock_compute.called
+        assert mock_connections.close_all.called
+
+
+class ReadRoutingTests(TestCase):
+    """
+    Tests for routing the read APIs to the read replica.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.course_key = CourseLocator('testX', 'tt101', '2019')
+        self.user = User.objects.create(username='tester', email='tester@test.com')
+        self.addCleanup(RequestCache.clear_all_namespaces)
+        self.addCleanup(TieredCache.dangerous_clear_all_tiers)
+
+        self.routed = []
+        self.use_read_replica = api._use_read_replica  # pylint: disable=protected-access
+        patcher = patch('edx_when.api._use_read_replica', side_effect=self._use_read_replica)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _use_read_replica(self, api_name):
+        use_read_replica = self.use_read_replica(api_name)
+        self.routed.append((api_name, use_read_replica))
+        return use_read_replica
+
+    def test_reads_use_replica(self):
+        api.get_overrides_for_course(self.course_key)
+        api.get_overrides_for_block(self.course_key, make_block_id(self.course_key))
+        list(api.get_overrides_for_user(self.course_key, self.user))
+        assert self.routed == [
+            ('get_overrides_for_course', True), ('get_overrides_for_block', True), ('get_overrides_for_user', True)
+        ]
+
+    def test_cached_reads_use_writer(self):
+        # Cached results outlive the replica's lag, so they are always read from the writer
+        api.is_enabled_for_course(self.course_key)
+        api.enabled_courses([self.course_key])
+        api.get_dates_for_course(self.course_key, user=self.user)
+        api.get_date_for_block(self.course_key, make_block_id(self.course_key), user=self.user)
+        api.prefetch_dates_for_courses([self.course_key], user=self.user)
+        assert not self.routed
+
+    def test_nested_reads(self):
+        @api._read_api  # pylint: disable=protected-access
+        def outer():
+            return api.get_overrides_for_course(self.course_key)
+
+        # get_overrides_for_course keeps the caller's database even if configured differently
+        with override_settings(EDX_WHEN_READ_FROM_REPLICA={'get_overrides_for_course': False}):
+            outer()
+        assert self.routed == [('outer', True)]
+
+    @override_settings(EDX_WHEN_READ_FROM_REPLICA={'get_overrides_for_course': False})
+    def test_per_api_setting(self):
+        api.get_overrides_for_course(self.course_key)
+        api.get_overrides_page(self.course_key)
+        assert self.routed == [('get_overrides_for_course', False), ('get_overrides_page', True)]
+
+    def test_read_your_writes(self):
+        api.set_dates_for_course(self.course_key, make_items(self.course_key))
+        api.get_overrides_for_course(self.course_key)
+
+        # Only for a while...
+        with override_settings(EDX_WHEN_READ_YOUR_WRITES_WINDOW=0):
+            api.get_overrides_for_course(self.course_key)
+        # ...and only in the same request
+        RequestCache.clear_all_namespaces()
+        api.get_overrides_for_course(self.course_key)
+        assert [use_read_replica for _, use_read_replica in self.routed] == [False, True, True]
+
+    @override_settings(EDX_WHEN_READ_FROM_REPLICA={'get_overrides_for_course': False})
+    def test_caller_context_wins(self):
+        # The caller sent its reads to the replica with edx_django_utils' read_queries_only
+        with patch('edx_when.api.router.db_for_read', return_value='read_replica'):
+            api.get_overrides_for_course(self.course_key)
+        assert self.routed == [('get_overrides_for_course', True)]
+
+    @patch('edx_when.api.read_replica_or_default', return_value='read_replica')
+    def test_lazy_results_are_pinned(self, _mock_read_replica):
+        # The tests have no replica
+        with patch('edx_when.api.get_schedule_model', return_value=DummySchedule):
+            with self.assertRaises(ConnectionDoesNotExist):
+                api.get_schedules_with_due_date(self.course_key, datetime(2019, 4, 1).date())
+        with self.assertRaises(ConnectionDoesNotExist):
+            list(api.get_overrides_for_user(self.course_key, self.user))
+
+        api.set_date_for_block(self.course_key, make_block_id(self.course_key), 'due', datetime(2019, 4, 1))
+        assert not list(api.get_overrides_for_user(self.course_key, self.user))
+
+    @patch('edx_when.api.read_replica_or_default', return_value='read_replica')
+    def test_async_reads_use_replica(self, _mock_read_replica):
+        async def read_overrides():
+            return [override async for override in api.aget_overrides_for_user(self.course_key, self.user)]
+
+        with self.assertRaises(ConnectionDoesNotExist):
+            async_to_sync(read_overrides)()
+        assert self.routed == [('get_overrides_for_user', True)]
+
 
 class ApiWaffleTests(TestCase):
     """
@@ -728,6 +1419,15 @@ class ApiWaffleTests(TestCase):
     These are isolated because they have pretty different patch requirements.
     """
 
+    def setUp(self):
+        super().setUp()
+        # The flag is only imported once, so forget it between tests.
+        api._relative_dates_flag.cache_clear()  # pylint: disable=protected-access
+        self.addCleanup(api._relative_dates_flag.cache_clear)  # pylint: disable=protected-access
+        # So is each course's answer, for the rest of the request.
+        RequestCache.clear_all_namespaces()
+        self.addCleanup(RequestCache.clear_all_namespaces)
+
     @patch.dict(sys.modules, {'openedx.features.course_experience': Mock()})
     def test_relative_dates_enabled(self):
         # pylint: disable=import-error,import-outside-toplevel
@@ -747,3 +1447,29 @@ class ApiWaffleTests(TestCase):
     @patch.dict(sys.modules, {'openedx.features.course_experience': None})
     def test_relative_dates_import_error(self):
         assert not api._are_relative_dates_enabled()  # pylint: disable=protected-access
+
+    @patch.dict(sys.modules, {'openedx.features.course_experience': Mock()})
+    def test_relative_dates_memoized_per_request(self):
+        # pylint: disable=import-error,import-outside-toplevel,protected-access
+        from openedx.features.course_experience import RELATIVE_DATES_FLAG as mock_flag
+        mock_flag.is_enabled.side_effect = lambda course_key: course_key == 'course-a'
+        assert api._are_relative_dates_enabled('course-a')
+        assert api._are_relative_dates_enabled_for_courses(['course-a', 'course-b']) == {
+            'course-a': True, 'course-b': False,
+        }
+        assert not api._are_relative_dates_enabled('course-b')
+        assert mock_flag.is_enabled.call_count == 2
+
+        # Without memoizing, the flag is evaluated every time
+        assert api._are_relative_dates_enabled('course-a', memoize=False)
+        assert mock_flag.is_enabled.call_count == 3
+
+        RequestCache.clear_all_namespaces()
+        assert api._are_relative_dates_enabled('course-a')
+        assert mock_flag.is_enabled.call_count == 4
+
+    @override_settings(EDX_WHEN_RELATIVE_DATES_RESOLVER='edx_when.api.relative_dates_disabled')
+    def test_relative_dates_resolver(self):
+        with patch('edx_when.api._relative_dates_flag') as mock_relative_dates_flag:
+            assert not api._are_relative_dates_enabled('course-a')  # pylint: disable=protected-access
+        assert not mock_relative_dates_flag.called
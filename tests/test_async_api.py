@@ -0,0 +1,115 @@
+"""
+Tests for the async variants of the edx_when.api read functions.
+
+Each scenario is run through both the sync and async APIs, which must agree.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import ddt
+from asgiref.sync import sync_to_async
+from django.contrib import auth
+from django.test import TestCase, override_settings
+from edx_django_utils.cache.utils import RequestCache, TieredCache
+
+from edx_when import api
+from test_utils import make_block_id, make_items
+from tests.test_models_app.models import DummyCourse, DummyEnrollment, DummySchedule
+
+User = auth.get_user_model()
+
+
+@ddt.ddt
+class AsyncApiTests(TestCase):
+    """
+    Tests that the async read API matches the sync one.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for patcher in (
+            patch('edx_when.utils.get_schedule_model', return_value=DummySchedule),
+            patch('edx_when.api._are_relative_dates_enabled', return_value=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self._clear_caches)
+
+        self.items = make_items(with_relative=True)
+        self.course_key = self.items[0][0].course_key
+        api.set_dates_for_course(self.course_key, self.items)
+
+        self.user = User.objects.create(username='tester', email='tester@test.com')
+        course = DummyCourse.objects.create(id=self.course_key)
+        enrollment = DummyEnrollment.objects.create(user=self.user, course=course)
+        self.schedule = DummySchedule.objects.create(
+            enrollment=enrollment, created=datetime(2019, 4, 1), start_date=datetime(2019, 4, 1)
+        )
+        api.set_date_for_block(self.course_key, self.items[0][0], 'due', datetime(2019, 4, 10), user=self.user)
+        api.set_date_for_block(self.course_key, self.items[4][0], 'due', timedelta(days=2), user=self.user)
+
+    @staticmethod
+    def _clear_caches():
+        RequestCache.clear_all_namespaces()
+        TieredCache.dangerous_clear_all_tiers()
+
+    async def _assert_same_dates(self, **kwargs):
+        expected = await sync_to_async(api.get_dates_for_course)(self.course_key, use_cached=False, **kwargs)
+        actual = await api.aget_dates_for_course(self.course_key, use_cached=False, **kwargs)
+        assert actual == expected
+        return actual
+
+    @ddt.data(False, True)
+    async def test_get_dates_for_course(self, denormalized):
+        with override_settings(EDX_WHEN_USE_USERDATE_COURSE_ID=denormalized):
+            dates = await self._assert_same_dates(user=self.user)
+            assert dates[self.items[0][0], 'due'] == datetime(2019, 4, 10)
+            assert dates[self.items[4][0], 'due'] == datetime(2019, 4, 4)
+
+            await self._assert_same_dates(user=self.user.id, subsection_and_higher_only=True)
+            await self._assert_same_dates()
+
+    async def test_get_dates_with_schedule(self):
+        schedule = DummySchedule(created=datetime(2019, 5, 1), start_date=datetime(2019, 5, 1))
+        await self._assert_same_dates(user=self.user, schedule=schedule)
+
+    async def test_get_dates_without_schedule(self):
+        await self.schedule.adelete()
+        await self._assert_same_dates(user=self.user)
+
+    async def test_cache(self):
+        dates = await api.aget_dates_for_course(self.course_key, user=self.user)
+        with patch('edx_when.api._process_dates') as mock_process:
+            assert await api.aget_dates_for_course(self.course_key, user=self.user) == dates
+        assert not mock_process.called
+
+        # The sync API shares the django cache entries
+        RequestCache.clear_all_namespaces()
+        with patch('edx_when.api._process_dates') as mock_process:
+            assert await sync_to_async(api.get_dates_for_course)(self.course_key, user=self.user) == dates
+        assert not mock_process.called
+
+    async def test_get_dates_for_courses(self):
+        other_items = make_items(course_id=make_block_id().course_key.replace(course='tt202'))
+        other_course_key = other_items[0][0].course_key
+        await sync_to_async(api.set_dates_for_course)(other_course_key, other_items)
+
+        results = await api.aget_dates_for_courses([str(self.course_key), other_course_key], user=self.user)
+        assert results == {
+            self.course_key: await sync_to_async(api.get_dates_for_course)(self.course_key, user=self.user),
+            other_course_key: await sync_to_async(api.get_dates_for_course)(other_course_key, user=self.user),
+        }
+
+    async def test_get_date_for_block(self):
+        block_id = self.items[0][0]
+        assert await api.aget_date_for_block(self.course_key, block_id, user=self.user) == datetime(2019, 4, 10)
+        assert await api.aget_date_for_block(self.course_key, 'bad-block-id') is None
+
+    @ddt.data(False, True)
+    async def test_get_overrides_for_user(self, denormalized):
+        with override_settings(EDX_WHEN_USE_USERDATE_COURSE_ID=denormalized):
+            expected = await sync_to_async(lambda: list(api.get_overrides_for_user(self.course_key, self.user)))()
+            actual = [override async for override in api.aget_overrides_for_user(self.course_key, self.user)]
+        assert actual == expected
+        assert len(actual) == 2
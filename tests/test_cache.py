@@ -0,0 +1,293 @@
+"""
+Tests for edx_when.cache.
+"""
+
+import time
+from unittest.mock import Mock, patch
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache as django_cache
+from django.test import TestCase, override_settings
+from edx_django_utils.cache.utils import RequestCache, TieredCache
+
+from edx_when.cache import (
+    aget_cached,
+    aget_course_generation,
+    aget_override_generation,
+    aset_cached,
+    bump_course_generation,
+    bump_override_generation,
+    bump_override_generations,
+    delete_cached,
+    get_cached,
+    get_course_generation,
+    get_course_generations,
+    get_many_cached,
+    get_or_compute,
+    get_override_generation,
+    set_cached,
+    set_many_cached
+)
+
+
+@override_settings(EDX_WHEN_CACHE_TIMEOUT=300, EDX_WHEN_CACHE_STALE_TIMEOUT=60)
+class GetOrComputeTests(TestCase):
+    """
+    Tests for get_or_compute.
+    """
+
+    key = 'edx-when.test-key'
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(RequestCache.clear_all_namespaces)
+        self.addCleanup(TieredCache.dangerous_clear_all_tiers)
+
+    def _set_elsewhere(self, value, delta=0.0):
+        """
+        Cache a value as another process would, leaving this process's request cache alone.
+        """
+        set_cached(self.key, value, delta)
+        RequestCache.clear_all_namespaces()
+
+    def test_computes_and_caches(self):
+        compute = Mock(return_value='value')
+        assert get_or_compute(self.key, compute) == 'value'
+        assert get_or_compute(self.key, compute) == 'value'
+        RequestCache.clear_all_namespaces()
+        assert get_or_compute(self.key, compute) == 'value'
+        assert compute.call_count == 1
+        assert get_cached(self.key).value == 'value'
+        # The lock is released
+        assert django_cache.get(f'{self.key}.lock') is None
+
+    def test_use_cached_false(self):
+        set_cached(self.key, 'stale')
+        assert get_or_compute(self.key, lambda: 'fresh', use_cached=False) == 'fresh'
+        assert get_cached(self.key).value == 'fresh'
+
+    def test_lock_released_on_error(self):
+        with self.assertRaises(ValueError):
+            get_or_compute(self.key, Mock(side_effect=ValueError))
+        assert django_cache.get(f'{self.key}.lock') is None
+
+    def test_ignores_unwrapped_values(self):
+        django_cache.set(f'edx-when.v1:{self.key}', 'not an entry')
+        assert not get_cached(self.key).is_found
+        assert get_or_compute(self.key, lambda: 'new') == 'new'
+
+    def test_keys_versioned(self):
+        # Releases that stored raw values under the bare key neither see the new entries nor have theirs read
+        django_cache.set(self.key, 'from an older release')
+        assert not get_cached(self.key).is_found
+        set_cached(self.key, 'new')
+        assert django_cache.get(self.key) == 'from an older release'
+        RequestCache.clear_all_namespaces()
+        assert get_cached(self.key).value == 'new'
+
+    def test_waits_for_lock_holder(self):
+        django_cache.add(f'{self.key}.lock', 'someone-else')
+        compute = Mock(return_value='mine')
+
+        def other_process_finishes(*args, **kwargs):
+            self._set_elsewhere('theirs')
+
+        with patch('edx_when.cache.time.sleep', side_effect=other_process_finishes):
+            assert get_or_compute(self.key, compute) == 'theirs'
+        assert not compute.called
+
+    @override_settings(EDX_WHEN_CACHE_LOCK_WAIT=0.05, EDX_WHEN_CACHE_LOCK_POLL_INTERVAL=0.01)
+    def test_wait_timeout(self):
+        django_cache.add(f'{self.key}.lock', 'someone-else')
+        assert get_or_compute(self.key, lambda: 'mine') == 'mine'
+        assert get_cached(self.key).value == 'mine'
+
+    def test_early_refresh(self):
+        self._set_elsewhere('old', delta=10)
+        # Well before expiry, the value is used
+        assert get_or_compute(self.key, lambda: 'new') == 'old'
+        RequestCache.clear_all_namespaces()
+
+        # Close to expiry, a slow-to-compute value may be refreshed early...
+        soon = time.time() + 290
+        with patch('edx_when.cache.time.time', return_value=soon):
+            with patch('edx_when.cache.random.random', return_value=0.99):
+                assert get_or_compute(self.key, lambda: 'new') == 'new'
+        RequestCache.clear_all_namespaces()
+
+        # ...but not with early refreshes turned off
+        self._set_elsewhere('old', delta=10)
+        with override_settings(EDX_WHEN_CACHE_EARLY_REFRESH_BETA=0):
+            with patch('edx_when.cache.time.time', return_value=soon):
+                with patch('edx_when.cache.random.random', return_value=0.99):
+                    assert get_or_compute(self.key, lambda: 'new') == 'old'
+
+    def test_early_refresh_while_locked(self):
+        self._set_elsewhere('old', delta=10)
+        django_cache.add(f'{self.key}.lock', 'someone-else')
+        # Someone else is already refreshing it, and it's still fresh, so it's served without waiting
+        with patch('edx_when.cache.time.time', return_value=time.time() + 290):
+            with patch('edx_when.cache.random.random', return_value=0.99):
+                with patch('edx_when.cache.time.sleep') as mock_sleep:
+                    assert get_or_compute(self.key, lambda: 'new') == 'old'
+        assert not mock_sleep.called
+
+    def test_stale_while_revalidate(self):
+        self._set_elsewhere('old')
+        expired = time.time() + 310
+        with patch('edx_when.cache.time.time', return_value=expired):
+            assert not get_cached(self.key).is_found
+            assert get_cached(self.key, allow_stale=True).value == 'old'
+            RequestCache.clear_all_namespaces()
+
+            django_cache.add(f'{self.key}.lock', 'someone-else')
+            with patch('edx_when.cache.time.sleep') as mock_sleep:
+                assert get_or_compute(self.key, lambda: 'new', allow_stale=True) == 'old'
+            assert not mock_sleep.called
+
+            # Without allow_stale, it waits for the fresh value instead
+            RequestCache.clear_all_namespaces()
+
+            def other_process_finishes(*args, **kwargs):
+                self._set_elsewhere('theirs')
+
+            with patch('edx_when.cache.time.sleep', side_effect=other_process_finishes):
+                assert get_or_compute(self.key, lambda: 'new') == 'theirs'
+
+        # Once the lock is free, the stale value is recomputed
+        django_cache.delete(f'{self.key}.lock')
+        self._set_elsewhere('old')
+        with patch('edx_when.cache.time.time', return_value=expired):
+            assert get_or_compute(self.key, lambda: 'new', allow_stale=True) == 'new'
+
+    @override_settings(EDX_WHEN_CACHE_TIMEOUT=None)
+    def test_no_timeout(self):
+        self._set_elsewhere('forever', delta=10)
+        with patch('edx_when.cache.time.time', return_value=time.time() + 10 ** 9):
+            assert get_or_compute(self.key, lambda: 'new') == 'forever'
+
+    def test_many(self):
+        set_many_cached({self.key: 'value', 'edx-when.other-key': False})
+        set_many_cached({})
+        RequestCache.clear_all_namespaces()
+        django_cache.set('edx-when.old-key', 'from an older release')
+        keys = [self.key, 'edx-when.other-key', 'edx-when.missing-key', 'edx-when.old-key']
+        assert get_many_cached(keys) == {self.key: 'value', 'edx-when.other-key': False}
+        # Now they're in the request cache too
+        with patch('edx_when.cache.django_cache.get_many', return_value={}):
+            assert get_many_cached(keys) == {self.key: 'value', 'edx-when.other-key': False}
+
+        delete_cached(self.key)
+        assert get_many_cached(keys) == {'edx-when.other-key': False}
+
+    async def test_async(self):
+        assert not (await aget_cached(self.key)).is_found
+        await aset_cached(self.key, 'value')
+        assert (await aget_cached(self.key)).value == 'value'
+        assert get_cached(self.key).value == 'value'
+
+
+class GenerationTests(TestCase):
+    """
+    Tests for the override and course generation counters.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(RequestCache.clear_all_namespaces)
+        self.addCleanup(TieredCache.dangerous_clear_all_tiers)
+
+    def test_bump(self):
+        generation = get_override_generation('course', 1)
+        assert get_override_generation('course', 1) == generation
+        RequestCache.clear_all_namespaces()
+        assert get_override_generation('course', 1) == generation
+
+        other_generation = get_override_generation('course', 2)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            bump_override_generation('course', 1)
+            # The new generation is visible right away...
+            bumped = get_override_generation('course', 1)
+            assert bumped != generation
+        # ...and changes again once the transaction commits
+        assert len(callbacks) == 1
+        assert get_override_generation('course', 1) not in (generation, bumped)
+        assert get_override_generation('course', 2) == other_generation
+
+    def test_reads_dont_write(self):
+        with patch.object(django_cache, 'add') as mock_add, patch.object(django_cache, 'set') as mock_set:
+            assert get_override_generation('course', 1) == 0
+            assert async_to_sync(aget_course_generation)('course') == 0
+        assert not mock_add.called
+        assert not mock_set.called
+
+    def test_eviction(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_override_generation('course', 1)
+        generation = get_override_generation('course', 1)
+        RequestCache.clear_all_namespaces()
+        django_cache.clear()
+        # An evicted counter reads as 0, but doesn't start counting over from there when bumped, so it can't
+        # return to values used before
+        assert get_override_generation('course', 1) == 0
+        bump_override_generation('course', 1)
+        assert get_override_generation('course', 1) not in (0, 1, generation)
+
+    @override_settings(EDX_WHEN_CACHE_TIMEOUT=100, EDX_WHEN_CACHE_STALE_TIMEOUT=20)
+    def test_generation_timeout(self):
+        with patch.object(django_cache, 'set', wraps=django_cache.set) as mock_set:
+            bump_override_generation('course', 1)
+        # Counters outlive the entries stored under them
+        assert mock_set.call_args.args[2] == 240
+
+    def test_bump_many(self):
+        generations = {user_id: get_override_generation('course', user_id) for user_id in (1, 2, 3)}
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with patch.object(django_cache, 'set_many', wraps=django_cache.set_many) as mock_set_many:
+                bump_override_generations('course', [1, 2])
+            assert mock_set_many.call_count == 1
+            bumped = get_override_generation('course', 1)
+            assert bumped != generations[1]
+        assert len(callbacks) == 1
+        RequestCache.clear_all_namespaces()
+        assert get_override_generation('course', 1) not in (generations[1], bumped)
+        assert get_override_generation('course', 2) != generations[2]
+        assert get_override_generation('course', 3) == generations[3]
+
+    async def test_async(self):
+        generation = await aget_override_generation('course', 1)
+        assert await aget_override_generation('course', 1) == generation
+        assert get_override_generation('course', 1) == generation
+
+    def test_course_generation(self):
+        generation = async_to_sync(aget_course_generation)('course')
+        assert get_course_generation('course') == generation
+        other_generation = get_course_generation('other-course')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            bump_course_generation('course')
+            # The new generation is visible right away...
+            bumped = get_course_generation('course')
+            assert bumped != generation
+        # ...and changes again once the transaction commits
+        assert len(callbacks) == 1
+        assert get_course_generation('course') not in (generation, bumped)
+        assert get_course_generation('other-course') == other_generation
+        # It's separate from the learners' override generations
+        assert get_override_generation('course', 1) == 0
+
+    def test_course_generations(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_course_generation('course')
+            bump_override_generation('course', 1)
+        expected = {
+            'course': (get_course_generation('course'), get_override_generation('course', 1)),
+            'other-course': (0, 0),
+        }
+        assert expected['course'] != (0, 0)
+        RequestCache.clear_all_namespaces()
+        with patch.object(django_cache, 'get_many', wraps=django_cache.get_many) as mock_get_many:
+            assert get_course_generations(['course', 'other-course'], 1) == expected
+            # Read in one round trip, and then from the request cache
+            assert get_course_generations(['course', 'other-course'], 1) == expected
+        assert mock_get_many.call_count == 1
+        assert get_course_generations(['course']) == {'course': (expected['course'][0], None)}
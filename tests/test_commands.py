@@ -0,0 +1,457 @@
+"""
+Tests for the edx_when management commands.
+"""
+
+import gzip
+import os
+import tempfile
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib import auth
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from opaque_keys.edx.django.models import CourseKeyField
+from opaque_keys.edx.keys import CourseKey
+
+from edx_when import api, compaction, models, snapshot
+from test_utils import make_block_id, make_items
+
+User = auth.get_user_model()
+
+
+class BackfillUserDateCourseIdTests(TestCase):
+    """
+    Tests for the backfill_userdate_course_id command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='tester', email='tester@test.com')
+        self.items = make_items()
+        self.course_key = self.items[0][0].course_key
+        api.set_dates_for_course(self.course_key, self.items)
+        for location, _ in self.items[:2]:
+            api.set_date_for_block(self.course_key, location, 'due', datetime(2019, 4, 10), user=self.user)
+        models.UserDate.objects.update(course_id=CourseKeyField.Empty)
+
+    def test_backfill(self):
+        call_command('backfill_userdate_course_id', batch_size=1)
+        assert set(models.UserDate.objects.values_list('course_id', flat=True)) == {self.course_key}
+
+    def test_resume(self):
+        first_id = models.UserDate.objects.order_by('id').values_list('id', flat=True)[0]
+        call_command('backfill_userdate_course_id', start_id=first_id)
+        assert list(models.UserDate.objects.order_by('id').values_list('course_id', flat=True)) == [
+            None, self.course_key
+        ]
+
+
+class BackfillContentDateBlockTypeTests(TestCase):
+    """
+    Tests for the backfill_contentdate_block_type command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.items = make_items()
+        self.course_key = self.items[0][0].course_key
+        self.items.append((make_block_id(self.course_key, block_type='video'), {'due': datetime(2019, 3, 24)}))
+        api.set_dates_for_course(self.course_key, self.items)
+        models.ContentDate.objects.update(block_type=None)
+
+    def test_backfill(self):
+        call_command('backfill_contentdate_block_type', batch_size=2)
+        assert dict(models.ContentDate.objects.values_list('location', 'block_type')) == {
+            location: location.block_type for location, fields in self.items if fields.get('due') or fields.get('start')
+        }
+
+    def test_resume(self):
+        first_id = models.ContentDate.objects.order_by('id').values_list('id', flat=True)[0]
+        call_command('backfill_contentdate_block_type', start_id=first_id)
+        assert list(models.ContentDate.objects.order_by('id').values_list('block_type', flat=True)) == [
+            None, 'sequential', 'sequential', 'video'
+        ]
+
+
+class WarmCourseDatesCacheTests(TestCase):
+    """
+    Tests for the warm_course_dates_cache command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.course_key = make_items()[0][0].course_key
+
+    def test_warm(self):
+        with patch('edx_when.management.commands.warm_course_dates_cache.warm_dates_cache_for_course') as mock_warm:
+            call_command('warm_course_dates_cache', str(self.course_key), published_version='v1')
+            mock_warm.assert_called_once_with(self.course_key, 'v1', force=False)
+
+    def test_published_version_from_modulestore(self):
+        with patch('edx_when.management.commands.warm_course_dates_cache.warm_dates_cache_for_course') as mock_warm:
+            with patch('edx_when.management.commands.warm_course_dates_cache.get_published_version', return_value='v2'):
+                call_command('warm_course_dates_cache', str(self.course_key), '--force')
+            mock_warm.assert_called_once_with(self.course_key, 'v2', force=True)
+
+            # Without a modulestore, there's no version to warm
+            mock_warm.reset_mock()
+            call_command('warm_course_dates_cache', str(self.course_key))
+            assert not mock_warm.called
+
+    def test_errors(self):
+        with self.assertRaises(CommandError):
+            call_command('warm_course_dates_cache', 'not-a-course')
+        with self.assertRaises(CommandError):
+            call_command('warm_course_dates_cache', str(self.course_key), str(self.course_key), published_version='v1')
+
+
+@override_settings(EDX_WHEN_COURSE_DATES_SOURCE='test_utils.make_items')
+class ResyncCourseDatesTests(TestCase):
+    """
+    Tests for the resync_course_dates command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.course_keys = [
+            CourseKey.from_string(f'course-v1:testX+tt{number}+2019') for number in (101, 102, 103)
+        ]
+        checkpoint_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(checkpoint_dir.cleanup)
+        self.checkpoint_file = os.path.join(checkpoint_dir.name, 'checkpoint')
+
+    def _synced_courses(self):
+        return set(models.ContentDate.objects.filter(active=True).values_list('course_id', flat=True))
+
+    def test_resync(self):
+        call_command('resync_course_dates', str(self.course_keys[0]), str(self.course_keys[1]))
+        assert self._synced_courses() == set(self.course_keys[:2])
+        assert models.ContentDate.objects.count() == 6
+
+    def test_resync_all(self):
+        for course_key in self.course_keys:
+            api.set_dates_for_course(course_key, make_items(course_key))
+        models.ContentDate.objects.update(block_type=None)
+
+        call_command('resync_course_dates', '--all', batch_size=2, checkpoint_file=self.checkpoint_file)
+        # The course's items are new blocks each time, so the old ones are deactivated
+        assert models.ContentDate.objects.filter(active=True, block_type='sequential').count() == 9
+        assert not models.ContentDate.objects.filter(active=True, block_type=None).exists()
+        with open(self.checkpoint_file, encoding='utf-8') as checkpoint_file:
+            assert checkpoint_file.read() == str(self.course_keys[-1])
+
+    def test_resume(self):
+        with open(self.checkpoint_file, 'w', encoding='utf-8') as checkpoint_file:
+            checkpoint_file.write(str(self.course_keys[0]))
+        call_command('resync_course_dates', *map(str, self.course_keys), checkpoint_file=self.checkpoint_file)
+        assert self._synced_courses() == set(self.course_keys[1:])
+
+        for course_key in self.course_keys:
+            api.set_dates_for_course(course_key, make_items(course_key))
+        models.ContentDate.objects.all().update(block_type=None)
+        with open(self.checkpoint_file, 'w', encoding='utf-8') as checkpoint_file:
+            checkpoint_file.write(str(self.course_keys[1]))
+        call_command('resync_course_dates', '--all', checkpoint_file=self.checkpoint_file)
+        assert set(
+            models.ContentDate.objects.filter(active=True, block_type='sequential').values_list('course_id', flat=True)
+        ) == {self.course_keys[2]}
+
+    def test_missing_content_and_errors(self):
+        with patch('edx_when.management.commands.resync_course_dates.get_course_date_items', return_value=None):
+            call_command('resync_course_dates', str(self.course_keys[0]))
+        with patch('edx_when.management.commands.resync_course_dates.get_course_date_items', side_effect=ValueError):
+            with self.assertRaises(CommandError):
+                call_command('resync_course_dates', str(self.course_keys[0]))
+        assert not models.ContentDate.objects.exists()
+
+    def test_checkpoint_stops_at_failure(self):
+        def items_or_error(course_key):
+            if course_key == self.course_keys[1]:
+                raise ValueError
+            return make_items(course_key)
+
+        with patch('edx_when.management.commands.resync_course_dates.get_course_date_items', items_or_error):
+            with self.assertRaises(CommandError):
+                call_command(
+                    'resync_course_dates', *map(str, self.course_keys),
+                    batch_size=1, checkpoint_file=self.checkpoint_file,
+                )
+        # The courses after the failure were still synced, but the checkpoint stays before it
+        assert self._synced_courses() == {self.course_keys[0], self.course_keys[2]}
+        with open(self.checkpoint_file, encoding='utf-8') as checkpoint_file:
+            assert checkpoint_file.read() == str(self.course_keys[0])
+
+        with patch('edx_when.management.commands.resync_course_dates.get_course_date_items', make_items):
+            call_command('resync_course_dates', *map(str, self.course_keys), checkpoint_file=self.checkpoint_file)
+        assert self._synced_courses() == set(self.course_keys)
+
+    def test_resync_refreshes_user_dates(self):
+        course_key = self.course_keys[0]
+        items = make_items(course_key)
+        api.set_dates_for_course(course_key, items)
+        user = User.objects.create(username='resync-learner')
+        before = api.get_dates_for_course(course_key, user=user, published_version='v1')
+
+        new_date = datetime(2030, 1, 1)
+        resynced = [(location, dict(fields, due=new_date)) for location, fields in items]
+        command = 'edx_when.management.commands.resync_course_dates'
+        with patch(f'{command}.get_course_date_items', return_value=resynced), \
+                patch(f'{command}.get_published_version', return_value='v1'):
+            call_command('resync_course_dates', str(course_key))
+
+        # The published version didn't change, but the learner's cached dates did
+        after = api.get_dates_for_course(course_key, user=user, published_version='v1')
+        assert after != before
+        assert {date for (_, field), date in after.items() if field == 'due'} == {new_date}
+
+    def test_warms_cache(self):
+        command = 'edx_when.management.commands.resync_course_dates'
+        items = make_items(self.course_keys[0])
+        with patch(f'{command}.get_course_date_items', return_value=items), \
+                patch(f'{command}.get_published_version', return_value='v1'), \
+                patch(f'{command}.warm_dates_cache_for_course') as mock_warm:
+            call_command('resync_course_dates', str(self.course_keys[0]))
+            mock_warm.assert_called_once_with(self.course_keys[0], 'v1')
+
+            # Nothing changed, so there's nothing to warm
+            mock_warm.reset_mock()
+            call_command('resync_course_dates', str(self.course_keys[0]))
+            assert not mock_warm.called
+
+    def test_processes(self):
+        with patch('edx_when.management.commands.resync_course_dates.multiprocessing.get_context') as mock_context:
+            pool = mock_context.return_value.Pool.return_value
+            pool.imap.side_effect = map
+            call_command('resync_course_dates', *map(str, self.course_keys), processes=2, batch_size=2)
+        mock_context.return_value.Pool.assert_called_once_with(2)
+        assert pool.imap.call_count == 2
+        assert pool.join.called
+        assert self._synced_courses() == set(self.course_keys)
+
+    def test_errors(self):
+        with self.assertRaises(CommandError):
+            call_command('resync_course_dates')
+        with self.assertRaises(CommandError):
+            call_command('resync_course_dates', str(self.course_keys[0]), '--all')
+        with self.assertRaises(CommandError):
+            call_command('resync_course_dates', 'not-a-course')
+        with self.assertRaises(CommandError):
+            call_command('resync_course_dates', '--all', batch_size=0)
+
+
+class CompactDatesTests(TestCase):
+    """
+    Tests for the compact_dates command.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='tester', email='tester@test.com')
+        self.items = make_items()
+        self.course_key = self.items[0][0].course_key
+        api.set_dates_for_course(self.course_key, self.items)
+        self.overridden = self.items[0][0]
+        for day in (10, 11, 12):
+            api.set_date_for_block(
+                self.course_key, self.overridden, 'due', datetime(2019, 4, day), user=self.user, reason=f'day {day}'
+            )
+        # The last two blocks are removed from the course, and one of them had an override
+        api.set_date_for_block(self.course_key, self.items[1][0], 'due', datetime(2019, 4, 10), user=self.user)
+        api.set_dates_for_course(self.course_key, self.items[:1])
+
+    def _counts(self):
+        return (
+            models.UserDate.objects.count(),
+            models.ContentDate.objects.count(),
+            models.DatePolicy.objects.count(),
+            models.UserDateArchive.objects.count(),
+        )
+
+    def test_dry_run(self):
+        before = self._counts()
+        out = StringIO()
+        call_command('compact_dates', dry_run=True, stdout=out)
+        assert self._counts() == before
+        assert 'Would remove 2 superseded UserDates in total' in out.getvalue()
+        assert 'Would remove 1 inactive ContentDates in total' in out.getvalue()
+
+    def test_compact(self):
+        dates = api.get_dates_for_course(self.course_key, user=self.user, use_cached=False)
+        overrides = api.get_overrides_for_course(self.course_key)
+        assert self._counts() == (4, 3, 3, 0)
+
+        call_command('compact_dates', batch_size=1)
+
+        # Only the latest override is left, the block without overrides is gone, and so is its policy
+        assert self._counts() == (2, 2, 2, 2)
+        assert api.get_dates_for_course(self.course_key, user=self.user, use_cached=False) == dates
+        assert api.get_overrides_for_course(self.course_key) == overrides
+        assert sorted(models.UserDateArchive.objects.values_list('reason', flat=True)) == ['day 10', 'day 11']
+        archive = models.UserDateArchive.objects.get(reason='day 10')
+        assert (archive.user, archive.course_id, archive.location, archive.field, archive.abs_date) == (
+            self.user, self.course_key, self.overridden, 'due', datetime(2019, 4, 10)
+        )
+
+        # Nothing left to do
+        call_command('compact_dates')
+        assert self._counts() == (2, 2, 2, 2)
+
+    def test_compact_rechecks_locked_rows(self):
+        models.DatePolicy.objects.create(abs_date=datetime(2019, 5, 1))
+        other_course_key = self.course_key.replace(run='2020')
+        lock = compaction._lock  # pylint: disable=protected-access
+
+        def lock_after_publish(model, ids):
+            # A publish using the rows commits while they are being locked
+            if model is models.ContentDate:
+                models.ContentDate.objects.filter(id__in=ids).update(active=True)
+            else:
+                for policy_id in ids:
+                    models.ContentDate.objects.create(
+                        course_id=other_course_key, location=make_block_id(other_course_key), policy_id=policy_id,
+                    )
+            return lock(model, ids)
+
+        with patch('edx_when.compaction._lock', side_effect=lock_after_publish):
+            call_command('compact_dates')
+
+        # Only the superseded overrides were removed
+        assert self._counts() == (2, 4, 4, 2)
+
+
+class CourseDatesSnapshotTests(TestCase):
+    """
+    Tests for the export_course_dates and import_course_dates commands.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create(username='tester', email='tester@test.com')
+        self.staff = User.objects.create(username='staff', email='staff@test.com')
+        self.items = make_items(with_relative=True)
+        self.course_key = self.items[0][0].course_key
+        api.set_dates_for_course(self.course_key, self.items)
+        api.set_date_for_block(self.course_key, self.items[0][0], 'due', datetime(2019, 4, 9), user=self.user)
+        api.set_date_for_block(
+            self.course_key, self.items[0][0], 'due', datetime(2019, 4, 10), user=self.user, actor=self.staff,
+            reason='extension',
+        )
+        models.UserDate.objects.create(
+            user=self.staff, content_date=models.ContentDate.objects.get(location=self.items[4][0]),
+            rel_date=timedelta(days=2),
+        )
+        # Inactive dates aren't exported
+        removed_id = api.set_date_for_block(
+            self.course_key, make_block_id(self.course_key), 'due', datetime(2019, 5, 1)
+        )
+        models.ContentDate.objects.filter(id=removed_id).update(active=False)
+
+        handle, self.path = tempfile.mkstemp()
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def test_export_import_rerun(self):
+        out = StringIO()
+        call_command('export_course_dates', str(self.course_key), self.path, user_dates=True, stdout=out)
+        assert 'Exported 6 dates and 2 overrides' in out.getvalue()
+
+        rerun_key = CourseKey.from_string('course-v1:testX+tt101+2026')
+        api.set_dates_for_course(rerun_key, make_items(rerun_key))
+        # A handful of queries, however many dates and overrides there are
+        with self.assertNumQueries(16):
+            call_command('import_course_dates', self.path, course_key=str(rerun_key), stdout=out)
+        assert 'Imported 6 dates and 2 overrides' in out.getvalue()
+
+        expected_dates = {
+            (location.map_into_course(rerun_key), field): date
+            for (location, field), date in api.get_dates_for_course(self.course_key, use_cached=False).items()
+        }
+        assert api.get_dates_for_course(rerun_key, use_cached=False) == expected_dates
+        assert models.ContentDate.objects.filter(course_id=rerun_key, active=True).count() == 6
+
+        override = models.UserDate.objects.get(course_id=rerun_key, user=self.user)
+        assert (override.location, override.abs_date, override.actor, override.reason) == (
+            self.items[0][0].map_into_course(rerun_key), datetime(2019, 4, 10), self.staff, 'extension'
+        )
+        relative_override = models.UserDate.objects.get(course_id=rerun_key, user=self.staff)
+        assert relative_override.rel_date == timedelta(days=2)
+        assert relative_override.location == self.items[4][0].map_into_course(rerun_key)
+
+        # The source course is untouched
+        assert models.UserDate.objects.filter(course_id=self.course_key).count() == 3
+
+        # Importing the same snapshot again (e.g. a retry) doesn't add the overrides again
+        call_command('import_course_dates', self.path, course_key=str(rerun_key), stdout=out)
+        assert 'Imported 6 dates and 0 overrides' in out.getvalue()
+        assert models.UserDate.objects.filter(course_id=rerun_key).count() == 2
+        assert api.get_dates_for_course(rerun_key, use_cached=False) == expected_dates
+
+    def test_import_into_same_course(self):
+        call_command('export_course_dates', str(self.course_key), self.path, stdout=StringIO())
+        dates = api.get_dates_for_course(self.course_key, use_cached=False)
+        api.set_dates_for_course(self.course_key, self.items[:1])
+
+        call_command('import_course_dates', self.path, stdout=StringIO())
+        assert api.get_dates_for_course(self.course_key, use_cached=False) == dates
+        # There were no overrides in the snapshot
+        assert models.UserDate.objects.count() == 3
+
+    def test_missing_users(self):
+        call_command('export_course_dates', str(self.course_key), self.path, user_dates=True, stdout=StringIO())
+        self.staff.delete()
+        rerun_key = CourseKey.from_string('course-v1:testX+tt101+2026')
+
+        out = StringIO()
+        call_command('import_course_dates', self.path, course_key=str(rerun_key), batch_size=1, stdout=out)
+        assert 'Imported 6 dates and 1 overrides' in out.getvalue()
+        assert models.UserDate.objects.get(course_id=rerun_key).actor is None
+
+        call_command('import_course_dates', self.path, course_key=str(rerun_key), skip_user_dates=True, stdout=out)
+        assert models.UserDate.objects.filter(course_id=rerun_key).count() == 1
+
+    def test_errors(self):
+        with self.assertRaises(CommandError):
+            call_command('export_course_dates', 'not-a-course', self.path)
+        with self.assertRaises(CommandError):
+            call_command('import_course_dates', self.path, course_key='not-a-course')
+
+        call_command('export_course_dates', str(self.course_key), self.path, stdout=StringIO())
+        with open(self.path, 'rb') as stream:
+            data = gzip.decompress(stream.read())
+        with open(self.path, 'wb') as stream:
+            stream.write(gzip.compress(data[:-1]))
+        with self.assertRaisesRegex(CommandError, 'Truncated snapshot'):
+            call_command('import_course_dates', self.path)
+
+    def _write_snapshot(self, *records):
+        """
+        Write a snapshot file holding a valid header followed by the given records.
+        """
+        with open(self.path, 'wb') as stream, gzip.GzipFile(fileobj=stream, mode='wb') as gzipped:
+            for record in ({'type': 'header', 'version': 1, 'course_id': str(self.course_key)},) + records:
+                snapshot._write_record(gzipped, record)  # pylint: disable=protected-access
+
+    def test_malformed_records(self):
+        location = str(self.items[0][0])
+        user_date = {
+            'type': 'user_date', 'location': location, 'field': 'due', 'user': 'tester', 'abs': '2019-04-10T00:00:00',
+            'reason': '', 'actor': None, 'first_component_block_id': None, 'is_content_gated': False,
+        }
+        for records in (
+            ({'type': 'content_date', 'policy': 1, 'location': location, 'field': 'due'},),
+            ({'type': 'policy', 'id': 1, 'abs': 'not a date'},),
+            ({'type': 'policy', 'id': 1, 'rel': 10}, {'type': 'content_date', 'policy': 1, 'location': 'not-a-key'}),
+            ({'type': 'policy', 'id': 1, 'rel': 10}, {'type': 'content_date', 'policy': 1, 'location': location}),
+            (dict(user_date, location='not-a-key'),),
+            ({key: value for key, value in user_date.items() if key != 'user'},),
+            ({'type': 'surprise'},),
+            (['not', 'a', 'record'],),
+        ):
+            self._write_snapshot(*records)
+            with self.assertRaisesRegex(CommandError, 'Malformed|Unknown'):
+                call_command('import_course_dates', self.path, stdout=StringIO())
+        # Nothing was written
+        assert api.get_dates_for_course(self.course_key, use_cached=False)
+        assert models.UserDate.objects.count() == 3
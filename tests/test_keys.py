@@ -0,0 +1,50 @@
+"""
+Tests for edx_when.keys.
+"""
+
+from django.test import SimpleTestCase
+from opaque_keys import InvalidKeyError
+from opaque_keys.edx.keys import CourseKey, UsageKey
+from opaque_keys.edx.locator import CourseLocator
+
+from edx_when.keys import clear_key_caches, ensure_key, key_cache_stats, key_to_string, map_into_course, parse_key
+from test_utils import make_block_id
+
+
+class KeyCacheTests(SimpleTestCase):
+    """
+    Tests for the opaque key caches.
+    """
+
+    def setUp(self):
+        super().setUp()
+        clear_key_caches()
+        self.addCleanup(clear_key_caches)
+
+    def test_parse_key(self):
+        assert key_cache_stats()['parse_key']['hit_rate'] is None
+        course_key = parse_key(CourseKey, 'course-v1:testX+tt101+2019')
+        assert course_key == CourseLocator('testX', 'tt101', '2019')
+        assert parse_key(CourseKey, 'course-v1:testX+tt101+2019') is course_key
+
+        with self.assertRaises(InvalidKeyError):
+            parse_key(UsageKey, 'not-a-key')
+        assert key_cache_stats()['parse_key'] == {'hits': 1, 'misses': 2, 'size': 1, 'hit_rate': 1 / 3}
+
+    def test_ensure_key(self):
+        course_key = CourseLocator('testX', 'tt101', '2019')
+        assert ensure_key(CourseKey, course_key) is course_key
+        assert ensure_key(CourseKey, str(course_key)) == course_key
+        with self.assertRaises(InvalidKeyError):
+            ensure_key(CourseKey, 'not-a-key')
+
+    def test_key_to_string_and_map_into_course(self):
+        block_id = make_block_id()
+        rerun_key = CourseLocator('testX', 'tt101', '2026')
+        assert key_to_string(block_id) == key_to_string(block_id) == str(block_id)
+        assert map_into_course(block_id, rerun_key) == block_id.map_into_course(rerun_key)
+        assert map_into_course(block_id, rerun_key).course_key == rerun_key
+
+        stats = key_cache_stats()
+        assert (stats['key_to_string']['hits'], stats['key_to_string']['misses']) == (1, 1)
+        assert (stats['map_into_course']['hits'], stats['map_into_course']['misses']) == (1, 1)
@@ -9,9 +9,10 @@ import ddt
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.test import TestCase
+from opaque_keys.edx.django.models import CourseKeyField
 from opaque_keys.edx.keys import CourseKey, UsageKey
 
-from edx_when.models import ContentDate, DatePolicy, MissingScheduleError, UserDate
+from edx_when.models import ContentDate, DatePolicy, MissingScheduleError, UserDate, actual_policy_date
 from tests.test_models_app.models import DummySchedule
 
 User = get_user_model()
@@ -66,6 +67,25 @@ class TestDatePolicy(TestCase):
         with self.assertRaises(ValidationError):
             DatePolicy(abs_date=datetime(2020, 1, 1), rel_date=timedelta(days=1)).full_clean()
 
+    @ddt.data(
+        (None, None, None),
+        (datetime(2020, 1, 1), None, None),
+        (None, timedelta(days=1), datetime(2020, 1, 1)),
+        (None, timedelta(days=10), datetime(2020, 1, 5)),
+        (None, timedelta(days=1), datetime(2019, 12, 1)),
+    )
+    @ddt.unpack
+    def test_actual_policy_date(self, abs_date, rel_date, end_datetime):
+        # The function the read path uses must agree with the model's method.
+        schedule = DummySchedule(created=datetime(2020, 1, 1), start_date=datetime(2020, 1, 1))
+        for cutoff_datetime in (None, datetime(2019, 12, 1)):
+            args = (schedule, end_datetime, cutoff_datetime)
+            policy = DatePolicy(abs_date=abs_date, rel_date=rel_date)
+            assert actual_policy_date(abs_date, rel_date, *args) == policy.actual_date(*args)
+        if rel_date is not None:
+            with self.assertRaises(MissingScheduleError):
+                actual_policy_date(abs_date, rel_date)
+
 
 class TestUserDateModel(TestCase):
     """Tests for the UserDate model."""
@@ -103,3 +123,13 @@ class TestUserDateModel(TestCase):
             is_content_gated=True,
         )
         assert user_date.learner_has_access is False
+
+    def test_course_id_synced_from_content_date(self):
+        """course_id should be copied from the ContentDate on save."""
+        user_date = UserDate.objects.create(user=self.user, content_date=self.content_date)
+        assert user_date.course_id == self.course_key
+
+        UserDate.objects.filter(id=user_date.id).update(course_id=CourseKeyField.Empty)
+        user_date.refresh_from_db()
+        user_date.save()
+        assert UserDate.objects.get(id=user_date.id).course_id == self.course_key
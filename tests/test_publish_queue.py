@@ -0,0 +1,174 @@
+"""
+Tests for edx_when.publish_queue.
+"""
+
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+from django.core.cache import cache as django_cache
+from django.test import TestCase, override_settings
+from edx_django_utils.cache.utils import RequestCache, TieredCache
+
+from edx_when import api, publish_queue, tasks
+from test_utils import make_items
+
+
+@override_settings(EDX_WHEN_PUBLISH_EXECUTOR='local', EDX_WHEN_PUBLISH_QUIET_PERIOD=30)
+class PublishQueueTests(TestCase):
+    """
+    Tests for coalescing the date syncs of repeated publishes.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(RequestCache.clear_all_namespaces)
+        self.addCleanup(TieredCache.dangerous_clear_all_tiers)
+        self.executor = publish_queue.get_executor()
+        self.executor.scheduled = []
+
+        self.items = make_items()
+        self.course_key = self.items[0][0].course_key
+        patcher = patch('edx_when.publish_queue.get_course_date_items', side_effect=lambda course_key: self.items)
+        self.mock_get_items = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_coalesces_publishes(self):
+        start = time.time()
+        with patch('edx_when.publish_queue.time.time', return_value=start):
+            publish_queue.request_date_sync(self.course_key, 'v1')
+        with patch('edx_when.publish_queue.time.time', return_value=start + 20):
+            publish_queue.request_date_sync(str(self.course_key), 'v2')
+        assert len(self.executor.scheduled) == 2
+
+        # The first run comes after the second publish, so there's nothing to do yet
+        assert not self.executor.run_due(now=start + 35)
+        assert not self.mock_get_items.called
+
+        with patch('edx_when.api.warm_dates_cache_for_course') as mock_warm:
+            assert self.executor.run_due(now=start + 55) == [self.course_key]
+        assert self.mock_get_items.call_count == 1
+        mock_warm.assert_called_once_with(self.course_key, 'v2')
+        assert api.get_dates_for_course(self.course_key, use_cached=False)
+
+        # It's no longer pending
+        assert not publish_queue.process_pending_sync(self.course_key, now=start + 100)
+
+    def test_request_during_sync_stays_pending(self):
+        publish_queue.request_date_sync(self.course_key)
+
+        def publish_again(course_key):
+            publish_queue.request_date_sync(course_key, 'v2')
+            return self.items
+
+        self.mock_get_items.side_effect = publish_again
+        now = time.time() + 31
+        assert publish_queue.process_pending_sync(self.course_key, now=now)
+        self.mock_get_items.side_effect = None
+        self.mock_get_items.return_value = self.items
+        with patch('edx_when.api.warm_dates_cache_for_course') as mock_warm:
+            assert publish_queue.process_pending_sync(self.course_key, now=now + 31)
+        mock_warm.assert_called_once_with(self.course_key, 'v2')
+
+    def test_request_as_sync_finishes_stays_pending(self):
+        first = publish_queue.request_date_sync(self.course_key, 'v1')
+        second = []
+
+        def publish_again(course_key, _published_version):
+            # A request that replaces the pending sync just as the run finishes isn't lost
+            with patch('edx_when.publish_queue.time.time', return_value=now):
+                second.append(publish_queue.request_date_sync(course_key, 'v2'))
+
+        now = time.time() + 31
+        with patch('edx_when.api.warm_dates_cache_for_course', side_effect=publish_again):
+            with patch.object(django_cache, 'delete', wraps=django_cache.delete) as mock_delete:
+                assert publish_queue.process_pending_sync(self.course_key, now=now)
+        # The pending sync isn't deleted after it's read, so a request landing in between can't be lost either
+        pending_cache_key = publish_queue._pending_sync_cache_key(self.course_key)  # pylint: disable=protected-access
+        assert pending_cache_key not in [delete_call.args[0] for delete_call in mock_delete.call_args_list]
+        assert second[0].token != first.token
+        assert django_cache.get(pending_cache_key) == second[0]
+
+        # A late run of the first request finds nothing more to do; the second request's run syncs it
+        with patch('edx_when.api.warm_dates_cache_for_course') as mock_warm:
+            assert not publish_queue.process_pending_sync(self.course_key, now=now)
+            assert publish_queue.process_pending_sync(self.course_key, now=now + 31)
+            assert not publish_queue.process_pending_sync(self.course_key, now=now + 62)
+        mock_warm.assert_called_once_with(self.course_key, 'v2')
+
+    def test_failed_sync_stays_pending(self):
+        publish_queue.request_date_sync(self.course_key)
+        now = time.time() + 31
+        with patch('edx_when.api.set_dates_for_course', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                publish_queue.process_pending_sync(self.course_key, now=now)
+        assert publish_queue.process_pending_sync(self.course_key, now=now)
+
+    def test_no_course_content(self):
+        self.mock_get_items.side_effect = None
+        self.mock_get_items.return_value = None
+        publish_queue.request_date_sync(self.course_key)
+        assert not self.executor.run_due(now=time.time() + 31)
+        assert not publish_queue.process_pending_sync(self.course_key, now=time.time() + 31)
+
+    @override_settings(EDX_WHEN_PUBLISH_EXECUTOR='inline')
+    def test_inline_executor(self):
+        publish_queue.request_date_sync(self.course_key)
+        assert self.mock_get_items.call_count == 1
+        assert api.get_dates_for_course(self.course_key, use_cached=False)
+
+    @override_settings(EDX_WHEN_PUBLISH_EXECUTOR='thread', EDX_WHEN_PUBLISH_QUIET_PERIOD=0)
+    def test_thread_executor(self):
+        with patch('edx_when.publish_queue.threading.Timer') as mock_timer:
+            publish_queue.request_date_sync(self.course_key)
+        mock_timer.assert_called_once_with(
+            0, publish_queue.ThreadExecutor._run, args=(self.course_key, 0)  # pylint: disable=protected-access
+        )
+        assert mock_timer.return_value.start.called
+
+        # A failed sync is retried in another timer, with a growing delay
+        with patch('edx_when.publish_queue.connections.close_all') as mock_close_all:
+            with patch('edx_when.publish_queue.process_pending_sync', side_effect=ValueError):
+                with patch('edx_when.publish_queue.threading.Timer') as mock_timer:
+                    publish_queue.ThreadExecutor._run(self.course_key, 2)  # pylint: disable=protected-access
+                mock_timer.assert_called_once_with(
+                    4, publish_queue.ThreadExecutor._run, args=(self.course_key, 3)  # pylint: disable=protected-access
+                )
+                assert mock_timer.return_value.start.called
+
+                with override_settings(EDX_WHEN_PUBLISH_MAX_RETRIES=3):
+                    with patch('edx_when.publish_queue.threading.Timer') as mock_timer:
+                        publish_queue.ThreadExecutor._run(self.course_key, 3)  # pylint: disable=protected-access
+                    assert not mock_timer.called
+        assert mock_close_all.call_count == 2
+
+    @override_settings(EDX_WHEN_PUBLISH_EXECUTOR='celery', EDX_WHEN_PUBLISH_MAX_RETRIES=2)
+    def test_celery_executor(self):
+        with patch('edx_when.tasks.sync_course_dates.apply_async') as mock_apply_async:
+            publish_queue.request_date_sync(self.course_key)
+        mock_apply_async.assert_called_once_with(args=(str(self.course_key),), countdown=30)
+
+        # The task retries a failed sync
+        with patch('edx_when.tasks.process_pending_sync', side_effect=ValueError) as mock_process:
+            result = tasks.sync_course_dates.apply(args=(str(self.course_key),))
+        assert result.failed()
+        assert mock_process.call_count == 3
+
+    @override_settings(EDX_WHEN_PUBLISH_EXECUTOR=None)
+    def test_default_executor(self):
+        with patch('edx_when.publish_queue.importlib.util.find_spec', return_value=None):
+            assert isinstance(publish_queue.get_executor(), publish_queue.ThreadExecutor)
+        with patch('edx_when.publish_queue.importlib.util.find_spec', return_value=object()):
+            assert isinstance(publish_queue.get_executor(), publish_queue.CeleryExecutor)
+        with override_settings(EDX_WHEN_PUBLISH_EXECUTOR='edx_when.publish_queue.InlineExecutor'):
+            assert isinstance(publish_queue.get_executor(), publish_queue.InlineExecutor)
+
+    def test_sync_replaces_dates(self):
+        # A sync replaces the course's dates, like set_dates_for_course
+        api.set_dates_for_course(self.course_key, self.items + make_items(self.course_key))
+        publish_queue.request_date_sync(self.course_key)
+        self.executor.run_due(now=time.time() + 31)
+        assert len(api.get_dates_for_course(self.course_key, use_cached=False)) == len(
+            [item for item in self.items if item[1].get('due') or item[1].get('start')]
+        )
+        assert datetime(2019, 3, 22) in api.get_dates_for_course(self.course_key, use_cached=False).values()
@@ -0,0 +1,189 @@
+"""
+Tests for the edx_when REST views.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from django.contrib import auth
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from edx_django_utils.cache.utils import RequestCache, TieredCache
+from rest_framework.test import APIClient
+
+from edx_when import api
+from test_utils import make_items
+from tests.test_models_app.models import DummyCourse, DummyEnrollment, DummySchedule
+
+User = auth.get_user_model()
+
+
+class CourseDatesViewTests(TestCase):
+    """
+    Tests for the CourseDates view.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.items = make_items(with_relative=True)
+        self.course_key = self.items[0][0].course_key
+        api.set_dates_for_course(self.course_key, self.items)
+
+        self.user = User.objects.create(username='tester', email='tester@test.com')
+        course = DummyCourse.objects.create(id=self.course_key)
+        enrollment = DummyEnrollment.objects.create(user=self.user, course=course)
+        self.schedule = DummySchedule.objects.create(
+            enrollment=enrollment, created=datetime(2019, 4, 1), start_date=datetime(2019, 4, 1)
+        )
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('course_dates', kwargs={'course_id': str(self.course_key)})
+
+        for patcher in (
+            patch('edx_when.utils.get_schedule_model', return_value=DummySchedule),
+            patch('edx_when.api._are_relative_dates_enabled', return_value=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(RequestCache.clear_all_namespaces)
+        self.addCleanup(TieredCache.dangerous_clear_all_tiers)
+
+    def _get(self, **extra):
+        RequestCache.clear_all_namespaces()
+        return self.client.get(self.url, **extra)
+
+    def test_get_dates(self):
+        response = self._get()
+        assert response.status_code == 200
+        assert response.data['course_id'] == str(self.course_key)
+        assert len(response.data['dates']) == 6
+        first = {'location': str(self.items[0][0]), 'field': 'due', 'date': datetime(2019, 3, 22)}
+        assert first in response.data['dates']
+        assert response['ETag']
+        assert 'private' in response['Cache-Control']
+        assert 'must-revalidate' in response['Cache-Control']
+
+    def test_subsection_and_higher_only(self):
+        api.set_date_for_block(
+            self.course_key, self.course_key.make_usage_key('video', 'clip'), 'start', datetime(2019, 3, 21)
+        )
+        assert len(self._get().data['dates']) == 7
+        response = self.client.get(self.url, {'subsection_and_higher_only': 'true'})
+        assert len(response.data['dates']) == 6
+
+    def test_not_modified(self):
+        etag = self._get()['ETag']
+        with patch('edx_when.api.get_dates_for_course') as mock_get_dates:
+            response = self._get(HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+        assert not mock_get_dates.called
+
+        response = self._get(HTTP_IF_NONE_MATCH='"something-else"')
+        assert response.status_code == 200
+
+    def test_etag_changes_with_override(self):
+        etag = self._get()['ETag']
+        api.set_date_for_block(self.course_key, self.items[0][0], 'due', timedelta(days=2), user=self.user)
+        response = self._get(HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_etag_changes_with_schedule(self):
+        etag = self._get()['ETag']
+        self.schedule.start_date = datetime(2019, 4, 5)
+        self.schedule.save()
+        assert self._get(HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_etag_changes_with_publish(self):
+        etag = self._get()['ETag']
+        api.set_dates_for_course(self.course_key, self.items[1:])
+        assert self._get(HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_etag_changes_with_strict_filter(self):
+        etag = self._get(QUERY_STRING='subsection_and_higher_only=true')['ETag']
+        with override_settings(EDX_WHEN_STRICT_BLOCK_TYPE_FILTER=True):
+            response = self._get(QUERY_STRING='subsection_and_higher_only=true', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_poll_queries(self):
+        etag = self._get()['ETag']
+        # Polling only looks up the learner's schedule, not the published version or the dates
+        with patch('edx_when.utils.get_published_version') as mock_version:
+            with self.assertNumQueries(1):
+                assert self._get(HTTP_IF_NONE_MATCH=etag).status_code == 304
+        assert not mock_version.called
+
+    @override_settings(EDX_WHEN_COURSE_DATES_MAX_AGE=30)
+    def test_max_age(self):
+        assert 'max-age=30' in self._get()['Cache-Control']
+
+    def test_invalid_course_id(self):
+        response = self.client.get(reverse('course_dates', kwargs={'course_id': 'not+a+course'}))
+        assert response.status_code == 404
+
+    def test_unauthenticated(self):
+        response = APIClient().get(self.url)
+        assert response.status_code in (401, 403)
+
+
+class CourseOverridesViewTests(TestCase):
+    """
+    Tests for the CourseOverrides view.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.items = make_items()
+        self.course_key = self.items[0][0].course_key
+        api.set_dates_for_course(self.course_key, self.items)
+
+        self.learners = [
+            User.objects.create(username=f'learner{i}', email=f'learner{i}@test.com') for i in range(3)
+        ]
+        for learner in self.learners:
+            api.set_date_for_block(self.course_key, self.items[0][0], 'due', datetime(2019, 4, 1), user=learner)
+        api.set_date_for_block(self.course_key, self.items[1][0], 'due', datetime(2019, 4, 2), user=self.learners[0])
+
+        self.staff = User.objects.create(username='staff', email='staff@test.com', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+        self.url = reverse('course_overrides', kwargs={'course_id': str(self.course_key)})
+
+    def test_pages(self):
+        response = self.client.get(self.url, {'page_size': 3})
+        assert response.status_code == 200
+        assert len(response.data['results']) == 3
+        assert response.data['results'][0] == {
+            'username': 'learner0',
+            'full_name': 'unknown',
+            'email': 'learner0@test.com',
+            'location': str(self.items[0][0]),
+            'date': datetime(2019, 4, 1),
+        }
+
+        response = self.client.get(response.data['next'])
+        assert len(response.data['results']) == 1
+        assert response.data['next'] is None
+
+    def test_filters(self):
+        response = self.client.get(self.url, {'block_id': str(self.items[1][0])})
+        assert [override['username'] for override in response.data['results']] == ['learner0']
+
+        response = self.client.get(self.url, {'username': 'learner1'})
+        assert [override['location'] for override in response.data['results']] == [str(self.items[0][0])]
+
+        response = self.client.get(self.url, {'username': 'nobody'})
+        assert response.data == {'results': [], 'next': None}
+
+    def test_bad_parameters(self):
+        assert self.client.get(self.url, {'page_size': 'lots'}).status_code == 400
+        assert self.client.get(self.url, {'page_size': 0}).status_code == 400
+        assert self.client.get(self.url, {'block_id': 'not-a-block'}).status_code == 400
+
+    def test_staff_only(self):
+        client = APIClient()
+        client.force_authenticate(self.learners[0])
+        assert client.get(self.url).status_code == 403
@@ -49,7 +49,7 @@ class XblockTests(TestCase):
 
         mock_Schedule = mock.Mock(name="Schedule")
         mock_Schedule.objects.get.return_value = schedule
-        schedule_patcher = mock.patch('edx_when.utils.Schedule', mock_Schedule)
+        schedule_patcher = mock.patch('edx_when.utils.get_schedule_model', return_value=mock_Schedule)
         schedule_patcher.start()
         self.addCleanup(schedule_patcher.stop)
 
@@ -104,6 +104,63 @@ class TestFieldData(XblockTests):
         dfd.delete('baz', 'boing')
         defaults.delete.assert_called_once_with('baz', 'boing')
 
+    @mock.patch('edx_when.api._are_relative_dates_enabled', return_value=True)
+    def test_shared_course_dates(self, _mock_relative_dates):
+        self.addCleanup(field_data._shared_course_dates.cache_clear)  # pylint: disable=protected-access
+        other_user = User.objects.create(username='other', email='other@test.com')
+        api.set_date_for_block(self.course_id, self.items[0][0], 'due', datetime.datetime(2019, 4, 1), user=self.user)
+
+        users = (self.user, other_user, None)
+        dfds = [
+            field_data.DateLookupFieldData(mock.MagicMock(), course_id=self.course_id, user=user, published_version='v')
+            for user in users
+        ]
+        for dfd, user in zip(dfds, users):
+            for (location, field), date in api.get_dates_for_course(self.course_id, user, use_cached=False).items():
+                assert dfd.get(MockBlock(location), field) == date
+
+        # The course-wide dates are one shared, read-only mapping...
+        course_dates = dfds[2]._course_dates  # pylint: disable=protected-access
+        assert all(dfd._course_dates.maps[1] is course_dates for dfd in dfds[:2])  # pylint: disable=protected-access
+        with self.assertRaises(TypeError):
+            course_dates['foo', 'due'] = None
+        # ...and each user only has their relative dates and overrides
+        assert len(dfds[0]._course_dates.maps[0]) == 4  # pylint: disable=protected-access
+        assert len(dfds[1]._course_dates.maps[0]) == 3  # pylint: disable=protected-access
+
+    def test_shared_course_dates_invalidated(self):
+        self.addCleanup(field_data._shared_course_dates.cache_clear)  # pylint: disable=protected-access
+        block = MockBlock(self.items[0][0])
+
+        def course_due_date():
+            dfd = field_data.DateLookupFieldData(mock.MagicMock(), course_id=self.course_id, published_version='v')
+            return dfd.get(block, 'due')
+
+        assert course_due_date() == self.items[0][1]['due']
+        # A course-wide date written without a new published version shows up...
+        new_date = datetime.datetime(2019, 5, 1)
+        api.set_date_for_block(self.course_id, self.items[0][0], 'due', new_date)
+        assert course_due_date() == new_date
+
+        # ...and a change of the relative dates flag doesn't reuse the mapping computed under the old value
+        with mock.patch('edx_when.api._are_relative_dates_enabled', return_value=True), \
+                mock.patch.object(api, 'get_dates_for_course', wraps=api.get_dates_for_course) as mock_get_dates:
+            course_due_date()
+        assert mock_get_dates.call_count == 1
+
+    def test_without_published_version(self):
+        with mock.patch('edx_when.field_data._shared_course_dates') as mock_shared:
+            dfd = field_data.DateLookupFieldData(mock.MagicMock(), course_id=self.course_id, user=self.user)
+        # The dates aren't shared, and the version isn't looked up
+        assert not mock_shared.called
+        assert dfd.get(MockBlock(self.items[0][0]), 'due') == self.items[0][1]['due']
+
+    def test_inheritable_fields(self):
+        # Outside of edx-platform, these are the date fields
+        assert field_data.INHERITABLE_FIELDS == field_data.get_inheritable_fields() == {'due', 'start', 'end'}
+        with self.assertRaises(AttributeError):
+            field_data.NOT_A_SETTING  # pylint: disable=pointless-statement
+
     def test_wrapped_fielddata(self):
         defaults = mock.MagicMock()
         dfd1 = field_data.DateLookupFieldData(defaults, course_id=self.course_id, use_cached=False, user=self.user)